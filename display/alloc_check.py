@@ -0,0 +1,123 @@
+"""
+Steady-state allocation check for the render -> pack -> upload path.
+
+Runs the same stages as the main loop (pooled canvas, text layout, status
+bar, packing, compositing) against a stand-in panel for many iterations,
+taking turns with a plain, a rotated and inverted, and an inverted-only
+compositor. After warm-up it measures Python heap growth (tracemalloc),
+the heap peak of each iteration above its start, and RSS growth. Growth must stay
+flat, and the peak must stay well below one frame: a steady-state
+iteration may not allocate full-size temporaries. The check exits
+non-zero if any of the three is over its limit.
+
+    python3 alloc_check.py [iterations]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+from config_loader import load_config
+from fonts import get_font, get_font_path
+from render import draw_multiline_text, LOG_FONT_SIZE
+from compositor import Compositor, pack, stride_for
+from frame_pool import FramePool
+from status_bar import StatusBar
+
+PANEL_SIZE = (1360, 480)
+WARMUP = 20
+MAX_GROWTH_BYTES = 64 * 1024
+# Below half a packed frame (81,600 bytes): text layout peaks near 30 kB, packing
+# and translating take CHUNK-sized slices
+MAX_PEAK_BYTES = 40 * 1024
+# Well below one leaked canvas (1360x480 mode 'L' is 637 kB) per run
+MAX_RSS_GROWTH_KB = 512
+
+
+class NullPanel:
+    """Consumes frames like EPD.display/display_region without touching hardware."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def display(self, frame):
+        self.frames += 1
+
+    def display_region(self, data, x, y, width, height, stride=None):
+        self.frames += 1
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def run(iterations):
+    config = load_config()
+    width = config.get('display_width', 1360)
+    height = config.get('display_height', 480)
+    compositors = [
+        Compositor.from_config(dict(config, rotation=0, invert=False), PANEL_SIZE),
+        Compositor.from_config(dict(config, rotation=180, invert=True), PANEL_SIZE),
+        Compositor.from_config(dict(config, rotation=0, invert=True), PANEL_SIZE),
+    ]
+    status_bar = StatusBar.from_config(config, PANEL_SIZE)
+    frame_pool = FramePool()
+    frame_size = compositors[0].stride * PANEL_SIZE[1]
+    canvas_size = stride_for(width) * height
+    panel = NullPanel()
+    font_path = get_font_path(config.get('default_font_id', 1))
+    log_font = get_font(LOG_FONT_SIZE)
+    texts = ["오늘도 평화로운 식물 라이프", "물 좀 주세요, 말라가고 있어요."]
+
+    def iteration(i):
+        canvas, draw = frame_pool.canvas(width, height)
+        draw_multiline_text(draw, texts[i % 2], width, height, font_path)
+        fields = {'log': f"moisture: {i % 7}, light: {i % 5}", 'ssid': "ePlantalk01"}
+        status_bar.draw(draw, fields, log_font)
+        canvas_bytes = pack(canvas, frame_pool.buffer(canvas_size))
+        compositor = compositors[i % len(compositors)]
+        frame = compositor.compose(canvas_bytes, width, height, frame_pool.buffer(frame_size))
+        panel.display(frame)
+        status_bar.update(panel, frame, status_bar.changed(fields), fields)
+        frame_pool.release(frame)
+        frame_pool.release(canvas_bytes)
+        frame_pool.release_canvas(canvas, draw)
+
+    for i in range(WARMUP):
+        iteration(i)
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    rss_start = rss_kb()
+    started = time.perf_counter()
+    peak_growth = 0
+    for i in range(iterations):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        iteration(i)
+        peak_growth = max(peak_growth, tracemalloc.get_traced_memory()[1] - start)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_end = rss_kb()
+
+    growth = current - baseline
+    rss_growth = rss_end - rss_start
+    print(f"{iterations} iterations in {elapsed:.1f}s ({elapsed / iterations * 1000:.1f} ms each)")
+    print(f"pool: {frame_pool.stats()}")
+    checks = (
+        ('heap growth', f"{growth} bytes", f"{MAX_GROWTH_BYTES} bytes", growth <= MAX_GROWTH_BYTES),
+        ('iteration heap peak', f"{peak_growth} bytes", f"{MAX_PEAK_BYTES} bytes", peak_growth <= MAX_PEAK_BYTES),
+        ('RSS growth', f"{rss_growth} kB ({rss_start} -> {rss_end} kB)", f"{MAX_RSS_GROWTH_KB} kB",
+         rss_growth <= MAX_RSS_GROWTH_KB),
+    )
+    for name, value, limit, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'}  {name}: {value}, limit {limit}")
+    return all(passed for _, _, _, passed in checks)
+
+
+if __name__ == '__main__':
+    ok = run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,218 @@
+"""
+Local reading history and backfill from the plant node's reading buffer.
+
+The node keeps a ring buffer of readings (plant_node/reading_buffer.h) and
+serves everything after a given sequence number as CSV from /readings.
+After a disconnect the hub fetches the gap in one request and merges it
+into its local history, converting node uptime to wall-clock time. The
+node draws a new boot id on every boot; a changed id means its sequence
+numbers restarted.
+"""
+import bisect
+import csv
+import os
+import time
+import urllib.request
+
+DEFAULT_HISTORY_SIZE = 4096
+BUFFER_INTERVAL = 30 # Node records one reading every 30 s (interval in plant_node_*.yaml)
+# The history file is rewritten with the rows in memory once it holds this many times maxlen rows
+COMPACT_FACTOR = 2
+
+
+class ReadingHistory:
+    """
+    Bounded, time-ordered history of (timestamp, moisture, light) readings.
+    Optionally appended to a CSV file so it survives restarts; the file is
+    trimmed to the last maxlen readings whenever it grows past
+    COMPACT_FACTOR * maxlen rows, so it (and loading it) stays bounded.
+    """
+
+    def __init__(self, maxlen=DEFAULT_HISTORY_SIZE, path=None):
+        self.maxlen = maxlen
+        self.path = path
+        self.times = []
+        self.rows = []
+        self.file_rows = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, newline='') as f:
+            for row in csv.reader(f):
+                self.file_rows += 1
+                try:
+                    self._insert(float(row[0]), float(row[1]), float(row[2]))
+                except (ValueError, IndexError):
+                    continue
+        # Files written before trimming existed can be far longer
+        if self.file_rows > self.maxlen:
+            self._compact()
+
+    def _compact(self):
+        """Rewrites the history file with the readings in memory."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            for timestamp, moisture, light in self.rows:
+                writer.writerow([f"{timestamp:.1f}", moisture, light])
+        os.replace(temp_path, self.path)
+        self.file_rows = len(self.rows)
+
+    def _insert(self, timestamp, moisture, light):
+        index = bisect.bisect_right(self.times, timestamp)
+        self.times.insert(index, timestamp)
+        self.rows.insert(index, (timestamp, moisture, light))
+        if len(self.rows) > self.maxlen:
+            del self.times[0]
+            del self.rows[0]
+
+    def add(self, timestamp, moisture, light):
+        self._insert(timestamp, moisture, light)
+        if not self.path:
+            return
+        if self.file_rows >= COMPACT_FACTOR * self.maxlen:
+            self._compact()
+            return
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerow([f"{timestamp:.1f}", moisture, light])
+        self.file_rows += 1
+
+    def merge(self, readings, tolerance=BUFFER_INTERVAL / 2):
+        """
+        Adds backfilled (timestamp, moisture, light) readings that fall into
+        gaps of the history. Returns the number added.
+        """
+        added = 0
+        for timestamp, moisture, light in readings:
+            # Periods the hub was connected are already covered by live readings
+            index = bisect.bisect_left(self.times, timestamp - tolerance)
+            if index < len(self.times) and self.times[index] < timestamp + tolerance:
+                continue
+            self.add(timestamp, moisture, light)
+            added += 1
+        return added
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def parse_readings_csv(text):
+    """
+    Parses the node's /readings body. Returns (node_uptime_s, first_seq,
+    last_seq, boot, [(seq, uptime_s, moisture, light), ...]); last_seq and
+    boot are None for firmware that does not send them.
+    """
+    node_uptime = None
+    first_seq = None
+    last_seq = None
+    boot = None
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            for field in line[1:].split(','):
+                key, _, value = field.strip().partition('=')
+                if key == 'uptime_s':
+                    node_uptime = int(value)
+                elif key == 'first_seq':
+                    first_seq = int(value)
+                elif key == 'last_seq':
+                    last_seq = int(value)
+                elif key == 'boot':
+                    boot = value
+            continue
+        if line.startswith('seq'):
+            continue
+        seq, uptime_s, moisture, light = line.split(',')
+        rows.append((int(seq), int(uptime_s), float(moisture), float(light)))
+    return node_uptime, first_seq, last_seq, boot, rows
+
+
+class BackfillClient:
+    """
+    Catches up on readings the node buffered while the hub was away.
+    """
+
+    def __init__(self, sensor_ip, timeout=5):
+        self.sensor_ip = sensor_ip
+        self.timeout = timeout
+        self.last_seq = 0
+        self.last_node_uptime = None
+        self.boot = None
+        self.synced = False
+
+    @classmethod
+    def from_config(cls, config):
+        options = config.get('backfill', {})
+        return cls(config.get('sensor_ip', '192.168.4.1'), timeout=options.get('timeout', 5))
+
+    def fetch_since(self, seq):
+        url = f"http://{self.sensor_ip}/readings?since={seq}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return parse_readings_csv(response.read().decode())
+
+    def catch_up(self, history, now=None):
+        """
+        Fetches readings newer than the last seen sequence number and merges
+        them into history. Returns the number of readings added, or None if
+        the node could not be reached (or has no reading buffer). The node
+        answers a limited number of readings per request; the rest up to its
+        last_seq are fetched page by page.
+        """
+        if now is None:
+            now = time.time()
+        try:
+            node_uptime, first_seq, last_seq, boot, rows = self.fetch_since(self.last_seq)
+        except Exception as e:
+            print(f"Backfill failed: {e}")
+            return None
+
+        if node_uptime is None:
+            return None
+
+        # Node rebooted: its sequence restarted at 1. Firmware without boot
+        # ids only shows it by uptime going backwards, which misses reboots
+        # while the hub was away for longer than the node's previous uptime.
+        if self.boot is not None and boot is not None:
+            restarted = boot != self.boot
+        else:
+            restarted = self.last_node_uptime is not None and node_uptime < self.last_node_uptime
+        if restarted and self.last_seq:
+            print("Plant node restarted, backfilling its whole buffer.")
+            self.last_seq = 0
+            try:
+                node_uptime, first_seq, last_seq, boot, rows = self.fetch_since(0)
+            except Exception as e:
+                print(f"Backfill failed: {e}")
+                return None
+
+        if first_seq and self.last_seq and first_seq > self.last_seq + 1:
+            print(f"Backfill gap: readings {self.last_seq + 1}..{first_seq - 1} were overwritten on the node.")
+
+        page = rows
+        while page and last_seq is not None and page[-1][0] < last_seq:
+            try:
+                _, _, _, page_boot, page = self.fetch_since(page[-1][0])
+            except Exception as e:
+                print(f"Backfill stopped at seq {rows[-1][0]}: {e}")
+                break
+            if page_boot != boot:
+                break  # restarted in between; the next catch-up starts over
+            rows += page
+
+        # Node time is uptime only; anchor it to our wall clock at response time
+        boot_time = now - node_uptime
+        readings = [(boot_time + uptime_s, moisture, light) for _, uptime_s, moisture, light in rows]
+        added = history.merge(readings)
+
+        if rows:
+            self.last_seq = rows[-1][0]
+        self.last_node_uptime = node_uptime
+        self.boot = boot
+        self.synced = True
+        if added:
+            print(f"Backfilled {added} readings (up to seq {self.last_seq}).")
+        return added
@@ -0,0 +1,165 @@
+"""
+Compositing directly on packed 1-bpp frame buffers.
+
+Buffers use the panel's own format (the same as PIL mode '1' tobytes()):
+rows of ceil(width / 8) bytes, most significant bit first, 1 = white.
+Placing the logical canvas at a pixel offset, rotating by 180 degrees and
+inverting all work on these bytes, so no full-size PIL image has to be
+created, pasted into or rotated for every frame. Packing, rotating and
+inverting all write into the caller's (pooled) buffers, a chunk at a time,
+so a frame allocates no full-size temporaries either.
+"""
+from PIL import Image
+
+WHITE = 0xFF
+CHUNK = 8192  # bytes per packing / translating step
+
+# BIT_REVERSE[b] is b with its bit order mirrored (0b10000000 <-> 0b00000001)
+BIT_REVERSE = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+INVERT = bytes(b ^ 0xFF for b in range(256))
+BIT_REVERSE_INVERT = bytes(b ^ 0xFF for b in BIT_REVERSE)
+
+
+def stride_for(width):
+    return (width + 7) // 8
+
+
+def pack(image, out=None):
+    """
+    Packs a PIL image into the panel format. With out (a bytearray of
+    stride_for(width) * height bytes, e.g. from the frame pool) the rows are
+    encoded straight into it and out is returned; otherwise a new bytes.
+    """
+    if image.mode != '1':
+        image = image.convert('1')
+    if out is None:
+        return image.tobytes()
+    # What Image.tobytes() does, minus joining the chunks into a new object
+    image.load()
+    encoder = Image._getencoder('1', 'raw', '1')
+    encoder.setimage(image.im, (0, 0) + image.size)
+    view = memoryview(out)
+    position = 0
+    while True:
+        length, status, data = encoder.encode(max(CHUNK, image.width * 4))
+        view[position:position + len(data)] = data
+        position += len(data)
+        if status:
+            break
+    if status < 0:
+        raise RuntimeError(f"encoder error {status} in pack")
+    return out
+
+
+def translate(buf, table):
+    """Maps every byte of the bytearray buf through table, in place."""
+    for start in range(0, len(buf), CHUNK):
+        buf[start:start + CHUNK] = buf[start:start + CHUNK].translate(table)
+
+
+def blit(dst, dst_stride, src, src_stride, width, height, x, y, src_x=0):
+    """
+    Copies the width x height window starting at column src_x of packed src
+    into packed dst at pixel (x, y). Neither x nor src_x needs to be
+    byte-aligned; bits of dst outside the window are preserved.
+    """
+    shift = x % 8
+    byte_x = x // 8
+    src_shift = src_x % 8
+    src_byte_x = src_x // 8
+    src_bytes = stride_for(src_shift + width)
+
+    if shift == 0 and src_shift == 0 and width % 8 == 0:
+        for row in range(height):
+            d = (y + row) * dst_stride + byte_x
+            s = row * src_stride + src_byte_x
+            dst[d:d + src_bytes] = src[s:s + src_bytes]
+        return
+
+    # Unaligned: treat each row as a big integer and shift it into place
+    span = stride_for(shift + width)
+    span_bits = span * 8
+    window_mask = ((1 << width) - 1) << (span_bits - shift - width)
+    keep_mask = ((1 << span_bits) - 1) ^ window_mask
+    drop_bits = src_bytes * 8 - src_shift - width
+    width_mask = (1 << width) - 1
+    for row in range(height):
+        s = row * src_stride + src_byte_x
+        bits = (int.from_bytes(src[s:s + src_bytes], 'big') >> drop_bits) & width_mask
+        bits <<= span_bits - shift - width
+        d = (y + row) * dst_stride + byte_x
+        old = int.from_bytes(dst[d:d + span], 'big')
+        dst[d:d + span] = ((old & keep_mask) | bits).to_bytes(span, 'big')
+
+
+def rotate180(buf, width, height, invert=False):
+    """
+    Rotates the bytearray buf by 180 degrees in place (optionally inverting
+    it) and returns it: the byte order is reversed and every byte
+    bit-mirrored through a lookup table.
+    """
+    buf.reverse()
+    translate(buf, BIT_REVERSE_INVERT if invert else BIT_REVERSE)
+    pad = stride_for(width) * 8 - width
+    if pad:
+        # Row padding bits ended up at the start of each row; shift them back out
+        stride = stride_for(width)
+        mask = (1 << (stride * 8)) - 1
+        for row in range(height):
+            s = row * stride
+            bits = (int.from_bytes(buf[s:s + stride], 'big') << pad) & mask
+            buf[s:s + stride] = bits.to_bytes(stride, 'big')
+    return buf
+
+
+class Compositor:
+    """
+    Builds the packed hardware frame from the packed logical canvas.
+    """
+
+    def __init__(self, panel_width, panel_height, offset=(0, 0), rotation=0, invert=False):
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.stride = stride_for(panel_width)
+        self.offset = offset
+        self.rotation = rotation
+        self.invert = invert
+        self.blank = bytes([WHITE]) * (self.stride * panel_height)
+        self.frame = bytearray(self.blank)
+
+    @classmethod
+    def from_config(cls, config, panel_size):
+        return cls(
+            panel_size[0],
+            panel_size[1],
+            (config.get('display_x_offset', 0), config.get('display_y_offset', 0)),
+            config.get('rotation', 0),
+            config.get('invert', False),
+        )
+
+    def compose(self, canvas_bytes, canvas_width, canvas_height, out=None):
+        """
+        Places the packed canvas at the configured offset on a white frame,
+        applies rotation/inversion and returns the packed hardware frame.
+        The frame is written into 'out' (e.g. a pooled buffer) when given.
+        """
+        frame = self.frame if out is None else out
+        # Through a memoryview: bytearray slice assignment from bytes copies the source first
+        memoryview(frame)[:] = self.blank
+
+        # Like PIL's paste, whatever falls off the panel on any side is clipped
+        x, y = self.offset
+        src_x, src_y = max(0, -x), max(0, -y)
+        x, y = max(0, x), max(0, y)
+        width = min(canvas_width - src_x, self.panel_width - x)
+        height = min(canvas_height - src_y, self.panel_height - y)
+        if width > 0 and height > 0:
+            canvas_stride = stride_for(canvas_width)
+            blit(frame, self.stride, memoryview(canvas_bytes)[src_y * canvas_stride:], canvas_stride,
+                 width, height, x, y, src_x)
+
+        if self.rotation == 180:
+            rotate180(frame, self.panel_width, self.panel_height, self.invert)
+        elif self.invert:
+            translate(frame, INVERT)
+        return frame
@@ -0,0 +1,70 @@
+"""
+Configuration loading: 'config.json' merged with 'config_{hostname}.json'.
+"""
+import json
+import os
+import socket
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.json')
+# Checked-in template; config.json itself is per-installation and not in git
+EXAMPLE_CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.example.json')
+
+
+def host_config_names():
+    """Returns the hostnames that have a 'config_{hostname}.json' overlay."""
+    names = []
+    for filename in sorted(os.listdir(CONFIG_DIR)):
+        if filename.startswith('config_') and filename.endswith('.json'):
+            names.append(filename[len('config_'):-len('.json')])
+    return names
+
+
+def host_config_file(hostname=None):
+    """Path of the 'config_{hostname}.json' overlay (which may not exist)."""
+    if hostname is None:
+        hostname = socket.gethostname()
+    return os.path.join(CONFIG_DIR, f'config_{hostname}.json')
+
+
+def load_config(hostname=None, base_file=CONFIG_FILE):
+    """
+    Loads configuration by merging 'config.json' (or base_file) and 'config_{hostname}.json' (overlay).
+    Defaults to this machine's hostname.
+    """
+    base_config = {}
+    
+    # 1. Load Base Config
+    if os.path.exists(base_file):
+        with open(base_file, 'r') as f:
+            base_config = json.load(f)
+    else:
+        print(f"Warning: Base '{os.path.basename(base_file)}' not found. Using defaults.")
+    
+    # 2. Determine Hostname
+    if hostname is None:
+        hostname = socket.gethostname()
+    host_file = host_config_file(hostname)
+    
+    # 3. Load Host Specific Config
+    if os.path.exists(host_file):
+        print(f"Loading host-specific config: {host_file}")
+        with open(host_file, 'r') as f:
+            host_config = json.load(f)
+            # Merge host_config into base_config (Deep merge for 'messages' dict)
+            deep_merge(base_config, host_config)
+    else:
+        print(f"No host-specific config found for {hostname}. Using base config only.")
+        
+    return base_config
+
+
+def deep_merge(base, overlay):
+    """
+    Recursively merges overlay dict into base dict.
+    """
+    for key, value in overlay.items():
+        if isinstance(value, dict) and key in base and isinstance(base[key], dict):
+            deep_merge(base[key], value)
+        else:
+            base[key] = value
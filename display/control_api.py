@@ -0,0 +1,237 @@
+"""
+Small HTTP control plane for a hub.
+
+Runs an asyncio server in a background thread (localhost by default):
+
+    GET    /frame.png   the logical canvas last rendered, as PNG
+    GET    /timings     stage timings of the last loop iteration (ms)
+    GET    /state       current state key, message, readings and interval
+    POST   /override    {"text": "...", "font_id": 2, "duration": 600}
+    DELETE /override    drop the override
+
+The render loop only hands finished results to ControlState (reference
+swaps under a lock) and polls it for overrides; PNG encoding and all socket
+I/O happen on the server thread, so requests never block rendering or
+refreshing. Posting an override notifies the listeners (the hub schedules
+a refresh) so the message is shown right away instead of after the current
+interval.
+"""
+import asyncio
+import io
+import json
+import math
+import threading
+import time
+
+from PIL import Image
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8321
+DEFAULT_OVERRIDE_DURATION = 600
+MAX_OVERRIDE_DURATION = 7 * 24 * 3600
+MAX_BODY = 4096
+MAX_OVERRIDE_CHARS = 200
+
+STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 408: 'Request Timeout',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class ControlState:
+    """Shared between the render loop (writer) and the control server (reader)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None        # (packed canvas bytes, width, height, generation)
+        self._png = None          # (generation, png bytes)
+        self._generation = 0
+        self._timings = {}
+        self._state = {}
+        self._override = None
+        self.listeners = []  # called (from the server thread) when the override changes
+
+    # Render loop side
+
+    def publish_frame(self, canvas_bytes, width, height):
+        """
+        Keeps a reference to the packed canvas (must not be modified until it
+        is handed back) and returns the buffer it replaces, or None: from then
+        on the server no longer reads it, so the caller may reuse it.
+        """
+        with self._lock:
+            replaced = self._frame[0] if self._frame else None
+            self._generation += 1
+            self._frame = (canvas_bytes, width, height, self._generation)
+        return replaced
+
+    def publish(self, timings, **state):
+        state['updated_at'] = time.time()
+        with self._lock:
+            self._timings = dict(timings)
+            self._state = state
+
+    def override(self):
+        """Returns the active override {'text', 'font_id', 'expires'} or None."""
+        with self._lock:
+            if self._override and self._override['expires'] <= time.time():
+                self._override = None
+            return self._override
+
+    # Server side
+
+    def set_override(self, text, font_id=None, duration=DEFAULT_OVERRIDE_DURATION):
+        with self._lock:
+            self._override = {'text': text, 'font_id': font_id, 'expires': time.time() + duration}
+        self._notify()
+
+    def clear_override(self):
+        with self._lock:
+            self._override = None
+        self._notify()
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+
+    def frame_png(self):
+        """PNG of the last published frame, encoded once per frame. None before the first frame."""
+        with self._lock:
+            frame, png = self._frame, self._png
+            if frame is None:
+                return None
+            canvas_bytes, width, height, generation = frame
+            if png and png[0] == generation:
+                return png[1]
+            # Copied under the lock: once replaced, the buffer goes back to the render loop
+            canvas_bytes = bytes(canvas_bytes)
+        out = io.BytesIO()
+        Image.frombytes('1', (width, height), canvas_bytes).save(out, 'PNG')
+        data = out.getvalue()
+        with self._lock:
+            self._png = (generation, data)
+        return data
+
+    def snapshot(self):
+        with self._lock:
+            state = dict(self._state)
+            override = dict(self._override) if self._override else None
+            timings = dict(self._timings)
+        state['override'] = override
+        return state, timings
+
+
+class ControlServer:
+    def __init__(self, state, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.state = state
+        self.host = host
+        self.port = port
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config, state):
+        """Returns a server for the 'control_api' config section, or None if disabled."""
+        section = config.get('control_api', {})
+        if not section.get('enabled', True):
+            return None
+        return cls(state, section.get('host', DEFAULT_HOST), section.get('port', DEFAULT_PORT))
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='control-api', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            # The display keeps running without its control plane
+            print(f"Control API stopped: {e}")
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"Control API listening on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            status, content_type, body = await asyncio.wait_for(self._dispatch(reader), timeout=10)
+        except asyncio.TimeoutError:
+            status, content_type, body = 408, 'text/plain', b'timeout\n'
+        except Exception as e:
+            status, content_type, body = 500, 'text/plain', f'{e}\n'.encode()
+
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Cache-Control: no-store\r\n"
+                "Connection: close\r\n\r\n")
+        try:
+            writer.write(head.encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            return 400, 'text/plain', b'bad request\n'
+        method, path = request_line[0], request_line[1].split('?', 1)[0]
+
+        length = None
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                value = value.strip()
+                if not value.isdigit():
+                    return 400, 'text/plain', b'bad content-length\n'
+                length = int(value)
+        if length is None and method == 'POST':
+            return 400, 'text/plain', b'content-length required\n'
+        if length and length > MAX_BODY:
+            return 413, 'text/plain', b'body too large\n'
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            return 400, 'text/plain', b'body shorter than content-length\n'
+
+        if method == 'GET' and path == '/frame.png':
+            png = await asyncio.get_running_loop().run_in_executor(None, self.state.frame_png)
+            if png is None:
+                return 503, 'text/plain', b'no frame yet\n'
+            return 200, 'image/png', png
+        if method == 'GET' and path == '/timings':
+            return self._json(200, self.state.snapshot()[1])
+        if method == 'GET' and path == '/state':
+            return self._json(200, self.state.snapshot()[0])
+        if path == '/override':
+            if method == 'POST':
+                return self._post_override(body)
+            if method == 'DELETE':
+                self.state.clear_override()
+                return self._json(200, {'override': None})
+        return 404, 'text/plain', b'not found\n'
+
+    def _post_override(self, body):
+        try:
+            request = json.loads(body)
+            text = str(request['text'])
+            font_id = request.get('font_id')
+            font_id = int(font_id) if font_id is not None else None
+            duration = float(request.get('duration', DEFAULT_OVERRIDE_DURATION))
+        except (ValueError, KeyError, TypeError):
+            return self._json(400, {'error': 'expected {"text": str, "font_id": int, "duration": seconds}'})
+        # json accepts NaN and Infinity; neither would ever expire
+        if (not text or len(text) > MAX_OVERRIDE_CHARS
+                or not math.isfinite(duration) or not 0 < duration <= MAX_OVERRIDE_DURATION):
+            return self._json(400, {'error': f'text must be 1-{MAX_OVERRIDE_CHARS} characters, '
+                                             f'duration 0-{MAX_OVERRIDE_DURATION} seconds'})
+        self.state.set_override(text, font_id, duration)
+        return self._json(202, {'override': self.state.override()})
+
+    @staticmethod
+    def _json(status, payload):
+        return status, 'application/json', json.dumps(payload, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,174 @@
+"""
+Checks the panel driver core on a recording board (spi_recorder.py).
+
+    stream     init, display (landscape, portrait, wrong size), Clear,
+               Clear_Black, init_Part, partial windows on M, on S and across
+               the split, display_Partial, recover and sleep through
+               epd10in85.EPD; the recorded pin writes, delays and per
+               controller SPI bytes must equal epd10in85.stream line for
+               line. That file was recorded from the driver as it was before
+               PanelSpec/PanelDriver (Waveshare's EPD class with the batched
+               sequencer), so the shared core is held byte for byte to it.
+    bits       2, 4 and 8 bpp specs: packing of grey levels, the controller
+               split and partial windows across it
+    controllers a single-controller spec only selects and writes M, and a
+               controller epdconfig has no pins for is rejected
+
+    python3 driver_check.py [--record FILE]
+
+--record writes the stream of the driver found first on sys.path instead
+of checking it. Exits non-zero if any check fails.
+"""
+import argparse
+import os
+import sys
+
+from spi_recorder import open_board
+
+wire, epdconfig = open_board()
+
+from PIL import Image
+
+from waveshare_epd.epd10in85 import EPD
+
+STREAM_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'epd10in85.stream')
+WIDTH, HEIGHT = 1360, 480
+
+
+def pattern(length, seed):
+    return bytes((i * 37 + (i >> 7) + seed) & 0xFF for i in range(length))
+
+
+def exercise(epd):
+    """Drives every path of the 10.85" driver; the wire records it."""
+    landscape = Image.frombytes('1', (WIDTH, HEIGHT), pattern(WIDTH // 8 * HEIGHT, 0))
+    portrait = Image.frombytes('1', (HEIGHT, WIDTH), pattern(WIDTH // 8 * HEIGHT, 5))
+    epd.init()
+    epd.display(epd.getbuffer(landscape))
+    epd.Clear()
+    epd.Clear_Black()
+    epd.display(epd.getbuffer(portrait))
+    epd.display(epd.getbuffer(Image.new('1', (10, 10))))
+    epd.init_Part()
+    for seed, (x, width) in enumerate(((8, 200), (704, 160), (600, 240), (0, 1360), (672, 8), (680, 8))):
+        epd.display_region(pattern(width // 8 * 50, seed), x, 10, width, 50)
+    frame = pattern(WIDTH // 8 * HEIGHT, 9)
+    epd.display_region(memoryview(frame)[300 * 170 + 75:], 600, 300, 240, 40, stride=170)
+    epd.display_Partial(pattern(30 * 20, 3), 5, 5, 240, 25)
+    epd.recover()
+    epd.display_region(pattern(25 * 10, 4), 0, 0, 200, 10)
+    epd.sleep()
+
+
+def check_stream():
+    wire.clear()
+    exercise(EPD())
+    with open(STREAM_FILE) as f:
+        expected = [line.rstrip('\n') for line in f if not line.startswith('#')]
+    received = wire.stream()
+    for index, (got, want) in enumerate(zip(received, expected)):
+        if got != want:
+            raise AssertionError(f"event {index}: got '{got}', expected '{want}'")
+    if len(received) != len(expected):
+        raise AssertionError(f"{len(received)} events, expected {len(expected)}")
+    return f"{len(received)} events"
+
+
+def pack_reference(levels, width, height, bits):
+    """Packs grey levels (0 = black .. 2**bits - 1 = white) MSB first, pixel by pixel."""
+    per_byte = 8 // bits
+    out = bytearray()
+    for row in range(height):
+        for col in range(0, width, per_byte):
+            value = 0
+            for level in levels[row * width + col:row * width + col + per_byte]:
+                value = value << bits | level
+            out.append(value)
+    return bytes(out)
+
+
+def check_bits():
+    from waveshare_epd.epd_core import PanelDriver
+    from waveshare_epd.panel import PanelSpec
+
+    for bits in (2, 4, 8):
+        spec = PanelSpec(f'grey{bits}-check', 64, 4, controllers='MS', bits=bits)
+        driver = PanelDriver(spec)
+        stride, half = 64 * bits // 8, 32 * bits // 8
+        grey = bytes((i * 11) & 0xFF for i in range(64 * 4))
+        top = (1 << bits) - 1
+        packed = pack_reference([(value * top + 127) // 255 for value in grey], 64, 4, bits)
+        if spec.stride != stride or spec.frame_bytes != stride * 4:
+            raise AssertionError(f"{bits} bpp: stride {spec.stride}, frame_bytes {spec.frame_bytes}")
+        buffer = driver.getbuffer(Image.frombytes('L', (64, 4), grey))
+        if bytes(buffer) != packed:
+            raise AssertionError(f"{bits} bpp: packed {bytes(buffer).hex()}, expected {packed.hex()}")
+
+        wire.clear()
+        driver.display(buffer)
+        for index, side in enumerate('MS'):
+            rows = b''.join(packed[row * stride + index * half:row * stride + (index + 1) * half]
+                            for row in range(4))
+            data = [data for command, data in wire.received(side) if command == 0x13]
+            if data != [rows]:
+                raise AssertionError(f"{bits} bpp: controller {side} got {data}, expected {rows.hex()}")
+
+        # 16 pixels at x=24 cross the split at 32: 8 pixels per controller
+        window = pattern(16 * bits // 8 * 2, bits)
+        part = 8 * bits // 8
+        driver.init_Part()
+        wire.clear()
+        driver.display_region(window, 24, 1, 16, 2)
+        for side, x, first in (('M', 24, 0), ('S', 0, part)):
+            rows = b''.join(window[row * 2 * part + first:row * 2 * part + first + part] for row in range(2))
+            received = wire.received(side)
+            if (0x62, bytes((0, x, 0, 1))) not in received or (0x13, rows) not in received:
+                raise AssertionError(f"{bits} bpp: controller {side} window: {received}")
+    return "2, 4 and 8 bpp pack, split and window"
+
+
+def check_controllers():
+    from waveshare_epd.epd_core import PanelDriver
+    from waveshare_epd.panel import PanelSpec
+
+    driver = PanelDriver(PanelSpec('single-check', 64, 4, controllers='M'))
+    wire.clear()
+    driver.init()
+    driver.display(pattern(32, 2))
+    sides = {event[1] for event in wire.transfers()}
+    if sides != {'M'}:
+        raise AssertionError(f"single-controller panel wrote to {sorted(sides)}")
+    try:
+        PanelDriver(PanelSpec('unknown-check', 64, 4, controllers='MX'))
+    except ValueError:
+        return "single controller; unknown controller rejected"
+    raise AssertionError("controller X without CS_X_PIN was accepted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--record', metavar='FILE', help="write the driver's stream to FILE instead of checking")
+    args = parser.parse_args()
+
+    if args.record:
+        exercise(EPD())
+        lines = wire.stream()
+        with open(args.record, 'w') as f:
+            f.write("# driver_check.py stream: pin writes, delays and SPI bytes per controller\n"
+                    "# (payloads above 16 bytes as length and sha1 prefix)\n")
+            f.write('\n'.join(lines) + '\n')
+        print(f"{len(lines)} events recorded to {args.record}")
+        return 0
+
+    failed = 0
+    for name, check in (('stream', check_stream), ('bits', check_bits), ('controllers', check_controllers)):
+        try:
+            print(f"ok    {name}: {check()}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {name}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Builds per-host subset fonts.
+
+Scans every message configured for a host (config.json merged with
+config_{hostname}.json) plus the fixed strings drawn by main.py, and writes
+fonts containing only those glyphs (and printable ASCII for the status line)
+to font_subsets/<hostname>/, with a manifest.json that fonts.py reads at
+startup. Run it on the hub after changing messages:
+
+    python3 font_subset.py [hostname ...]
+
+Without arguments it builds every host that has a config overlay and this
+machine's hostname. Requires fontTools (pip install fonttools).
+"""
+import json
+import os
+import shutil
+import socket
+import sys
+
+from config_loader import host_config_names, load_config
+from fonts import FONT_MAP, SUBSET_ROOT, SYSTEM_FONT_PATH
+from render import DEV_MODE_TEXT
+
+# Text drawn by the hub that does not come from the messages config
+FALLBACK_TEXT = ["...", "Format Error"]
+ASCII = ''.join(chr(c) for c in range(0x20, 0x7F))
+# Status line and startup grid use the system font
+STATUS_FONT_ID = 1
+
+
+def message_chars(config):
+    """Returns {font_id: set of characters} for every message in config."""
+    default_font_id = config.get('default_font_id', 1)
+    chars = {}
+
+    def add(font_id, text):
+        chars.setdefault(font_id, set()).update(text.replace('\n', ''))
+
+    for options in config.get('messages', {}).values():
+        if isinstance(options, (str, dict)):
+            options = [options]
+        for option in options:
+            if isinstance(option, str):
+                add(default_font_id, option)
+            elif isinstance(option, dict):
+                add(option.get('font_id', default_font_id), option.get('text', ''))
+
+    for text in FALLBACK_TEXT:
+        add(default_font_id, text)
+    add(1, DEV_MODE_TEXT)
+    add(STATUS_FONT_ID, ASCII + config.get('target_ssid', ''))
+
+    for font_chars in chars.values():
+        font_chars.update(ASCII)
+    return chars
+
+
+def subset_font(source, chars, output):
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    # Collections: take the first face, as ImageFont.truetype does by default
+    font = TTFont(source, fontNumber=0 if source.lower().endswith(('.ttc', '.otc')) else -1)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=[ord(ch) for ch in chars])
+    subsetter.subset(font)
+    font.save(output)
+    font.close()
+
+
+def build(hostname):
+    config = load_config(hostname)
+    host_dir = os.path.join(SUBSET_ROOT, hostname)
+    if os.path.isdir(host_dir):
+        shutil.rmtree(host_dir)
+    os.makedirs(host_dir)
+
+    manifest = {'hostname': hostname, 'fonts': {}}
+    for font_id, chars in sorted(message_chars(config).items()):
+        source = FONT_MAP.get(font_id, SYSTEM_FONT_PATH)
+        if not os.path.exists(source):
+            print(f"  font {font_id}: {source} not found, skipped")
+            continue
+        # Collections are written out as a single font
+        ext = '.otf' if source.lower().endswith(('.ttc', '.otc')) else os.path.splitext(source)[1]
+        filename = f"font_{font_id}{ext}"
+        subset_font(source, chars, os.path.join(host_dir, filename))
+
+        size = os.path.getsize(os.path.join(host_dir, filename))
+        print(f"  font {font_id}: {len(chars)} glyphs, "
+              f"{os.path.getsize(source) // 1024} kB -> {size // 1024} kB")
+        manifest['fonts'][str(font_id)] = {
+            'source': os.path.basename(source),
+            'file': filename,
+            'chars': ''.join(sorted(chars)),
+        }
+
+    with open(os.path.join(host_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    try:
+        import fontTools  # noqa: F401
+    except ImportError:
+        print("fontTools is required: pip install fonttools")
+        return 1
+
+    hostnames = sys.argv[1:]
+    if not hostnames:
+        hostnames = host_config_names()
+        if socket.gethostname() not in hostnames:
+            hostnames.append(socket.gethostname())
+
+    for hostname in hostnames:
+        print(f"Building font subsets for {hostname}")
+        build(hostname)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Font lookup and caching.
+
+Font IDs from config map to font files. When 'font_subset.py' has built
+subset fonts for this host, those small files are loaded instead of the
+full fonts (falling back to the full font for text the subset does not
+cover). FreeType faces are kept in a bounded LRU cache.
+"""
+import json
+import os
+import socket
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+SYSTEM_FONT_PATH = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FONTS_DIR = os.path.join(PROJECT_ROOT, 'fonts')
+SUBSET_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'font_subsets')
+
+FONT_MAP = {
+    1: SYSTEM_FONT_PATH,
+    2: os.path.join(FONTS_DIR, "GmarketSansTTFBold.ttf"),
+    3: os.path.join(FONTS_DIR, "GmarketSansTTFMedium.ttf"),
+    4: os.path.join(FONTS_DIR, "GmarketSansTTFLight.ttf"),
+    5: os.path.join(FONTS_DIR, "RIDIBatang.otf")
+}
+
+DEFAULT_FONT_CACHE_SIZE = 24
+
+
+class FontCache:
+    """LRU cache of FreeType faces keyed by (font_path, size)."""
+
+    def __init__(self, max_size=DEFAULT_FONT_CACHE_SIZE):
+        self.fonts = OrderedDict()
+        self.max_size = max_size
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+        # A lower limit (config reload) takes effect now, not on the next insert
+        self._max_size = max_size
+        self._evict()
+
+    def _evict(self):
+        while len(self.fonts) > self._max_size:
+            self.fonts.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.fonts
+
+    def __getitem__(self, key):
+        self.fonts.move_to_end(key)
+        return self.fonts[key]
+
+    def __setitem__(self, key, font):
+        self.fonts[key] = font
+        self.fonts.move_to_end(key)
+        self._evict()
+
+    def __len__(self):
+        return len(self.fonts)
+
+
+class SubsetFonts:
+    """Per-host subset fonts listed in font_subsets/<hostname>/manifest.json."""
+
+    def __init__(self, hostname=None):
+        self.subsets = {}  # full font path -> (subset path, covered characters)
+        host_dir = os.path.join(SUBSET_ROOT, hostname or socket.gethostname())
+        manifest_file = os.path.join(host_dir, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            return
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+        for font_id, entry in manifest.get('fonts', {}).items():
+            source = FONT_MAP.get(int(font_id))
+            path = os.path.join(host_dir, entry['file'])
+            if source and os.path.exists(path):
+                self.subsets[source] = (path, frozenset(entry['chars']))
+
+    def resolve(self, font_path, text=None):
+        """Returns the subset path for font_path if it covers text, else font_path."""
+        subset = self.subsets.get(font_path)
+        if subset is None:
+            return font_path
+        path, chars = subset
+        if text and not chars.issuperset(text.replace('\n', '')):
+            return font_path
+        return path
+
+
+# Global Font Cache
+FONT_CACHE = FontCache()
+FONT_SUBSETS = SubsetFonts()
+
+
+def get_font_path(font_id, text=None):
+    """Returns the path to load for the given font ID (and text, if known)."""
+    return FONT_SUBSETS.resolve(FONT_MAP.get(font_id, SYSTEM_FONT_PATH), text)
+
+
+def load_font(size, font_path):
+    """Returns a cached FreeType font. Raises IOError if it cannot be loaded."""
+    key = (font_path, size)
+    if key in FONT_CACHE:
+        return FONT_CACHE[key]
+
+    font = ImageFont.truetype(font_path, size)
+    FONT_CACHE[key] = font
+    return font
+
+
+def get_font(size, font_path=None):
+    if font_path is None:
+        font_path = FONT_SUBSETS.resolve(SYSTEM_FONT_PATH)
+
+    try:
+        return load_font(size, font_path)
+    except IOError:
+        # Fallback to default if custom font not found
+        return ImageFont.load_default()
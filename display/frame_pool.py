@@ -0,0 +1,66 @@
+"""
+Pool of reusable frame buffers and canvases.
+
+The display loop runs every few seconds for months on a 512 MB Pi Zero, so
+the render, pack and upload stages borrow their large buffers from here and
+hand them back instead of allocating new PIL images and byte lists on every
+iteration. After the first loop the pool only hands out existing objects.
+"""
+from PIL import Image, ImageDraw
+
+WHITE = 0xFF
+
+
+class FramePool:
+    def __init__(self):
+        self._buffers = {}   # size -> [bytearray, ...]
+        self._canvases = {}  # (width, height) -> [(image, draw), ...]
+        self._blank = {}     # size -> white bytes used to clear buffers
+        self.created = 0
+        self.reused = 0
+
+    def buffer(self, size, clear=False):
+        """Borrows a bytearray of the given size (white-filled if clear)."""
+        free = self._buffers.get(size)
+        if free:
+            buf = free.pop()
+            self.reused += 1
+            if clear:
+                memoryview(buf)[:] = self._white(size)
+        else:
+            buf = bytearray(self._white(size))
+            self.created += 1
+        return buf
+
+    def release(self, buf):
+        self._buffers.setdefault(len(buf), []).append(buf)
+
+    def canvas(self, width, height):
+        """Borrows a white mode '1' canvas and its ImageDraw."""
+        free = self._canvases.get((width, height))
+        if free:
+            image, draw = free.pop()
+            image.paste(255, (0, 0, width, height))
+            self.reused += 1
+        else:
+            image = Image.new('1', (width, height), 255)
+            draw = ImageDraw.Draw(image)
+            self.created += 1
+        return image, draw
+
+    def release_canvas(self, image, draw):
+        self._canvases.setdefault(image.size, []).append((image, draw))
+
+    def _white(self, size):
+        blank = self._blank.get(size)
+        if blank is None:
+            blank = self._blank[size] = bytes([WHITE]) * size
+        return blank
+
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'free_buffers': sum(len(v) for v in self._buffers.values()),
+            'free_canvases': sum(len(v) for v in self._canvases.values()),
+        }
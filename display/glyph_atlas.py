@@ -0,0 +1,130 @@
+"""
+Bounded cache of rasterized glyphs.
+
+Drawing a message with draw.text rasterizes every Hangul glyph through
+FreeType again, at 60-100 px, on every refresh. The atlas keeps each glyph
+as a 1-bit mask plus its metrics, keyed by (font path, size, codepoint),
+and composites lines from cached masks. Text that needs real shaping
+(combining marks, conjoining jamo, complex scripts) is left to PIL.
+"""
+import unicodedata
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+MAX_KERNING_PAIRS = 4096
+
+# Scripts whose rendering depends on neighbouring characters
+SHAPING_RANGES = (
+    (0x0590, 0x08FF),   # Hebrew, Arabic, Syriac, ...
+    (0x0900, 0x0DFF),   # Indic
+    (0x0E00, 0x0EFF),   # Thai, Lao
+    (0x1100, 0x11FF),   # Hangul conjoining jamo
+    (0xA960, 0xA97F),   # Hangul jamo extended-A
+    (0xD7B0, 0xD7FF),   # Hangul jamo extended-B
+    (0xFB1D, 0xFEFF),   # Presentation forms
+)
+
+
+def needs_shaping(text):
+    for ch in text:
+        code = ord(ch)
+        if unicodedata.category(ch).startswith('M'):
+            return True
+        for start, end in SHAPING_RANGES:
+            if start <= code <= end:
+                return True
+    return False
+
+
+class Glyph:
+    __slots__ = ('mask', 'offset_x', 'offset_y', 'advance', 'size_bytes')
+
+    def __init__(self, mask, offset_x, offset_y, advance):
+        self.mask = mask
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.advance = advance
+        self.size_bytes = mask.size[0] * mask.size[1] if mask else 0
+
+
+class GlyphAtlas:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.glyphs = OrderedDict()
+        self.kerning = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def glyph(self, font, font_path, size, ch):
+        key = (font_path, size, ord(ch))
+        glyph = self.glyphs.get(key)
+        if glyph is not None:
+            self.glyphs.move_to_end(key)
+            self.hits += 1
+            return glyph
+
+        self.misses += 1
+        left, top, right, bottom = font.getbbox(ch)
+        mask = None
+        if right > left and bottom > top:
+            mask = Image.new('1', (right - left, bottom - top), 0)
+            ImageDraw.Draw(mask).text((-left, -top), ch, font=font, fill=1)
+        glyph = Glyph(mask, left, top, font.getlength(ch))
+
+        self.glyphs[key] = glyph
+        self.bytes += glyph.size_bytes
+        while self.bytes > self.max_bytes and len(self.glyphs) > 1:
+            _, evicted = self.glyphs.popitem(last=False)
+            self.bytes -= evicted.size_bytes
+        return glyph
+
+    def kern(self, font, font_path, size, left, right):
+        """Pair adjustment (in pixels) between two consecutive characters."""
+        key = (font_path, size, left, right)
+        value = self.kerning.get(key)
+        if value is None:
+            value = (font.getlength(left + right)
+                     - self.glyph(font, font_path, size, left).advance
+                     - self.glyph(font, font_path, size, right).advance)
+            self.kerning[key] = value
+            if len(self.kerning) > MAX_KERNING_PAIRS:
+                self.kerning.popitem(last=False)
+        return value
+
+    def draw_text(self, draw, xy, text, font, font_path, size, fill=0):
+        """
+        Draws a single line like draw.text(xy, text) from cached glyphs.
+        Returns False (drawing nothing) if the text needs shaping; the
+        caller should then fall back to draw.text.
+        """
+        if '\n' in text or needs_shaping(text):
+            self.fallbacks += 1
+            return False
+
+        x, y = xy
+        pen = 0.0
+        previous = None
+        for ch in text:
+            if previous is not None:
+                pen += self.kern(font, font_path, size, previous, ch)
+            previous = ch
+            glyph = self.glyph(font, font_path, size, ch)
+            if glyph.mask is not None:
+                draw.bitmap((x + round(pen) + glyph.offset_x, y + glyph.offset_y), glyph.mask, fill=fill)
+            pen += glyph.advance
+        return True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.glyphs),
+            'bytes': self.bytes,
+            'kerning_pairs': len(self.kerning),
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'fallbacks': self.fallbacks,
+        }
@@ -0,0 +1,228 @@
+"""
+Checks and benchmarks the GPIO backends epdconfig can use.
+
+    python3 gpio_bench.py [--toggles 100000] [--real] [--chip 0] [--check]
+
+Without --real the gpiochip backend runs against FakeChip, a stand-in for
+the lgpio module that keeps line state in memory, and gpiozero (if it is
+installed) runs on its MockFactory; the numbers are then the Python
+dispatch overhead per toggle. On the Pi, --real uses /dev/gpiochipN and
+gpiozero's default pin factory, which adds the kernel round trip.
+
+Either way each backend is first checked, on its own pins: writes land on
+the right line, reads (including RST/DC/PWR) return the level and, on
+FakeChip, each write is one chip call and close frees every line. The
+checks print ok/FAIL and any failure exits non-zero; only the backends
+that pass are then timed, unless --check is given.
+"""
+import argparse
+import os
+import sys
+import time
+
+lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+if os.path.exists(lib_path):
+    sys.path.append(lib_path)
+
+from waveshare_epd.gpio_backend import GpiochipPins, GpiozeroPins
+
+# epdconfig.RaspberryPi pins
+RST_PIN = 17
+DC_PIN = 25
+PWR_PIN = 18
+BUSY_PIN = 24
+OUTPUTS = (RST_PIN, DC_PIN, PWR_PIN)
+INPUTS = (BUSY_PIN,)
+
+
+class FakeChip:
+    """The subset of the lgpio module GpiochipPins uses, on an in-memory chip."""
+
+    SET_PULL_DOWN = 64
+
+    def __init__(self):
+        self.open_handles = set()
+        self.claimed = {}     # line -> 'out' / 'in'
+        self.levels = {}
+        self.writes = 0
+
+    def gpiochip_open(self, chip):
+        handle = len(self.open_handles) + 1
+        self.open_handles.add(handle)
+        return handle
+
+    def gpiochip_close(self, handle):
+        self.open_handles.discard(handle)
+
+    def _check(self, handle, line):
+        if handle not in self.open_handles:
+            raise RuntimeError("bad handle")
+        if line not in self.claimed:
+            raise RuntimeError(f"GPIO {line} not claimed")
+
+    def gpio_claim_output(self, handle, line, level=0, flags=0):
+        if line in self.claimed:
+            raise RuntimeError(f"GPIO {line} busy")
+        self.claimed[line] = 'out'
+        self.levels[line] = level
+
+    def gpio_claim_input(self, handle, line, flags=0):
+        if line in self.claimed:
+            raise RuntimeError(f"GPIO {line} busy")
+        self.claimed[line] = 'in'
+        self.levels[line] = 0
+
+    def gpio_free(self, handle, line):
+        self._check(handle, line)
+        del self.claimed[line]
+
+    def gpio_write(self, handle, line, level):
+        self._check(handle, line)
+        if self.claimed[line] != 'out':
+            raise RuntimeError(f"GPIO {line} is an input")
+        self.levels[line] = level
+        self.writes += 1
+        return 0
+
+    def gpio_read(self, handle, line):
+        self._check(handle, line)
+        return self.levels[line]
+
+
+def check(pins, set_input=None):
+    """Exercises a backend; set_input(pin, level) drives an input from outside."""
+    for pin in OUTPUTS:
+        for level in (1, 0, 1):
+            pins.writers[pin](level)
+            if int(pins.readers[pin]()) != level:
+                raise AssertionError(f"{pins.name}: GPIO {pin} reads {pins.readers[pin]()} after writing {level}")
+    if set_input:
+        for level in (1, 0):
+            set_input(BUSY_PIN, level)
+            if int(pins.readers[BUSY_PIN]()) != level:
+                raise AssertionError(f"{pins.name}: BUSY reads {pins.readers[BUSY_PIN]()}, expected {level}")
+
+
+def bench(write, toggles):
+    started = time.perf_counter()
+    for _ in range(toggles // 2):
+        write(0)
+        write(1)
+    return (time.perf_counter() - started) / toggles * 1e6
+
+
+def legacy_dispatch(leds):
+    """The if/elif chain epdconfig.digital_write used over gpiozero LEDs."""
+    rst, dc, pwr = leds
+
+    def digital_write(pin, value):
+        if pin == RST_PIN:
+            if value:
+                rst.on()
+            else:
+                rst.off()
+        elif pin == DC_PIN:
+            if value:
+                dc.on()
+            else:
+                dc.off()
+        elif pin == PWR_PIN:
+            if value:
+                pwr.on()
+            else:
+                pwr.off()
+    return digital_write
+
+
+def check_gpiochip(args):
+    if args.real:
+        pins = GpiochipPins(OUTPUTS, INPUTS, args.chip)
+        try:
+            check(pins)
+        finally:
+            pins.close()
+        return "writes and reads"
+    chip = FakeChip()
+    pins = GpiochipPins(OUTPUTS, INPUTS, args.chip, lgpio=chip)
+    try:
+        check(pins, set_input=chip.levels.__setitem__)
+        # Claimed once, writes reach the chip one call each
+        writes = chip.writes
+        pins.writers[DC_PIN](1)
+        if chip.writes != writes + 1:
+            raise AssertionError(f"gpiochip: one write made {chip.writes - writes} chip calls")
+    finally:
+        pins.close()
+    if chip.claimed or chip.open_handles:
+        raise AssertionError(f"gpiochip: GPIO {sorted(chip.claimed)} left claimed after close")
+    return "writes, reads, one chip call per write, close frees the lines"
+
+
+def check_gpiozero(args, gpiozero):
+    pins = GpiozeroPins(OUTPUTS, INPUTS, gpiozero=gpiozero)
+    set_input = None
+    if not args.real:
+        def set_input(pin, level):
+            mock = gpiozero.Device.pin_factory.pin(pin)
+            mock.drive_high() if level else mock.drive_low()
+    try:
+        check(pins, set_input)
+    finally:
+        pins.close()
+    return "writes and reads"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--toggles', type=int, default=100000)
+    parser.add_argument('--real', action='store_true', help="use the real chip and gpiozero pin factory")
+    parser.add_argument('--chip', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help="only run the checks")
+    args = parser.parse_args()
+
+    try:
+        import gpiozero
+    except ImportError:
+        gpiozero = None
+        print("gpiozero is not installed, skipping it")
+    if gpiozero is not None and not args.real:
+        from gpiozero.pins.mock import MockFactory
+        gpiozero.Device.pin_factory = MockFactory()
+
+    checks = [('gpiochip', lambda: check_gpiochip(args))]
+    if gpiozero is not None:
+        checks.append(('gpiozero', lambda: check_gpiozero(args, gpiozero)))
+    passed = set()
+    for name, run in checks:
+        try:
+            print(f"ok    {name}: {run()}")
+            passed.add(name)
+        except AssertionError as e:
+            print(f"FAIL  {e}")
+    failed = len(passed) != len(checks)
+    if args.check:
+        return 1 if failed else 0
+
+    results = []
+    if 'gpiochip' in passed:
+        pins = GpiochipPins(OUTPUTS, INPUTS, args.chip, lgpio=None if args.real else FakeChip())
+        writers = pins.writers
+        results.append(('gpiochip', bench(lambda value: writers[DC_PIN](value), args.toggles)))
+        pins.close()
+    if 'gpiozero' in passed:
+        pins = GpiozeroPins(OUTPUTS, INPUTS, gpiozero=gpiozero)
+        writers = pins.writers
+        results.append(('gpiozero', bench(lambda value: writers[DC_PIN](value), args.toggles)))
+        leds = [device for device in pins.devices if isinstance(device, gpiozero.LED)]
+        legacy = legacy_dispatch(leds)
+        results.append(('gpiozero if/elif', bench(lambda value: legacy(DC_PIN, value), args.toggles)))
+        pins.close()
+
+    print(f"\n{'backend':<18} {'us/toggle':>10}")
+    for name, us in results:
+        print(f"{name:<18} {us:>10.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Per-stage deadlines and recovery bookkeeping for the hub.
+
+Every blocking stage (SSID lookup, sensor read, backfill, panel refresh)
+runs on an executor thread under a deadline. A miss raises StageTimeout
+right away, so the hub can recover in-process (abort the busy wait, reset
+the panel, replace a wedged executor, reconnect the sensor) instead of
+waiting for systemd's WatchdogSec to kill the process. Every failure (a
+missed deadline or an error) and every recovery is recorded; a stage that
+keeps failing within the window, or whose recovery fails, escalates to a
+process restart.
+"""
+import asyncio
+import json
+import os
+import time
+
+DEFAULT_DEADLINES = {
+    'ssid': 10,
+    'sensor': 20,
+    'backfill': 30,
+    'render': 10,
+    'panel': 45,
+    'panel_recovery': 30,
+}
+DEFAULT_MAX_RECOVERIES = 3
+DEFAULT_WINDOW = 3600
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'health.log')
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage, elapsed, future):
+        super().__init__(f"stage '{stage}' missed its deadline ({elapsed:.1f}s)")
+        self.stage = stage
+        self.elapsed = elapsed
+        self.future = future  # still running on its executor thread
+
+
+class HealthMonitor:
+    def __init__(self, deadlines=None, max_recoveries=DEFAULT_MAX_RECOVERIES,
+                 window=DEFAULT_WINDOW, log_path=DEFAULT_LOG_FILE, clock=time.monotonic):
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        self.deadlines.update(deadlines or {})
+        self.max_recoveries = max_recoveries
+        self.window = window
+        self.log_path = log_path
+        self.clock = clock
+        self.failures = {}    # stage -> [failure times within the window]
+        self.last_ms = {}     # stage -> duration of the last completed run
+        self.recoveries = 0
+        self.last_failure = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a monitor from the optional 'health' config section."""
+        options = config.get('health', {})
+        return cls(
+            deadlines=options.get('deadlines'),
+            max_recoveries=options.get('max_recoveries', DEFAULT_MAX_RECOVERIES),
+            window=options.get('window', DEFAULT_WINDOW),
+            log_path=options.get('log_file', DEFAULT_LOG_FILE),
+        )
+
+    async def run(self, stage, executor, fn, *args):
+        """
+        Runs fn(*args) on executor under the stage deadline. Raises
+        StageTimeout on a miss; the call itself keeps running (threads
+        cannot be cancelled), StageTimeout.future tracks it.
+        """
+        future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        started = self.clock()
+        done, _ = await asyncio.wait({future}, timeout=self.deadlines.get(stage))
+        elapsed = self.clock() - started
+        if not done:
+            self.record_failure(stage, 'deadline_miss', f"{elapsed:.1f}s")
+            raise StageTimeout(stage, elapsed, future)
+        self.last_ms[stage] = elapsed * 1000
+        return future.result()
+
+    def check(self, stage, elapsed):
+        """Records a stage that ran on the event loop itself (it cannot be interrupted)."""
+        self.last_ms[stage] = elapsed * 1000
+        deadline = self.deadlines.get(stage)
+        if deadline is not None and elapsed > deadline:
+            self.record_failure(stage, 'deadline_miss', f"{elapsed:.1f}s")
+            return False
+        return True
+
+    def record_failure(self, stage, kind, detail=None):
+        """kind is 'deadline_miss' or 'error'."""
+        now = self.clock()
+        failures = [t for t in self.failures.get(stage, []) if now - t < self.window]
+        failures.append(now)
+        self.failures[stage] = failures
+        self.last_failure = {'stage': stage, 'kind': kind, 'detail': detail, 'time': time.time()}
+        self.log(kind, stage, detail)
+
+    def record_recovery(self, stage, ok, detail=None):
+        self.recoveries += 1
+        self.log('recovered' if ok else 'recovery_failed', stage, detail)
+
+    def should_restart(self, stage):
+        """True once a stage has failed more often than max_recoveries within the window."""
+        return len(self.failures.get(stage, [])) > self.max_recoveries
+
+    def last_restart(self):
+        """The 'restart' record written by the previous process, if that is how it ended."""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return None
+        with open(self.log_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().decode('utf-8', 'replace').splitlines()
+        try:
+            record = json.loads(lines[-1]) if lines else None
+        except ValueError:
+            return None
+        return record if record and record.get('event') == 'restart' else None
+
+    def log(self, event, stage, detail=None):
+        print(f"Health: {event} in stage '{stage}'" + (f": {detail}" if detail else ""))
+        record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'event': event, 'stage': stage, 'detail': detail}
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"Could not write health log: {e}")
+
+    def stats(self):
+        return {
+            'last_ms': {stage: round(ms, 1) for stage, ms in self.last_ms.items()},
+            'failures': {stage: len(times) for stage, times in self.failures.items() if times},
+            'recoveries': self.recoveries,
+            'last_failure': self.last_failure,
+        }
+
+
+def restart_process(monitor, stage, reason):
+    """Last resort: exit so systemd (Restart=always) starts a fresh process."""
+    monitor.log('restart', stage, reason)
+    # Wedged executor threads would block a normal interpreter shutdown
+    os._exit(1)
@@ -0,0 +1,650 @@
+"""
+Event-driven core of the display hub.
+
+Independent asyncio tasks replace the old blocking main loop:
+
+    sensor    reads SSID + sensor node at the scheduler's interval and
+              requests a refresh after every reading
+    render    waits for refresh requests, renders and composes on the event
+              loop and hands panel work to a single SPI executor thread
+    config    reloads config.json / config_{hostname}.json when they change
+    watchdog  pings systemd only while the other tasks make progress
+
+Every blocking stage runs under a deadline from health.HealthMonitor. A
+miss is recovered in-process (panel reset, fresh executor, new sensor
+client) within seconds; only repeated failures restart the process.
+
+At startup (startup.py) the panel is brought up on its own thread while
+fonts and icons load and the first reading is taken; the first refresh
+only waits for the panel before its SPI work.
+
+Blocking network calls run on a small I/O executor, so a slow sensor never
+delays a refresh and vice versa. Refresh requests are coalesced: anything
+that changes while a refresh is running (a reading, an override from the
+control API, a config reload) causes exactly one more refresh right after
+it, so the latency from a change to refresh start is bounded by one panel
+refresh.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config_loader import CONFIG_FILE, host_config_file, load_config
+from state_classifier import StateClassifier
+from scheduler import AdaptiveScheduler
+from sensor_client import SensorClient
+from backfill import BackfillClient, ReadingHistory, DEFAULT_HISTORY_SIZE
+from status_bar import StatusBar
+from compositor import Compositor, pack, stride_for
+from frame_pool import FramePool
+from layout import BubbleLayout
+from control_api import ControlState, ControlServer
+from health import HealthMonitor, StageTimeout, restart_process
+from sensor_trace import TraceRecorder
+from sensor_stats import SensorStats
+from loop_profile import LoopProfiler
+from fonts import FONT_CACHE, get_font_path, get_font
+from render import (GLYPH_ATLAS, LOG_FONT_SIZE, MAX_FONT_SIZE, DEV_MODE_FONT_SIZE, DEV_MODE_TEXT,
+                    get_state_keys, pick_message, draw_message, draw_centered_text)
+
+WATCHDOG_PING_INTERVAL = 20  # Must stay well below WatchdogSec in eplantalk.service
+CONFIG_POLL_INTERVAL = 5
+SENSOR_GRACE = 30            # Seconds a sensor poll may run past its interval
+SSID_TIMEOUT = 5
+PANEL_ABORT_WAIT = 1         # Time for a refresh stuck in ReadBusy to notice the abort
+DEMO_AFTER_FAILURES = 5
+
+# Values that select 'normal_bright' in demo mode (normal 0.3 ~ 1.5, bright > 1.5)
+DEMO_MOISTURE = 0.8
+DEMO_LIGHT = 2.0
+
+
+def systemd_notify(message):
+    """Notify systemd using the NOTIFY_SOCKET environment variable."""
+    notify_socket = os.environ.get('NOTIFY_SOCKET')
+    if not notify_socket:
+        return
+
+    if notify_socket.startswith('@'):
+        notify_socket = '\0' + notify_socket[1:]
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.connect(notify_socket)
+        sock.sendall(message.encode('utf-8'))
+        sock.close()
+    except Exception as e:
+        print(f"Failed to notify systemd: {e}")
+
+
+def get_wifi_ssid():
+    try:
+        # iwgetid -r prints only the SSID
+        ssid = subprocess.check_output(['iwgetid', '-r'], timeout=SSID_TIMEOUT).decode('utf-8').strip()
+        if not ssid:
+            return "No WiFi"
+        return ssid
+    except Exception:
+        return "WiFi Error"
+
+
+class Hub:
+    def __init__(self, config, epd=None, panel_size=(1360, 480), hostname=None, spi_profiler=None,
+                 clock=time.monotonic, startup=None, spi=None, wall_clock=time.time):
+        self.epd = epd
+        # Optional startup.Startup: panel bring-up still running, time-to-first-frame milestones
+        self.startup = startup
+        self.panel_bring_up = startup.panel if startup else None
+        self.panel_fresh = False  # just initialized by the bring-up, no re-init needed
+        self.warmed_up = None
+        # Monotonic time for state dwell and sensor progress (replay.py passes a virtual clock)
+        self.clock = clock
+        # Wall-clock time for history timestamps (replay.py passes the trace's time)
+        self.wall_clock = wall_clock
+        self.read_ssid = get_wifi_ssid
+        # Optional SpiProfiler; per-command SPI stats of the last refresh
+        self.spi_profiler = spi_profiler
+        self.spi_stats = None
+        # Bounded cProfile/sampling sessions on SIGUSR1 or a request file
+        self.profiler = LoopProfiler.from_config(config, self)
+        self.panel_size = panel_size
+        self.hostname = hostname or socket.gethostname()
+
+        # All panel (SPI/GPIO) work happens on one thread, in order; main.py
+        # passes the executor the startup bring-up was submitted to
+        self.spi = spi or ThreadPoolExecutor(max_workers=1, thread_name_prefix='spi')
+        # Sensor HTTP, iwgetid and backfill
+        self.io = ThreadPoolExecutor(max_workers=2, thread_name_prefix='io')
+
+        # Canvases and frame buffers are reused across refreshes
+        self.frame_pool = FramePool()
+
+        # Local reading history, backfilled from the node's buffer after reconnects
+        self.history = ReadingHistory(
+            config.get('backfill', {}).get('history_size', DEFAULT_HISTORY_SIZE),
+            config.get('backfill', {}).get('history_file'),
+        )
+
+        # Local control plane: frame preview, timings, state and message overrides
+        self.control_state = ControlState()
+
+        # Latest reading and what it maps to
+        self.ssid = ""
+        self.is_match = False
+        self.connected = False
+        self.simulating = False
+        self.moisture = 0
+        self.light = 0
+        self.failures = 0
+        self.current_state = None
+        self.message_data = None
+        self.demo_state = None
+        self.demo_message = None
+
+        # Refresh bookkeeping
+        self.last_frame = None
+        self.last_text = None
+        self.timings = {}
+
+        # Stage deadlines and recovery; the watchdog task also checks sensor progress
+        self.health = HealthMonitor.from_config(config)
+        self.last_sensor_poll = self.clock()
+
+        # Created in run(), on the event loop
+        self.refresh_requested = None
+        self.poll_requested = None
+        self.busy = None  # held while refreshing or applying config
+
+        self.apply_config(config)
+
+    def apply_config(self, config):
+        """(Re)builds everything derived from config. Display state starts over."""
+        self.config = config
+        self.display_width = config.get('display_width', 1360)
+        self.display_height = config.get('display_height', 480)
+        self.show_log_messages = config.get('show_log_messages', True)
+        self.sensor_ip = config.get('sensor_ip', '192.168.4.1')
+
+        # Hysteresis-aware state tracking: the message is only re-picked when
+        # the classified state changes, and identical frames are not re-sent.
+        self.classifier = StateClassifier.from_config(config)
+        self.current_state = None
+        self.message_data = None
+
+        # Status line fields are refreshed through partial windows
+        self.status_bar = StatusBar.from_config(config, self.panel_size)
+
+        # Packed-domain frame assembly (no full-size PIL image per refresh)
+        self.compositor = Compositor.from_config(config, self.panel_size)
+        self.frame_size = self.compositor.stride * self.panel_size[1]
+
+        GLYPH_ATLAS.max_bytes = config.get('glyph_atlas_bytes', GLYPH_ATLAS.max_bytes)
+        FONT_CACHE.max_size = config.get('font_cache_size', FONT_CACHE.max_size)
+
+        # Speech bubble + state icons; icons are dithered once and cached on disk
+        self.layout = BubbleLayout.from_config(config, (self.display_width, self.display_height))
+
+        # Sensor reads go through a circuit breaker so a dead node never stalls the hub
+        self.sensor_client = SensorClient.from_config(config)
+        self.backfill = BackfillClient.from_config(config)
+
+        # Sampling period adapts to stability, night and watering
+        self.scheduler = AdaptiveScheduler.from_config(config)
+
+        # Rolling window statistics and stuck / out-of-range / watering flags
+        self.sensor_stats = SensorStats.from_config(config)
+
+        # Optional per-poll sensor trace for replay.py
+        self.trace = TraceRecorder.from_config(config, self.hostname)
+
+        # The next refresh is a full one
+        if self.last_frame is not None:
+            self.frame_pool.release(self.last_frame)
+        self.last_frame = None
+        self.last_text = None
+
+    def ssid_matches(self, ssid):
+        # Check target SSID (exact match first, then prefix)
+        target_ssid = self.config.get('target_ssid')
+        target_ssid_prefix = self.config.get('target_ssid_prefix')
+        if target_ssid:
+            return ssid == target_ssid
+        if target_ssid_prefix:
+            return target_ssid_prefix in ssid
+        return False
+
+    def request_refresh(self):
+        if self.refresh_requested is not None:
+            self.refresh_requested.set()
+
+    # Sensor
+
+    async def poll_sensor(self):
+        started = time.perf_counter()
+
+        try:
+            ssid = await self.health.run('ssid', self.io, self.read_ssid)
+        except StageTimeout as e:
+            self.recover_io(e)
+            ssid = "WiFi Error"
+        is_match = self.ssid_matches(ssid)
+        reading = None
+        if is_match:
+            print(f"Connected to {ssid}, fetching sensor data from {self.sensor_ip} ({self.sensor_client.connection_state})...")
+            try:
+                reading = await self.health.run('sensor', self.io, self.sensor_client.read)
+            except StageTimeout as e:
+                self.recover_io(e)
+                # Every urllib request opens its own connection, so there is no
+                # session to reset; keep the breaker and batch fallback, and
+                # count the stalled read as a link failure
+                self.sensor_client.breaker.record_failure()
+            if reading is None:
+                print(f"Failed to fetch sensor data ({self.sensor_client.connection_state}), using dummy values.")
+        if self.trace:
+            link = self.sensor_client.breaker.state if is_match else None
+            self.trace.record(self.wall_clock(), ssid, is_match, reading, link)
+
+        if reading is not None:
+            moisture, light = reading
+            if self.failures or not self.backfill.synced:
+                if self.failures:
+                    print(f"Sensor link recovered after {self.failures} failed polls.")
+                try:
+                    await self.health.run('backfill', self.io, self.backfill.catch_up, self.history,
+                                          self.wall_clock())
+                except StageTimeout as e:
+                    self.recover_io(e)
+            self.history.add(self.wall_clock(), moisture, light)
+            self.failures = 0
+            self.simulating = False
+
+            previous_flags = self.sensor_stats.flags
+            flags = self.sensor_stats.add(self.clock(), moisture=moisture, light=light)
+            if flags != previous_flags:
+                print(f"Sensor flags: {', '.join(flags) or 'none'}")
+
+            state_keys = self.flagged_keys(get_state_keys(moisture, light, self.config, self.classifier, self.clock()))
+            state_changed = self.current_state is not None and state_keys[0] != self.current_state
+            if self.message_data is None or state_keys[0] != self.current_state:
+                if state_changed:
+                    print(f"State changed: {self.current_state} -> {state_keys[0]} ({self.classifier.transition_count} transitions)")
+                self.current_state = state_keys[0]
+                self.message_data = pick_message(state_keys, self.config)
+            self.scheduler.observe(moisture, light, state_changed, flags)
+        else:
+            self.scheduler.reset()
+            # Counts consecutive failed polls; shown as dummy values
+            self.failures += 1
+            if self.failures > DEMO_AFTER_FAILURES:
+                print(f"Connection failed count {self.failures}. Entering Demo Mode (Simulating normal_bright).")
+                moisture, light = DEMO_MOISTURE, DEMO_LIGHT
+                demo_keys = get_state_keys(moisture, light, self.config)
+                self.demo_state = demo_keys[0]
+                self.demo_message = pick_message(demo_keys, self.config)
+                self.simulating = True
+            else:
+                print("Using dummy values (incrementing).")
+                moisture = light = self.failures
+                self.simulating = False
+
+        self.ssid = ssid
+        self.is_match = is_match
+        self.connected = reading is not None
+        self.moisture = moisture
+        self.light = light
+        self.timings['sensor_ms'] = (time.perf_counter() - started) * 1000
+        self.last_sensor_poll = self.clock()
+        if self.startup:
+            self.startup.mark('reading')
+
+    def flagged_keys(self, state_keys):
+        """Puts 'sensor_fault' / 'watering' first while flagged, if the config has messages for them."""
+        messages = self.config.get('messages', {})
+        flagged = []
+        if self.sensor_stats.fault():
+            flagged.append('sensor_fault')
+        if 'watering' in self.sensor_stats.flags:
+            flagged.append('watering')
+        return [key for key in flagged if messages.get(key)] + list(state_keys)
+
+    def recover_io(self, timeout):
+        """Leaves a wedged I/O thread behind and continues on a fresh executor."""
+        if self.health.should_restart(timeout.stage):
+            restart_process(self.health, timeout.stage, "too many failures")
+        self.io.shutdown(wait=False)
+        self.io = ThreadPoolExecutor(max_workers=2, thread_name_prefix='io')
+        self.health.record_recovery(timeout.stage, True, "replaced I/O executor")
+
+    async def sensor_loop(self):
+        while True:
+            await self.poll_sensor()
+            self.request_refresh()
+            print(f"Next reading in {self.scheduler.interval:.0f}s ({self.scheduler.reason})")
+            try:
+                await asyncio.wait_for(self.poll_requested.wait(), self.scheduler.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.poll_requested.clear()
+
+    # Startup
+
+    def warm_up(self):
+        """Loads the fonts and icons the first frames need (on the I/O executor at startup)."""
+        messages = self.config.get('messages', {})
+        font_ids = {self.config.get('default_font_id', 1)}
+        for entries in messages.values():
+            font_ids.update(entry['font_id'] for entry in entries if isinstance(entry, dict) and entry.get('font_id'))
+        for font_id in sorted(font_ids):
+            # Text fitting starts at this size; opening the face also pages in the font file
+            get_font(MAX_FONT_SIZE, get_font_path(font_id))
+        get_font(LOG_FONT_SIZE)
+        if self.layout:
+            for state_key in messages:
+                for name in self.layout.icon_names(state_key):
+                    self.layout.icons.get(name, self.layout.icon_size)
+        if self.startup:
+            self.startup.mark('fonts')
+
+    async def wait_for_panel(self):
+        """Waits for the startup panel bring-up under the 'panel' deadline (once)."""
+        panel, self.panel_bring_up = asyncio.wrap_future(self.panel_bring_up), None
+        started = time.perf_counter()
+        done, _ = await asyncio.wait({panel}, timeout=self.health.deadlines.get('panel'))
+        if not done:
+            elapsed = time.perf_counter() - started
+            self.health.record_failure('panel', 'deadline_miss', f"startup, {elapsed:.1f}s")
+            raise StageTimeout('panel', elapsed, panel)
+        panel.result()
+        self.panel_fresh = True
+
+    def first_frame_done(self):
+        self.timings['first_frame_ms'] = self.startup.mark('frame') * 1000
+        print(self.startup.report())
+
+    # Rendering and refresh
+
+    def render(self):
+        """
+        Draws the logical canvas for the latest reading.
+        Returns (canvas, draw, text, state_key, status_fields).
+        """
+        width, height = self.display_width, self.display_height
+        canvas, draw = self.frame_pool.canvas(width, height)
+
+        # A message posted to the control API replaces the state message until it expires
+        override = self.control_state.override()
+        state_key = None
+        if self.connected or self.simulating:
+            if self.connected:
+                message, state_key = self.message_data, self.current_state
+            else:
+                message, state_key = self.demo_message, self.demo_state
+            message = override or message
+            text = message.get('text', '')
+            font_id = message.get('font_id') or self.config.get('default_font_id', 1)
+            # Draw multiline text centered (in the speech bubble, if enabled)
+            draw_message(canvas, draw, text, get_font_path(font_id, text), width, height, self.layout, state_key)
+        else:
+            # Development mode message
+            text = override['text'] if override else DEV_MODE_TEXT
+            font_id = (override or {}).get('font_id') or 1
+            draw_centered_text(draw, text, get_font(DEV_MODE_FONT_SIZE, get_font_path(font_id, text)), width, height)
+
+        status_fields = {}
+        if self.show_log_messages:
+            if self.simulating:
+                log_text = f"simulating ({self.failures}, {self.sensor_client.connection_state})"
+            elif self.is_match and not self.connected:
+                log_text = f"moisture: {self.moisture}, light: {self.light} ({self.sensor_client.connection_state})"
+            else:
+                log_text = f"moisture: {self.moisture}, light: {self.light}"
+                if self.connected and self.sensor_stats.flags:
+                    log_text += f" [{', '.join(self.sensor_stats.flags)}]"
+
+            # Log at top-left, WiFi SSID right-aligned at top-right
+            status_fields = {'log': log_text, 'ssid': self.ssid}
+            self.status_bar.draw(draw, status_fields, get_font(LOG_FONT_SIZE))
+
+        return canvas, draw, text, state_key, status_fields
+
+    async def run_spi(self, fn, *args):
+        """
+        Runs blocking panel work on the SPI thread under the 'panel' deadline.
+        Returns False if it failed (the panel has then been recovered).
+        """
+        try:
+            if self.panel_bring_up is not None:
+                await self.wait_for_panel()
+            await self.health.run('panel', self.spi, fn, *args)
+            return True
+        except StageTimeout as e:
+            await self.recover_panel(e.future)
+        except Exception as e:
+            self.health.record_failure('panel', 'error', repr(e))
+            await self.recover_panel(None)
+        return False
+
+    async def recover_panel(self, stuck):
+        """
+        Aborts a refresh (or the startup bring-up) stuck in ReadBusy, waits
+        for it to end, then reopens SPI/GPIO and resets the panel on the same
+        SPI thread. A job wedged anywhere else restarts the process.
+        """
+        if self.health.should_restart('panel'):
+            restart_process(self.health, 'panel', "too many failures")
+
+        if stuck is not None:
+            if hasattr(self.epd, 'busy_abort'):
+                self.epd.busy_abort.set()
+            await asyncio.wait({stuck}, timeout=PANEL_ABORT_WAIT)
+            if not stuck.done():
+                # Blocked inside spidev/GPIO: recovering from a second thread
+                # would drive the same lines concurrently with it
+                restart_process(self.health, 'panel', "panel thread wedged")
+            stuck.exception()  # BusyAborted, expected
+
+        try:
+            if hasattr(self.epd, 'recover'):
+                await self.health.run('panel_recovery', self.spi, self.epd.recover)
+            else:
+                await self.health.run('panel_recovery', self.spi, self.epd.init)
+        except Exception as e:
+            self.health.record_recovery('panel', False, repr(e))
+            restart_process(self.health, 'panel', "panel recovery failed")
+        self.health.record_recovery('panel', True, "panel reset")
+
+        # Panel contents are unknown after a reset: redraw everything
+        if self.last_frame is not None:
+            self.frame_pool.release(self.last_frame)
+        self.last_frame = None
+        self.last_text = None
+        self.request_refresh()
+
+    def full_refresh(self, frame):
+        # Re-init is good practice for long running loops to ensure wakeup
+        if not self.panel_fresh:
+            self.epd.init()
+        self.panel_fresh = False
+        self.epd.display(frame)
+
+    def partial_refresh(self, frame, regions, fields):
+        self.epd.init_Part()
+        self.status_bar.update(self.epd, frame, regions, fields)
+
+    async def refresh(self):
+        if self.warmed_up is not None:
+            # The first frame uses what warm_up() loads; don't race it for the caches
+            warmed_up, self.warmed_up = self.warmed_up, None
+            try:
+                await warmed_up
+            except Exception as e:
+                print(f"Warm-up failed, loading on demand: {e!r}")
+        started = time.perf_counter()
+        try:
+            # Text fitting tries many sizes of large CJK faces: keep it off the event loop
+            canvas, draw, text, state_key, status_fields = await self.health.run('render', self.io, self.render)
+        except StageTimeout as e:
+            # The next reading requests a new frame
+            self.recover_io(e)
+            return
+        canvas_bytes = pack(canvas, self.frame_pool.buffer(stride_for(canvas.width) * canvas.height))
+        self.frame_pool.release_canvas(canvas, draw)
+        # The control API keeps the packed canvas until the next one replaces it
+        replaced = self.control_state.publish_frame(canvas_bytes, self.display_width, self.display_height)
+        if replaced is not None:
+            self.frame_pool.release(replaced)
+        now = time.perf_counter()
+        self.timings['render_ms'] = (now - started) * 1000
+        if self.startup:
+            self.startup.mark('rendered')
+
+        if self.epd:
+            # Place the canvas on the hardware frame (offset, rotation) in packed form
+            frame = self.compositor.compose(canvas_bytes, self.display_width, self.display_height,
+                                            self.frame_pool.buffer(self.frame_size))
+            compose_done = time.perf_counter()
+            self.timings['compose_ms'] = (compose_done - now) * 1000
+
+            frame_changed = frame != self.last_frame
+            changed_regions = self.status_bar.changed(status_fields) if frame_changed else []
+            refreshed = True
+            if frame_changed and (text != self.last_text or self.status_bar.needs_full_refresh()
+                                  or not changed_regions):
+                # Message changed, or something outside the status windows (icon, layout): full refresh
+                refreshed = await self.run_spi(self.full_refresh, frame)
+                if refreshed:
+                    self.status_bar.mark_full_refresh(status_fields)
+                    self.last_text = text
+                    print(f"Glyph atlas: {GLYPH_ATLAS.stats()}")
+                    print(f"Status updated: {text} (SSID: {self.ssid}).")
+            elif frame_changed:
+                # Only the status line changed: partial refresh of its windows
+                refreshed = await self.run_spi(self.partial_refresh, frame, changed_regions, status_fields)
+                if refreshed:
+                    print(f"Status line updated ({', '.join(r.name for r in changed_regions)}).")
+            else:
+                print(f"Frame unchanged, skipping refresh (SSID: {self.ssid}).")
+
+            if frame_changed and refreshed:
+                if self.startup and 'frame' not in self.startup.marks:
+                    self.first_frame_done()
+                if self.last_frame is None:
+                    self.last_frame = self.frame_pool.buffer(self.frame_size)
+                self.last_frame[:] = frame
+            self.frame_pool.release(frame)
+            self.timings['refresh_ms'] = (time.perf_counter() - compose_done) * 1000
+
+            if self.spi_profiler and frame_changed:
+                print(f"SPI profile:\n{self.spi_profiler.report()}")
+                self.spi_stats = self.spi_profiler.stats()
+                self.spi_profiler.reset()
+
+        self.timings['total_ms'] = (time.perf_counter() - started) * 1000
+        self.control_state.publish(
+            self.timings,
+            state_key=state_key,
+            text=text,
+            moisture=self.moisture,
+            light=self.light,
+            ssid=self.ssid,
+            interval=self.scheduler.interval,
+            reason=self.scheduler.reason,
+            health=self.health.stats(),
+            spi=self.spi_stats,
+            sensor=self.sensor_stats.snapshot(),
+        )
+
+    async def render_loop(self):
+        while True:
+            await self.refresh_requested.wait()
+            self.refresh_requested.clear()
+            async with self.busy:
+                await self.refresh()
+
+    # Config
+
+    def config_mtimes(self):
+        mtimes = []
+        for path in (CONFIG_FILE, host_config_file(self.hostname)):
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    async def config_loop(self):
+        loop = asyncio.get_running_loop()
+        mtimes = self.config_mtimes()
+        while True:
+            await asyncio.sleep(CONFIG_POLL_INTERVAL)
+            self.profiler.check_request_file()
+            current = self.config_mtimes()
+            if current == mtimes:
+                continue
+            mtimes = current
+            try:
+                config = await loop.run_in_executor(self.io, load_config, self.hostname)
+            except ValueError as e:
+                print(f"Config changed but could not be parsed, keeping the old one: {e}")
+                continue
+            print("Config changed, reloading.")
+            async with self.busy:
+                self.apply_config(config)
+            # Re-read with the new thresholds, which also triggers a refresh
+            self.poll_requested.set()
+
+    # Watchdog
+
+    def health_problem(self):
+        """Returns why the hub is unhealthy, or None."""
+        # Stuck stages are recovered by the health monitor; this catches the sensor task itself
+        overdue = self.clock() - self.last_sensor_poll - self.scheduler.interval
+        if overdue > SENSOR_GRACE:
+            return f"sensor poll overdue by {overdue:.0f}s"
+        return None
+
+    async def watchdog_loop(self):
+        while True:
+            problem = self.health_problem()
+            if problem is None:
+                systemd_notify("WATCHDOG=1")
+            else:
+                # systemd restarts the service once WatchdogSec passes without a ping
+                print(f"Withholding watchdog ping: {problem}")
+            await asyncio.sleep(WATCHDOG_PING_INTERVAL)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        previous = self.health.last_restart()
+        if previous:
+            print(f"Previous run was restarted after a failure in stage '{previous['stage']}' ({previous.get('detail')}).")
+        self.health.log('start', 'hub')
+
+        self.refresh_requested = asyncio.Event()
+        self.poll_requested = asyncio.Event()
+        self.busy = asyncio.Lock()
+        self.control_state.listeners.append(lambda: loop.call_soon_threadsafe(self.request_refresh))
+
+        control_server = ControlServer.from_config(self.config, self.control_state)
+        if control_server:
+            control_server.start()
+
+        if self.startup:
+            self.warmed_up = loop.run_in_executor(self.io, self.warm_up)
+        self.profiler.install_signal(loop)
+
+        try:
+            await asyncio.gather(
+                self.sensor_loop(),
+                self.render_loop(),
+                self.config_loop(),
+                self.watchdog_loop(),
+            )
+        finally:
+            self.io.shutdown(wait=False)
+            # Let a running refresh finish before the panel is touched again
+            self.spi.shutdown(wait=True)
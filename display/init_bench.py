@@ -0,0 +1,165 @@
+"""
+Compares GPIO and SPI traffic of the panel init sequences: the per-byte
+send_command_ALL/send_data_ALL pattern the driver used to issue versus the
+batched Sequencer, both played against a recording stand-in for epdconfig.
+
+    python3 init_bench.py [--gpio-us 15] [--overhead-us 60] [--speed-hz 4000000] [--check]
+
+First it checks both against the tables: each controller must receive
+every command of the sequence with its payload, in order, and the
+batched player must write DC only when its level changes and never touch
+the chip selects (spidev drives them). It exits non-zero if a check
+fails. Then, unless --check is given, it prints the traffic and time.
+
+Time is modelled, not measured: every digital_write call costs --gpio-us
+(gpiozero goes through several Python layers per write, even for the CS
+pins that spidev drives itself), every SPI transfer --overhead-us plus its
+bits at --speed-hz. Delays and busy waits are identical in both and are
+left out.
+"""
+import argparse
+import os
+import sys
+
+lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+if os.path.exists(lib_path):
+    sys.path.append(lib_path)
+
+from waveshare_epd.sequencer import Sequencer, INIT_FULL, INIT_PART, CMD
+from spi_recorder import SIDES, RecordingSpiDev, Wire
+
+DC_PIN = 25
+CS_M_PIN = 8
+CS_S_PIN = 7
+
+
+class RecordingEpdConfig:
+    """The parts of epdconfig the driver uses, recording instead of driving pins."""
+
+    def __init__(self, gpio_s, overhead_s, speed_hz):
+        self.gpio_s = gpio_s
+        self.gpio_writes = 0
+        self.dc_writes = 0
+        self.dc_changes = 0
+        self.cs_writes = 0
+        self.wire = Wire(dc_pin=DC_PIN)
+        self.spi = {}
+        for device, side in SIDES.items():
+            spi = self.spi[side] = RecordingSpiDev(self.wire, overhead_s=overhead_s)
+            spi.open(0, device)
+            spi.max_speed_hz = speed_hz
+
+    def digital_write(self, pin, value):
+        self.gpio_writes += 1
+        if pin == DC_PIN:
+            self.dc_writes += 1
+            self.dc_changes += self.wire.levels.get(pin) != value
+        elif pin in (CS_M_PIN, CS_S_PIN):
+            self.cs_writes += 1
+        self.wire.write(pin, value)
+
+    def delay_ms(self, delaytime):
+        pass
+
+    def spi_writebyte_M(self, data):
+        self.spi['M'].writebytes(data)
+
+    def spi_writebyte_S(self, data):
+        self.spi['S'].writebytes(data)
+
+    def spi_writebyte2_M(self, data):
+        self.spi['M'].writebytes2(data)
+
+    def spi_writebyte2_S(self, data):
+        self.spi['S'].writebytes2(data)
+
+    def summary(self):
+        transfers = len(self.wire.transfers())
+        spi_s = sum(d.bus_time for d in self.spi.values())
+        return {
+            'gpio_writes': self.gpio_writes,
+            'dc_writes': self.dc_writes,
+            'dc_changes': self.dc_changes,
+            'cs_writes': self.cs_writes,
+            'transfers': transfers,
+            'modelled_ms': (self.gpio_writes * self.gpio_s + spi_s) * 1000,
+            'streams': {side: self.wire.received(side) for side in self.spi},
+        }
+
+
+def play_per_byte(io, steps):
+    """What EPD.init did before the sequencer: send_command_ALL, then send_data_ALL per byte."""
+    for step in steps:
+        if step[0] != CMD:
+            continue
+        _, command, payload = step
+        io.digital_write(DC_PIN, 0)
+        io.digital_write(CS_M_PIN, 0)
+        io.digital_write(CS_S_PIN, 0)
+        io.spi_writebyte_M([command])
+        io.spi_writebyte_S([command])
+        io.digital_write(CS_M_PIN, 1)
+        io.digital_write(CS_S_PIN, 0)
+        for value in payload:
+            io.digital_write(DC_PIN, 1)
+            io.digital_write(CS_M_PIN, 0)
+            io.digital_write(CS_S_PIN, 0)
+            io.spi_writebyte_M([value])
+            io.spi_writebyte_S([value])
+            io.digital_write(CS_M_PIN, 1)
+            io.digital_write(CS_S_PIN, 1)
+
+
+def check(name, steps, results):
+    """Returns what is wrong with the recorded traffic of one sequence."""
+    failures = []
+    table = [(step[1], step[2]) for step in steps if step[0] == CMD]
+    for mode, r in results.items():
+        for side in 'MS':
+            if r['streams'][side] != table:
+                failures.append(f"{name} {mode}: controller {side} did not receive the table")
+    batched = results['batched']
+    if batched['dc_writes'] != batched['dc_changes']:
+        failures.append(f"{name} batched: {batched['dc_writes']} DC writes for {batched['dc_changes']} level changes")
+    if batched['cs_writes']:
+        failures.append(f"{name} batched: {batched['cs_writes']} chip select writes")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--gpio-us', type=float, default=15.0, help="cost of one digital_write call")
+    parser.add_argument('--overhead-us', type=float, default=60.0, help="fixed cost per SPI transfer")
+    parser.add_argument('--speed-hz', type=int, default=4000000)
+    parser.add_argument('--check', action='store_true', help="only run the checks")
+    args = parser.parse_args()
+
+    sequences = {}
+    failed = False
+    for name, steps in (('init', INIT_FULL), ('init_Part', INIT_PART)):
+        results = sequences[name] = {}
+        for mode in ('per-byte', 'batched'):
+            io = RecordingEpdConfig(args.gpio_us / 1e6, args.overhead_us / 1e6, args.speed_hz)
+            if mode == 'per-byte':
+                play_per_byte(io, steps)
+            else:
+                Sequencer(io, DC_PIN, lambda: None).run(steps)
+            results[mode] = io.summary()
+        failures = check(name, steps, results)
+        for failure in failures:
+            print(f"FAIL  {failure}")
+        if not failures:
+            print(f"ok    {name}: both controllers receive the table; batched DC only on change, no CS writes")
+        failed = failed or bool(failures)
+
+    if not args.check:
+        print(f"\n{'sequence':<10} {'mode':<10} {'GPIO':>6} {'DC':>5} {'xfers':>6} {'ms':>7}")
+        for name, results in sequences.items():
+            for mode, r in results.items():
+                print(f"{name:<10} {mode:<10} {r['gpio_writes']:>6} {r['dc_writes']:>5} "
+                      f"{r['transfers']:>6} {r['modelled_ms']:>7.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
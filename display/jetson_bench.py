@@ -0,0 +1,169 @@
+"""
+Checks the Jetson software-SPI paths against a stubbed sysfs_software_spi
+library and times a full frame through them.
+
+    python3 jetson_bench.py [--frames 3] [--check]
+
+The stub library records every byte handed to SYSFS_software_spi_transfer
+(and to the bulk SYSFS_software_spi_transfer_buf). The check writes a
+frame through epdconfig.JetsonNano's spi_writebyte*_M/_S on the stub and
+compares what would have gone over the wire, per controller chip select,
+with what was sent; a transfer with no or both chip selects low fails it.
+It prints ok/FAIL for both paths and exits non-zero on a failure. Then,
+unless --check is given, it prints the timing. The timing uses libc's abs() as the per-byte foreign function:
+a real ctypes call that does no work, i.e. the host-side cost of driving
+81,600 bytes, which is what the bulk path removes.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import sys
+import time
+
+lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+if os.path.exists(lib_path):
+    sys.path.append(lib_path)
+
+from spi_recorder import open_board
+
+# epdconfig is imported as the Pi board; JetsonNano is only used for its write path
+wire, epdconfig = open_board()
+
+from waveshare_epd.jetson_spi import SoftwareSpi, BULK_SYMBOL
+
+FRAME_BYTES = 1360 // 8 * 480
+CS_M_PIN = 8
+CS_S_PIN = 7
+
+
+class StubFunction:
+    """Stands in for a ctypes foreign function (argtypes/restype are accepted and ignored)."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self.fn(*args)
+
+
+class StubLibrary:
+    """
+    sysfs_software_spi.so: records the bytes clocked out while a chip select
+    is low. Like the real library it never drives a chip select itself.
+    """
+
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.wire = {CS_M_PIN: bytearray(), CS_S_PIN: bytearray()}
+        self.errors = []
+        self.SYSFS_software_spi_begin = StubFunction(lambda: None)
+        self.SYSFS_software_spi_end = StubFunction(lambda: None)
+        self.SYSFS_software_spi_transfer = StubFunction(self._transfer)
+
+    def _selected(self):
+        selected = [pin for pin in self.wire if self.gpio.levels.get(pin, 1) == 0]
+        if len(selected) != 1:
+            error = f"transfer with chip selects {selected} low"
+            if error not in self.errors:
+                self.errors.append(error)
+            return bytearray()
+        return self.wire[selected[0]]
+
+    def _transfer(self, value):
+        self._selected().append(value)
+        return 0
+
+
+class StubBulkLibrary:
+    def __init__(self, base):
+        def transfer_buf(buffer, length):
+            base._selected().extend(bytes(buffer[:length]))
+        setattr(self, BULK_SYMBOL, StubFunction(transfer_buf))
+
+
+class StubGpio:
+    def __init__(self):
+        self.levels = {}
+
+    def output(self, pin, value):
+        self.levels[pin] = value
+
+
+def check(bulk):
+    """Returns what is wrong with the bytes each controller received."""
+    gpio = StubGpio()
+    gpio.levels = {CS_M_PIN: 1, CS_S_PIN: 1}
+    base = StubLibrary(gpio)
+    board = object.__new__(epdconfig.JetsonNano)
+    board.GPIO = gpio
+    board.SPI = SoftwareSpi(base, StubBulkLibrary(base) if bulk else None, chunk=1000)
+    frame = bytearray((i * 131 + 7) & 0xFF for i in range(FRAME_BYTES))
+    half = len(frame) // 2
+    # The driver's CS writes are dropped: the spi_write*_M/_S calls frame them
+    board.digital_write(CS_M_PIN, 0)
+    board.digital_write(CS_S_PIN, 0)
+    board.spi_writebyte_M([0x13])
+    board.spi_writebyte2_M(frame[:half])
+    board.spi_writebyte_S([0x13])
+    board.spi_writebyte2_S(memoryview(frame)[half:])
+    board.spi_writebyte2_S(bytes(frame[:3]))
+
+    failures = list(base.errors)
+    if base.wire[CS_M_PIN] != b'\x13' + frame[:half]:
+        failures.append("controller M received the wrong bytes")
+    if base.wire[CS_S_PIN] != b'\x13' + frame[half:] + frame[:3]:
+        failures.append("controller S received the wrong bytes")
+    if gpio.levels != {CS_M_PIN: 1, CS_S_PIN: 1}:
+        failures.append(f"chip selects left at {gpio.levels}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=3)
+    parser.add_argument('--check', action='store_true', help="only run the checks")
+    args = parser.parse_args()
+
+    failed = False
+    for bulk in (False, True):
+        path = 'bulk' if bulk else 'per-byte'
+        failures = check(bulk)
+        for failure in failures:
+            print(f"FAIL  {path} path: {failure}")
+        if not failures:
+            print(f"ok    {path} path: M/S streams match")
+        failed = failed or bool(failures)
+    if args.check:
+        return 1 if failed else 0
+
+    libc = ctypes.CDLL(ctypes.util.find_library('c'))
+    frame = bytearray(FRAME_BYTES)
+
+    # What JetsonNano.spi_writebyte2 did: a Python loop of untyped ctypes calls
+    transfer = libc.abs
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        for i in range(len(frame)):
+            transfer(frame[i])
+    legacy = (time.perf_counter() - started) / args.frames
+
+    class LibcAsSpi:
+        SYSFS_software_spi_transfer = libc.abs
+    spi = SoftwareSpi(LibcAsSpi())
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        spi.write(frame)
+    mapped = (time.perf_counter() - started) / args.frames
+
+    print(f"\n{'path':<22} {'ms/frame':>9}")
+    print(f"{'per-byte Python loop':<22} {legacy * 1000:>9.1f}")
+    print(f"{'per-byte map':<22} {mapped * 1000:>9.1f}")
+    print(f"{'bulk':<22} {'1 call':>9}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
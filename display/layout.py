@@ -0,0 +1,251 @@
+"""
+Speech bubble and state icon layout.
+
+The message is fitted into the bubble's text area, the bubble is drawn around
+the fitted text block, and one icon per state label (dry/wet, dark/bright)
+is placed in a column on the right. Icons come from icons/<name>.png when
+present, otherwise a built-in drawing is used. Either way they are scaled and
+ordered-dithered to 1 bpp only once, then cached on disk as packed bitmaps
+(asset_cache/), so a frame only pastes ready 1-bit images.
+"""
+import hashlib
+import os
+
+from PIL import Image, ImageChops, ImageDraw
+
+DISPLAY_DIR = os.path.dirname(os.path.abspath(__file__))
+ICON_DIR = os.path.join(DISPLAY_DIR, 'icons')
+CACHE_DIR = os.path.join(DISPLAY_DIR, 'asset_cache')
+
+# Bump when the built-in drawings or the dither change, to invalidate caches
+ASSET_VERSION = 1
+
+BAYER_8 = (
+    (0, 32, 8, 40, 2, 34, 10, 42),
+    (48, 16, 56, 24, 50, 18, 58, 26),
+    (12, 44, 4, 36, 14, 46, 6, 38),
+    (60, 28, 52, 20, 62, 30, 54, 22),
+    (3, 35, 11, 43, 1, 33, 9, 41),
+    (51, 19, 59, 27, 49, 17, 57, 25),
+    (15, 47, 7, 39, 13, 45, 5, 37),
+    (63, 31, 55, 23, 61, 29, 53, 21),
+)
+
+
+def threshold_map(width, height):
+    """The 8x8 Bayer matrix as 'L' thresholds, tiled to width x height."""
+    tile = Image.new('L', (8, 8))
+    tile.putdata([(v * 4 + 2) for row in BAYER_8 for v in row])
+    thresholds = Image.new('L', (width, height))
+    for y in range(0, height, 8):
+        for x in range(0, width, 8):
+            thresholds.paste(tile, (x, y))
+    return thresholds
+
+
+def ordered_dither(image):
+    """
+    Ordered (Bayer) dither of an image to mode '1'. A pixel is white where its
+    grey value exceeds the threshold map; the comparison runs as a single
+    ImageChops.subtract over the whole image instead of per-pixel Python.
+    """
+    grey = image.convert('L')
+    above = ImageChops.subtract(grey, threshold_map(*grey.size))
+    return above.point(lambda v: 255 if v else 0, '1')
+
+
+def draw_builtin_icon(name, size):
+    """Greyscale drawing of a built-in icon, or None for unknown names."""
+    scale = 4
+    s = size * scale
+    image = Image.new('L', (s, s), 255)
+    draw = ImageDraw.Draw(image)
+    line = max(scale, s // 24)
+
+    if name in ('dry', 'wet'):
+        # Water drop: triangle on top of a circle
+        r = s * 0.3
+        cx, cy = s / 2, s * 0.62
+        fill = 90 if name == 'wet' else 225
+        draw.polygon([(cx, s * 0.08), (cx - r * 0.92, cy - r * 0.4), (cx + r * 0.92, cy - r * 0.4)], fill=fill)
+        draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=fill)
+        draw.line([(cx, s * 0.08), (cx - r * 0.92, cy - r * 0.4)], fill=0, width=line)
+        draw.line([(cx, s * 0.08), (cx + r * 0.92, cy - r * 0.4)], fill=0, width=line)
+        draw.arc([cx - r, cy - r, cx + r, cy + r], start=-24, end=204, fill=0, width=line)
+        if name == 'dry':
+            # Cracks
+            draw.line([(cx - r * 0.5, cy - r * 0.1), (cx - r * 0.1, cy + r * 0.2), (cx - r * 0.3, cy + r * 0.6)], fill=0, width=line)
+            draw.line([(cx + r * 0.5, cy), (cx + r * 0.15, cy + r * 0.35)], fill=0, width=line)
+        else:
+            draw.ellipse([cx - r * 0.55, cy - r * 0.45, cx - r * 0.2, cy - r * 0.1], fill=255)
+    elif name == 'bright':
+        # Sun: disc and eight rays
+        cx = cy = s / 2
+        r = s * 0.2
+        draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=150, outline=0, width=line)
+        for dx, dy in ((1, 0), (0.71, 0.71), (0, 1), (-0.71, 0.71), (-1, 0), (-0.71, -0.71), (0, -1), (0.71, -0.71)):
+            draw.line([(cx + dx * s * 0.29, cy + dy * s * 0.29), (cx + dx * s * 0.44, cy + dy * s * 0.44)], fill=0, width=line)
+    elif name == 'dark':
+        # Crescent moon
+        r = s * 0.36
+        cx = cy = s / 2
+        draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=70, outline=0, width=line)
+        ox = r * 0.55
+        draw.ellipse([cx - r + ox, cy - r - ox * 0.5, cx + r + ox, cy + r - ox * 0.5], fill=255, outline=0, width=line)
+        # Trim the part of the second circle outside the moon
+        mask = Image.new('L', (s, s), 0)
+        ImageDraw.Draw(mask).ellipse([cx - r, cy - r, cx + r, cy + r], fill=255)
+        image = Image.composite(image, Image.new('L', (s, s), 255), mask)
+    else:
+        return None
+
+    return image.resize((size, size), Image.LANCZOS)
+
+
+class IconCache:
+    """1-bit icons, dithered once and cached on disk as packed bitmaps."""
+
+    def __init__(self, icon_dir=ICON_DIR, cache_dir=CACHE_DIR):
+        self.icon_dir = icon_dir
+        self.cache_dir = cache_dir
+        self.icons = {}  # (name, size) -> mode '1' image, or None if unavailable
+
+    def _source(self, name):
+        path = os.path.join(self.icon_dir, f'{name}.png')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return path, f.read()
+        return None, b'builtin'
+
+    def _render(self, name, size, path):
+        if path is None:
+            image = draw_builtin_icon(name, size)
+            if image is None:
+                return None
+        else:
+            source = Image.open(path)
+            if source.mode in ('RGBA', 'LA', 'P'):
+                # Transparent areas become white
+                source = source.convert('RGBA')
+                background = Image.new('RGBA', source.size, (255, 255, 255, 255))
+                source = Image.alpha_composite(background, source)
+            source = source.convert('L')
+            source.thumbnail((size, size), Image.LANCZOS)
+            image = Image.new('L', (size, size), 255)
+            image.paste(source, ((size - source.width) // 2, (size - source.height) // 2))
+        return ordered_dither(image)
+
+    def get(self, name, size):
+        """Returns the icon as a size x size mode '1' image, or None if there is none."""
+        key = (name, size)
+        if key in self.icons:
+            return self.icons[key]
+
+        path, data = self._source(name)
+        digest = hashlib.sha1(data + f'{size}:{ASSET_VERSION}'.encode()).hexdigest()[:12]
+        cache_file = os.path.join(self.cache_dir, f'{name}_{size}_{digest}.bin')
+        packed_size = (size + 7) // 8 * size
+
+        icon = None
+        if os.path.exists(cache_file):
+            with open(cache_file, 'rb') as f:
+                packed = f.read()
+            if len(packed) == packed_size:
+                icon = Image.frombytes('1', (size, size), packed)
+
+        if icon is None:
+            icon = self._render(name, size, path)
+            if icon is not None:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    with open(cache_file, 'wb') as f:
+                        f.write(icon.tobytes())
+                except OSError as e:
+                    print(f"Could not cache icon '{name}': {e}")
+
+        self.icons[key] = icon
+        return icon
+
+
+class BubbleLayout:
+    """
+    Places the message in a speech bubble with state icons beside it.
+    All sizes are canvas pixels.
+    """
+
+    def __init__(self, width, height, icon_size=96, margin=24, top=36, padding=28,
+                 radius=28, border=4, tail=36, icons=None):
+        self.width = width
+        self.height = height
+        self.icon_size = icon_size
+        self.margin = margin
+        self.top = top
+        self.padding = padding
+        self.radius = radius
+        self.border = border
+        self.tail = tail
+        self.icons = icons or IconCache()
+
+        # Bubble may use everything left of the icon column
+        self.icon_x = width - margin - icon_size
+        self.region = (margin, top, self.icon_x - margin, height - margin - tail)
+
+    @classmethod
+    def from_config(cls, config, canvas_size):
+        """Returns the layout from the 'bubble' config section, or None if disabled."""
+        section = config.get('bubble', {})
+        if not section.get('enabled', True):
+            return None
+        return cls(
+            canvas_size[0],
+            canvas_size[1],
+            icon_size=section.get('icon_size', 96),
+            margin=section.get('margin', 24),
+            top=section.get('top', 36),
+            padding=section.get('padding', 28),
+            radius=section.get('radius', 28),
+            border=section.get('border', 4),
+            tail=section.get('tail', 36),
+            icons=IconCache(section.get('icon_dir', ICON_DIR), section.get('cache_dir', CACHE_DIR)),
+        )
+
+    def text_box(self):
+        """(x, y, width, height) available to the text inside the bubble."""
+        left, top, right, bottom = self.region
+        inset = self.padding + self.border
+        return (left + inset, top + inset, right - left - 2 * inset, bottom - top - 2 * inset)
+
+    def icon_names(self, state_key):
+        """Icon names for the labels of a state key such as 'dry_bright'."""
+        return [label for label in (state_key or '').split('_') if label not in ('', 'normal')]
+
+    def draw_bubble(self, draw, text_bbox):
+        """Draws the bubble outline and tail around the fitted text block."""
+        left, top, right, bottom = self.region
+        inset = self.padding + self.border
+        x0 = max(left, text_bbox[0] - inset)
+        y0 = max(top, text_bbox[1] - inset)
+        x1 = min(right, text_bbox[2] + inset)
+        y1 = min(bottom, text_bbox[3] + inset)
+        draw.rounded_rectangle([x0, y0, x1, y1], radius=self.radius, outline=0, width=self.border)
+
+        # Tail below the bubble, leaning towards the icons
+        cx = (x0 + x1) // 2
+        half = self.tail // 2
+        tip = (cx + self.tail, y1 + self.tail)
+        draw.rectangle([cx - half, y1 - self.border + 1, cx + half, y1], fill=255)
+        draw.line([(cx - half, y1 - self.border // 2), tip], fill=0, width=self.border)
+        draw.line([(cx + half, y1 - self.border // 2), tip], fill=0, width=self.border)
+
+    def draw_icons(self, canvas, state_key):
+        """Pastes the cached 1-bit icons for state_key into the icon column."""
+        icons = [icon for icon in (self.icons.get(name, self.icon_size) for name in self.icon_names(state_key))
+                 if icon is not None]
+        if not icons:
+            return
+        gap = self.margin
+        total = len(icons) * self.icon_size + (len(icons) - 1) * gap
+        y = self.top + (self.height - self.margin - self.top - total) // 2
+        for icon in icons:
+            canvas.paste(icon, (self.icon_x, y))
+            y += self.icon_size + gap
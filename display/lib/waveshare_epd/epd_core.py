@@ -0,0 +1,236 @@
+# Driver core shared by the panels described in panel.py: reset and busy
+# handling, command tables played through the Sequencer, the frame packer,
+# the per-controller split and the bulk transfer path. A panel driver is a
+# PanelDriver built from its PanelSpec (see open_panel); epd10in85.EPD is the
+# 10.85" one.
+
+import logging
+import threading
+
+from . import epdconfig
+from .panel import PANELS, OLD_RAM, NEW_RAM, ControllerSplit, pack_image, window_parts
+from .sequencer import Sequencer, CMD, window_payload
+
+logger = logging.getLogger(__name__)
+
+
+class BusyAborted(Exception):
+    """Raised by ReadBusy when another thread aborts the wait (see PanelDriver.busy_abort)."""
+
+
+class PanelDriver:
+    def __init__(self, spec):
+        self.spec = spec
+        self.width = spec.width
+        self.height = spec.height
+        self.reset_pin = epdconfig.RST_PIN
+        self.dc_pin = epdconfig.DC_PIN
+        self.busy_pin = epdconfig.BUSY_PIN
+        # Controller X: chip select CS_X_PIN, writers spi_writebyte_X/spi_writebyte2_X.
+        # Writers are looked up per call, so wrappers installed later (SpiProfiler) see every write
+        self.cs_pins = {}
+        self.writers = {}
+        for side in spec.controllers:
+            writers = (f'spi_writebyte_{side}', f'spi_writebyte2_{side}')
+            if not hasattr(epdconfig, f'CS_{side}_PIN') or not all(hasattr(epdconfig, name) for name in writers):
+                raise ValueError(f"{spec.name}: epdconfig has no chip select or writers for controller '{side}'")
+            self.cs_pins[side] = getattr(epdconfig, f'CS_{side}_PIN')
+            self.writers[side] = writers
+        # Sides whose "old" RAM already holds the panel contents for partial refreshes
+        self.part_ready = set()
+
+        # Reusable transfer buffers
+        self.split = ControllerSplit(spec)
+        self._white_slice = b'\xff' * self.split.slice_bytes * spec.height
+        self._black_slice = b'\x00' * self.split.slice_bytes * spec.height
+        self._white_frame = b'\xff' * spec.frame_bytes
+
+        # Set from another thread to break out of a ReadBusy that never returns
+        self.busy_abort = threading.Event()
+
+        # Init, window and power sequences are tables played in batched transfers
+        self.sequencer = Sequencer(epdconfig, self.dc_pin, self.ReadBusy)
+
+    # Hardware reset
+    def reset(self):
+        high, low, settle = self.spec.reset_ms
+        epdconfig.digital_write(self.reset_pin, 1)
+        epdconfig.delay_ms(high)
+        epdconfig.digital_write(self.reset_pin, 0)
+        epdconfig.delay_ms(low)
+        epdconfig.digital_write(self.reset_pin, 1)
+        epdconfig.delay_ms(settle)
+
+    def send_command(self, side, command):
+        epdconfig.digital_write(self.dc_pin, 0)
+        epdconfig.digital_write(self.cs_pins[side], 0)
+        getattr(epdconfig, self.writers[side][0])([command])
+        epdconfig.digital_write(self.cs_pins[side], 1)
+
+    def send_data(self, side, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pins[side], 0)
+        getattr(epdconfig, self.writers[side][0])([data])
+        epdconfig.digital_write(self.cs_pins[side], 1)
+
+    # send a lot of data
+    def send_data2(self, side, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pins[side], 0)
+        getattr(epdconfig, self.writers[side][1])(data)
+        epdconfig.digital_write(self.cs_pins[side], 1)
+
+    def ReadBusy(self):
+        logger.debug("e-Paper busy")
+        while(epdconfig.digital_read(self.busy_pin) == 0):      #  0: busy, 1: idle
+            if self.busy_abort.is_set():
+                raise BusyAborted("e-Paper busy wait aborted")
+            epdconfig.delay_ms(200)
+        logger.debug("e-Paper busy release")
+
+    def TurnOnDisplay(self):
+        # waits for the electronic paper IC to release the idle signal
+        self.sequencer.run(self.spec.refresh, self.spec.controllers)
+
+    def _init(self, table):
+        if (epdconfig.module_init() != 0):
+            return -1
+
+        self.reset()
+        self.ReadBusy()
+        self.sequencer.run(table, self.spec.controllers)
+        return 0
+
+    def init(self):
+        return self._init(self.spec.init)
+
+    def init_Part(self):
+        # As in Waveshare's driver, only the first controller skips the
+        # white preload of its first partial window after this init
+        self.part_ready.add(self.spec.controllers[0])
+        return self._init(self.spec.init_part)
+
+    def getbuffer(self, image, out=None):
+        buffer = pack_image(image, self.spec, out)
+        if buffer is None:
+            logger.debug("Image size %dx%d does not match the panel", *image.size)
+            return bytearray(self._white_frame)
+        return buffer
+
+    def _write_frame(self, old, new):
+        """old/new(index) give each controller's contents for the old and new RAM."""
+        for index, side in enumerate(self.spec.controllers):
+            self.send_command(side, OLD_RAM)
+            self.send_data2(side, old(index))
+            self.send_command(side, NEW_RAM)
+            self.send_data2(side, new(index))
+        self.TurnOnDisplay()
+
+    def Clear(self):
+        self._write_frame(lambda index: self._white_slice, lambda index: self._white_slice)
+
+    def Clear_Black(self):
+        self._write_frame(lambda index: self._white_slice, lambda index: self._black_slice)
+
+    def display(self, imageblack):
+        if isinstance(imageblack, list):
+            imageblack = bytes(imageblack)
+        self._write_frame(lambda index: self._white_slice, lambda index: self.split.rows(imageblack, index))
+
+    def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
+        # Widen the window to whole bytes; Image holds (Xend - Xstart) / 8 bytes per row
+        Xstart = Xstart // 8 * 8
+        Xend = (Xend + 7) // 8 * 8
+        if isinstance(Image, list):
+            Image = bytes(Image)
+        self.display_region(Image, Xstart, Ystart, Xend - Xstart, Yend - Ystart)
+
+    def _window_rows(self, data, stride, byte_x, byte_width, height):
+        # Byte columns [byte_x, byte_x + byte_width) of every window row, contiguous
+        if byte_x == 0 and byte_width == stride:
+            return data[:stride * height]
+        rows = bytearray(byte_width * height)
+        for row in range(height):
+            src = row * stride + byte_x
+            rows[row * byte_width:(row + 1) * byte_width] = data[src:src + byte_width]
+        return rows
+
+    def _set_window(self, sides, x, y, width, height):
+        size, start = window_payload(x, y, width, height)
+        size_command, start_command = self.spec.window
+        self.sequencer.run(((CMD, size_command, size), (CMD, start_command, start)), sides)
+
+    def display_region(self, data, x, y, width, height, stride=None):
+        """
+        Partial refresh of a window packed in the panel format (spec.bits
+        per pixel, MSB first, all ones = white). x and width must be
+        multiples of 8, stride is the number of bytes per row in data
+        (default width * bits / 8). The window may span any of the panel's
+        controllers; each one gets its rows in a single transaction.
+        """
+        if self.spec.window is None:
+            raise ValueError(f"{self.spec.name} has no partial refresh")
+        if x % 8 or width % 8:
+            raise ValueError(f"Window x ({x}) and width ({width}) must be multiples of 8")
+        if x < 0 or y < 0 or width <= 0 or height <= 0 or x + width > self.width or y + height > self.height:
+            raise ValueError(f"Window {width}x{height} at ({x}, {y}) is outside the panel")
+        byte_width = width * self.spec.bits // 8
+        if stride is None:
+            stride = byte_width
+        data = memoryview(data).cast('B')
+        if stride < byte_width or len(data) < stride * (height - 1) + byte_width:
+            raise ValueError(f"Buffer of {len(data)} bytes with stride {stride} is too small for the window")
+
+        parts = window_parts(self.spec, x, width)
+        if len(parts) < len(self.spec.controllers):
+            # TurnOnDisplay drives every controller: give the idle ones the
+            # same window so they do not refresh the rest of their area
+            _, local_x, _, part_width = parts[0]
+            self._set_window(self.spec.controllers, local_x, y, part_width, height)
+            for side, local_x, _, part_width in parts[1:]:
+                self._set_window(side, local_x, y, part_width, height)
+        else:
+            for side, local_x, _, part_width in parts:
+                self._set_window(side, local_x, y, part_width, height)
+
+        rows = {}
+        for side, _, byte_x, part_width in parts:
+            rows[side] = self._window_rows(data, stride, byte_x, part_width * self.spec.bits // 8, height)
+
+            if side not in self.part_ready:
+                self.part_ready.add(side)
+                self.send_command(side, 0x00)
+                self.send_data2(side, b'\xff' * len(rows[side]))
+
+            self.send_command(side, NEW_RAM)
+            self.send_data2(side, rows[side])
+
+        self.TurnOnDisplay()
+
+        # Store the window as the "old" image for the next partial update
+        for side, _, _, _ in parts:
+            self.send_command(side, OLD_RAM)
+            self.send_data2(side, rows[side])
+
+    def recover(self):
+        """
+        Brings the panel back after a hang: closes and reopens SPI/GPIO
+        (module_exit/module_init), then hardware reset and register init.
+        """
+        self.busy_abort.clear()
+        self.part_ready.clear()
+        epdconfig.module_exit()
+        return self.init()
+
+    def sleep(self):
+        self.sequencer.run(self.spec.sleep, self.spec.controllers)
+
+        epdconfig.delay_ms(2000)
+        epdconfig.module_exit()
+
+
+def open_panel(name='epd10in85'):
+    """Returns the driver for a panel listed in panel.PANELS."""
+    if name not in PANELS:
+        raise ValueError(f"Unknown panel '{name}' (known: {', '.join(sorted(PANELS))})")
+    return PanelDriver(PANELS[name])
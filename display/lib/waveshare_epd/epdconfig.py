@@ -35,6 +35,9 @@ import subprocess
 
 from ctypes import *
 
+from .jetson_spi import SoftwareSpi
+from .gpio_backend import DEFAULT_GPIO_BACKEND, DEFAULT_GPIO_CHIP, BACKENDS as GPIO_BACKENDS, open_pins
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,59 +54,66 @@ class RaspberryPi:
 
     def __init__(self):
         import spidev
-        import gpiozero
-        
+
         self.SPI_M = spidev.SpiDev()
         self.SPI_S = spidev.SpiDev()
-        self.GPIO_RST_PIN    = gpiozero.LED(self.RST_PIN)
-        self.GPIO_DC_PIN     = gpiozero.LED(self.DC_PIN)
-        # self.GPIO_CS_M_PIN     = gpiozero.LED(self.CS_M_PIN)
-        # self.GPIO_CS_M_PIN     = gpiozero.LED(self.CS_M_PIN)
-        self.GPIO_PWR_PIN    = gpiozero.LED(self.PWR_PIN)
-        self.GPIO_BUSY_PIN   = gpiozero.Button(self.BUSY_PIN, pull_up = False)
 
-        
+        self.spi_speed_hz = 4000000
+
+        # Lines are claimed at module_init, with the backend set by configure_gpio
+        self.gpio_backend = DEFAULT_GPIO_BACKEND
+        self.gpio_chip = DEFAULT_GPIO_CHIP
+        self.pins = None
+        self._unbind_pins()
+
+    def configure_spi(self, speed_hz=None, max_chunk=None):
+        """
+        Sets the bus speed, applied at the next module_init. max_chunk is
+        ignored: writebytes2 already splits buffers into transfers of
+        spidev's bufsiz (spidev.bufsiz=N on the kernel command line).
+        """
+        if speed_hz:
+            self.spi_speed_hz = int(speed_hz)
+
+    def configure_gpio(self, backend=None, chip=None):
+        """Selects the GPIO backend ('gpiozero' or 'gpiochip'); applies at the next module_init."""
+        if backend:
+            if backend not in GPIO_BACKENDS:
+                raise ValueError(f"Unknown GPIO backend '{backend}'")
+            self.gpio_backend = backend
+        if chip is not None:
+            self.gpio_chip = chip
+        if self.pins is not None and (backend or chip is not None):
+            self._close_pins()
+
+    def _open_pins(self):
+        self.pins = open_pins(
+            self.gpio_backend,
+            outputs=(self.RST_PIN, self.DC_PIN, self.PWR_PIN),
+            inputs=(self.BUSY_PIN,),
+            ignored=(self.CS_M_PIN, self.CS_S_PIN),  # hardware chip selects (spidev)
+            chip=self.gpio_chip,
+        )
+        self.writers = self.pins.writers
+        self.readers = self.pins.readers
+
+    def _close_pins(self):
+        self.pins.close()
+        self.pins = None
+        self._unbind_pins()
+
+    def _unbind_pins(self):
+        # Before module_init nothing is powered: writes are dropped, reads are None
+        self.writers = dict.fromkeys((self.RST_PIN, self.DC_PIN, self.PWR_PIN, self.CS_M_PIN, self.CS_S_PIN),
+                                     lambda value: None)
+        self.readers = dict.fromkeys((self.RST_PIN, self.DC_PIN, self.PWR_PIN, self.BUSY_PIN,
+                                      self.CS_M_PIN, self.CS_S_PIN), lambda: None)
 
     def digital_write(self, pin, value):
-        if pin == self.RST_PIN:
-            if value:
-                self.GPIO_RST_PIN.on()
-            else:
-                self.GPIO_RST_PIN.off()
-        elif pin == self.DC_PIN:
-            if value:
-                self.GPIO_DC_PIN.on()
-            else:
-                self.GPIO_DC_PIN.off()
-        # elif pin == self.CS_M_PIN:
-        #     if value:
-        #         self.GPIO_CS_M_PIN.on()
-        #     else:
-        #         self.GPIO_CS_M_PIN.off()
-        # elif pin == self.CS_S_PIN:
-        #     if value:
-        #         self.GPIO_CS_S_PIN.on()
-        #     else:
-        #         self.GPIO_CS_S_PIN.off()
-        elif pin == self.PWR_PIN:
-            if value:
-                self.GPIO_PWR_PIN.on()
-            else:
-                self.GPIO_PWR_PIN.off()
+        self.writers[pin](value)
 
     def digital_read(self, pin):
-        if pin == self.BUSY_PIN:
-            return self.GPIO_BUSY_PIN.value
-        elif pin == self.RST_PIN:
-            return self.RST_PIN.value
-        elif pin == self.DC_PIN:
-            return self.DC_PIN.value
-        # elif pin == self.CS_M_PIN:
-        #     return self.CS_M_PIN.value
-        # elif pin == self.CS_S_PIN:
-        #     return self.CS_S_PIN.value
-        elif pin == self.PWR_PIN:
-            return self.PWR_PIN.value
+        return self.readers[pin]()
 
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
@@ -121,15 +131,17 @@ class RaspberryPi:
         self.SPI_S.writebytes2(data)
 
     def module_init(self, cleanup=False):
-        self.GPIO_PWR_PIN.on()
+        if self.pins is None:
+            self._open_pins()
+        self.writers[self.PWR_PIN](1)
         
         # SPI device, bus = 0, device = 0
         self.SPI_M.open(0, 0)
-        self.SPI_M.max_speed_hz = 4000000
+        self.SPI_M.max_speed_hz = self.spi_speed_hz
         self.SPI_M.mode = 0b00
 
         self.SPI_S.open(0, 1)
-        self.SPI_S.max_speed_hz = 4000000
+        self.SPI_S.max_speed_hz = self.spi_speed_hz
         self.SPI_S.mode = 0b00
 
         return 0
@@ -139,18 +151,13 @@ class RaspberryPi:
         self.SPI_M.close()
         self.SPI_S.close()
 
-        self.GPIO_RST_PIN.off()
-        self.GPIO_DC_PIN.off()
-        self.GPIO_PWR_PIN.off()
+        self.writers[self.RST_PIN](0)
+        self.writers[self.DC_PIN](0)
+        self.writers[self.PWR_PIN](0)
         logger.debug("close 5V, Module enters 0 power consumption ...")
-        
-        if cleanup:
-            self.GPIO_RST_PIN.close()
-            self.GPIO_DC_PIN.close()
-            # self.GPIO_CS_M_PIN.close()
-            # self.GPIO_CS_M_PIN.close()
-            self.GPIO_PWR_PIN.close()
-            self.GPIO_BUSY_PIN.close()
+
+        if cleanup and self.pins is not None:
+            self._close_pins()
 
         
 
@@ -161,68 +168,89 @@ class JetsonNano:
     RST_PIN  = 17
     DC_PIN   = 25
     CS_PIN   = 8
+    CS_M_PIN = 8
+    CS_S_PIN = 7
     BUSY_PIN = 24
     PWR_PIN  = 18
 
     def __init__(self):
-        import ctypes
         find_dirs = [
             os.path.dirname(os.path.realpath(__file__)),
             '/usr/local/lib',
             '/usr/lib',
         ]
-        self.SPI = None
-        for find_dir in find_dirs:
-            so_filename = os.path.join(find_dir, 'sysfs_software_spi.so')
-            if os.path.exists(so_filename):
-                self.SPI = ctypes.cdll.LoadLibrary(so_filename)
-                break
-        if self.SPI is None:
-            raise RuntimeError('Cannot find sysfs_software_spi.so')
+        self.SPI = SoftwareSpi.load(find_dirs)
+        logger.debug("Jetson SPI: %s", "bulk" if self.SPI.bulk else "per-byte")
 
         import Jetson.GPIO
         self.GPIO = Jetson.GPIO
 
+    def configure_spi(self, speed_hz=None, max_chunk=None):
+        """The software SPI clock is fixed; max_chunk sizes the per-byte fallback loop."""
+        if max_chunk:
+            self.SPI.chunk = int(max_chunk)
+
     def digital_write(self, pin, value):
-        self.GPIO.output(pin, value)
+        # Chip selects are framed by the spi_write*_M/_S calls below
+        if pin != self.CS_M_PIN and pin != self.CS_S_PIN:
+            self.GPIO.output(pin, value)
 
     def digital_read(self, pin):
-        return self.GPIO.input(self.BUSY_PIN)
+        return self.GPIO.input(pin)
 
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
-        self.SPI.SYSFS_software_spi_transfer(data[0])
+        self.SPI.write(data)
 
     def spi_writebyte2(self, data):
-        for i in range(len(data)):
-            self.SPI.SYSFS_software_spi_transfer(data[i])
+        self.SPI.write(data)
+
+    def _write_selected(self, cs_pin, data):
+        self.GPIO.output(cs_pin, 0)
+        try:
+            self.SPI.write(data)
+        finally:
+            self.GPIO.output(cs_pin, 1)
+
+    def spi_writebyte_M(self, data):
+        self._write_selected(self.CS_M_PIN, data)
+
+    def spi_writebyte2_M(self, data):
+        self._write_selected(self.CS_M_PIN, data)
+
+    def spi_writebyte_S(self, data):
+        self._write_selected(self.CS_S_PIN, data)
+
+    def spi_writebyte2_S(self, data):
+        self._write_selected(self.CS_S_PIN, data)
 
     def module_init(self):
         self.GPIO.setmode(self.GPIO.BCM)
         self.GPIO.setwarnings(False)
         self.GPIO.setup(self.RST_PIN, self.GPIO.OUT)
         self.GPIO.setup(self.DC_PIN, self.GPIO.OUT)
-        self.GPIO.setup(self.CS_PIN, self.GPIO.OUT)
+        self.GPIO.setup(self.CS_M_PIN, self.GPIO.OUT, initial=self.GPIO.HIGH)
+        self.GPIO.setup(self.CS_S_PIN, self.GPIO.OUT, initial=self.GPIO.HIGH)
         self.GPIO.setup(self.PWR_PIN, self.GPIO.OUT)
         self.GPIO.setup(self.BUSY_PIN, self.GPIO.IN)
         
         self.GPIO.output(self.PWR_PIN, 1)
         
-        self.SPI.SYSFS_software_spi_begin()
+        self.SPI.begin()
         return 0
 
     def module_exit(self):
         logger.debug("spi end")
-        self.SPI.SYSFS_software_spi_end()
+        self.SPI.end()
 
         logger.debug("close 5V, Module enters 0 power consumption ...")
         self.GPIO.output(self.RST_PIN, 0)
         self.GPIO.output(self.DC_PIN, 0)
         self.GPIO.output(self.PWR_PIN, 0)
 
-        self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN, self.PWR_PIN])
+        self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_M_PIN, self.CS_S_PIN, self.BUSY_PIN, self.PWR_PIN])
 
 
 class SunriseX3:
@@ -300,7 +328,15 @@ output, _ = process.communicate()
 if sys.version_info[0] == 2:
     output = output.decode(sys.stdout.encoding)
 
-if "Raspberry" in output:
+# EPD_BOARD names the board instead (off-device checks, see spi_recorder.py)
+BOARDS = {'RaspberryPi': RaspberryPi, 'JetsonNano': JetsonNano, 'SunriseX3': SunriseX3}
+board = os.environ.get('EPD_BOARD')
+
+if board:
+    if board not in BOARDS:
+        raise ValueError(f"Unknown EPD_BOARD '{board}' (expected one of {', '.join(BOARDS)})")
+    implementation = BOARDS[board]()
+elif "Raspberry" in output:
     implementation = RaspberryPi()
 elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
     implementation = SunriseX3()
@@ -0,0 +1,127 @@
+# GPIO backends for the Raspberry Pi (kept free of hardware imports at module
+# level so they can be exercised off-device with a fake chip).
+#
+# A backend claims its lines once and exposes, per pin, a writer(value) and
+# a reader() that go straight to the library call: epdconfig's
+# digital_write/digital_read are a dict lookup plus that call, instead of an
+# if/elif chain over pin names.
+#
+#   gpiozero   LED/Button objects (the original behaviour)
+#   gpiochip   the /dev/gpiochipN character device through lgpio
+
+import logging
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GPIO_BACKEND = 'gpiozero'
+DEFAULT_GPIO_CHIP = 0
+
+
+def _ignore(value):
+    pass
+
+
+def _unknown():
+    return None
+
+
+class GpiozeroPins:
+    name = 'gpiozero'
+
+    def __init__(self, outputs, inputs, gpiozero=None):
+        if gpiozero is None:
+            import gpiozero
+        self.devices = []
+        self.writers = {}
+        self.readers = {}
+        for pin in outputs:
+            led = gpiozero.LED(pin)
+            self.devices.append(led)
+            self.writers[pin] = self._writer(led)
+            self.readers[pin] = partial(getattr, led, 'value')
+        for pin in inputs:
+            button = gpiozero.Button(pin, pull_up=False)
+            self.devices.append(button)
+            self.readers[pin] = partial(getattr, button, 'value')
+
+    @staticmethod
+    def _writer(led):
+        on, off = led.on, led.off
+
+        def write(value):
+            if value:
+                on()
+            else:
+                off()
+        return write
+
+    def close(self):
+        for device in self.devices:
+            device.close()
+        self.devices = []
+
+
+class GpiochipPins:
+    name = 'gpiochip'
+
+    def __init__(self, outputs, inputs, chip=DEFAULT_GPIO_CHIP, lgpio=None):
+        if lgpio is None:
+            import lgpio
+        self.lgpio = lgpio
+        self.handle = lgpio.gpiochip_open(chip)
+        self.lines = []
+        self.writers = {}
+        self.readers = {}
+        try:
+            for pin in outputs:
+                lgpio.gpio_claim_output(self.handle, pin, 0)
+                self.lines.append(pin)
+                self.writers[pin] = partial(lgpio.gpio_write, self.handle, pin)
+                self.readers[pin] = partial(lgpio.gpio_read, self.handle, pin)
+            for pin in inputs:
+                # gpiozero's Button(pull_up=False) also pulls down
+                lgpio.gpio_claim_input(self.handle, pin, lgpio.SET_PULL_DOWN)
+                self.lines.append(pin)
+                self.readers[pin] = partial(lgpio.gpio_read, self.handle, pin)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.handle is None:
+            return
+        for pin in self.lines:
+            self.lgpio.gpio_free(self.handle, pin)
+        self.lgpio.gpiochip_close(self.handle)
+        self.handle = None
+        self.lines = []
+
+
+BACKENDS = {
+    GpiozeroPins.name: GpiozeroPins,
+    GpiochipPins.name: GpiochipPins,
+}
+
+
+def open_pins(backend, outputs, inputs, ignored=(), chip=DEFAULT_GPIO_CHIP):
+    """
+    Claims the lines with the named backend, falling back to gpiozero if the
+    gpiochip library is missing. Pins in ignored (driven by spidev, like the
+    chip selects) get writers that do nothing.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown GPIO backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend == GpiochipPins.name:
+        try:
+            pins = GpiochipPins(outputs, inputs, chip)
+        except ImportError:
+            logger.warning("lgpio is not installed, falling back to gpiozero")
+            pins = GpiozeroPins(outputs, inputs)
+    else:
+        pins = GpiozeroPins(outputs, inputs)
+    for pin in ignored:
+        pins.writers.setdefault(pin, _ignore)
+        pins.readers.setdefault(pin, _unknown)
+    logger.debug("GPIO backend: %s", pins.name)
+    return pins
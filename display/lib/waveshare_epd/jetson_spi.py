@@ -0,0 +1,85 @@
+# Bulk writes over the Jetson's bit-banged SPI (sysfs_software_spi.so), kept
+# free of hardware imports so it can be exercised with a stubbed library.
+#
+# sysfs_software_spi.so only exports a per-byte SYSFS_software_spi_transfer;
+# a full frame through it is 81,600 ctypes calls. If the small companion
+# library built from sysfs_software_spi_bulk.c is present, a whole buffer goes
+# through one SYSFS_software_spi_transfer_buf call. Otherwise the per-byte
+# function is driven from map() in chunks, which keeps the Python side of the
+# loop as thin as it gets.
+#
+# Neither path touches a chip select. The vendor library only drives SCLK and
+# MOSI (and reads MISO); JetsonNano frames each write with CS_M/CS_S itself.
+
+import ctypes
+import os
+from collections import deque
+
+BASE_LIBRARY = 'sysfs_software_spi.so'
+BULK_LIBRARY = 'sysfs_software_spi_bulk.so'
+BULK_SYMBOL = 'SYSFS_software_spi_transfer_buf'
+FALLBACK_CHUNK = 4096
+
+
+def find_library(name, find_dirs):
+    for find_dir in find_dirs:
+        so_filename = os.path.join(find_dir, name)
+        if os.path.exists(so_filename):
+            return so_filename
+    return None
+
+
+class SoftwareSpi:
+    """
+    write(data) sends a buffer (bytes, bytearray, memoryview or list of
+    ints). lib is the loaded base library, bulk_lib the optional companion
+    that exports SYSFS_software_spi_transfer_buf(const uint8_t *, uint32_t).
+    """
+
+    def __init__(self, lib, bulk_lib=None, chunk=FALLBACK_CHUNK):
+        self.lib = lib
+        self.chunk = chunk
+        # Left untyped: argtypes conversion costs more per call than it saves
+        self.transfer = lib.SYSFS_software_spi_transfer
+
+        self.bulk = getattr(bulk_lib, BULK_SYMBOL, None) if bulk_lib is not None else None
+        if self.bulk is not None:
+            self.bulk.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.c_uint32]
+            self.bulk.restype = None
+
+    @classmethod
+    def load(cls, find_dirs, chunk=FALLBACK_CHUNK):
+        base = find_library(BASE_LIBRARY, find_dirs)
+        if base is None:
+            raise RuntimeError(f'Cannot find {BASE_LIBRARY}')
+        # RTLD_GLOBAL so the companion resolves SYSFS_software_spi_transfer from it
+        lib = ctypes.CDLL(base, mode=ctypes.RTLD_GLOBAL)
+        bulk_path = find_library(BULK_LIBRARY, find_dirs)
+        bulk_lib = ctypes.CDLL(bulk_path) if bulk_path else None
+        return cls(lib, bulk_lib, chunk)
+
+    def begin(self):
+        self.lib.SYSFS_software_spi_begin()
+
+    def end(self):
+        self.lib.SYSFS_software_spi_end()
+
+    def write(self, data):
+        length = len(data)
+        if not length:
+            return
+        if self.bulk is not None:
+            if isinstance(data, bytearray):
+                buffer = (ctypes.c_uint8 * length).from_buffer(data)
+            else:
+                if isinstance(data, list):
+                    data = bytes(data)
+                buffer = (ctypes.c_uint8 * length).from_buffer_copy(data)
+            self.bulk(buffer, length)
+            return
+
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = memoryview(data).cast('B')  # iterates as ints, slices without copying
+        for start in range(0, length, self.chunk):
+            # Runs the per-byte calls from C (map), not from a Python for loop
+            deque(map(self.transfer, data[start:start + self.chunk]), maxlen=0)
@@ -0,0 +1,139 @@
+# Panel descriptions plus the frame packing and controller split shared by
+# every driver built on epd_core.PanelDriver (kept free of hardware imports
+# so it can be used off-device, like sequencer.py).
+#
+# Frames use the panel's own format: rows of width * bits / 8 bytes, most
+# significant bits first, all ones = white. For 1 bpp that is PIL mode '1'
+# tobytes(); with more bits a pixel is its grey level quantized to 2**bits
+# steps. A panel driven by several controllers (the 10.85" has M and S)
+# splits every row into equal slices, left to right, one per controller.
+
+from PIL import Image
+
+from .sequencer import INIT_FULL, INIT_PART, REFRESH, SLEEP
+
+# RAM write commands of the UC81xx-style controllers these panels use
+OLD_RAM = 0x10
+NEW_RAM = 0x13
+
+BITS = (1, 2, 4, 8)
+
+
+class PanelSpec:
+    """
+    What a driver needs to know about a panel: resolution, the controllers
+    that split each row, bits per pixel (1, 2, 4 or 8), reset pulse timing
+    and its command tables. Controllers are named left to right; controller
+    X is selected with epdconfig.CS_X_PIN and written through
+    spi_writebyte_X/spi_writebyte2_X. window is the (size, start) command
+    pair for partial windows, or None if the panel has no partial refresh.
+    """
+
+    def __init__(self, name, width, height, controllers='M', bits=1, reset_ms=(200, 2, 200),
+                 init=INIT_FULL, init_part=INIT_PART, refresh=REFRESH, sleep=SLEEP,
+                 window=(0x61, 0x62)):
+        if bits not in BITS:
+            raise ValueError(f"{name}: {bits} bits per pixel is not one of {BITS}")
+        if width % (8 * len(controllers)):
+            # Partial windows are placed in steps of 8 pixels
+            raise ValueError(f"{name}: width {width} does not split into 8 pixel columns per controller")
+        self.name = name
+        self.width = width
+        self.height = height
+        self.controllers = controllers
+        self.bits = bits
+        self.reset_ms = reset_ms
+        self.init = init
+        self.init_part = init_part
+        self.refresh = refresh
+        self.sleep = sleep
+        self.window = window
+
+    @property
+    def stride(self):
+        """Bytes per frame row."""
+        return self.width * self.bits // 8
+
+    @property
+    def frame_bytes(self):
+        return self.stride * self.height
+
+    @property
+    def controller_width(self):
+        """Pixels of each row driven by one controller."""
+        return self.width // len(self.controllers)
+
+
+# Waveshare 10.85": two 680x480 controllers side by side
+EPD10IN85 = PanelSpec('epd10in85', 1360, 480, controllers='MS')
+
+PANELS = {spec.name: spec for spec in (EPD10IN85,)}
+
+
+def _grey_levels(bits):
+    # Grey value -> level, 0 = black .. 2**bits - 1 = white
+    top = (1 << bits) - 1
+    return [(value * top + 127) // 255 for value in range(256)]
+
+
+def pack_image(image, spec, out=None):
+    """
+    Packs a PIL image into the panel format. Portrait images (height x
+    width) are rotated into place. Returns None if the size does not match
+    the panel. Fills and returns out when given.
+    """
+    mode = '1' if spec.bits == 1 else 'L'
+    image = image if image.mode == mode else image.convert(mode)
+    if image.size == (spec.height, spec.width):
+        image = image.transpose(Image.ROTATE_90)
+    elif image.size != (spec.width, spec.height):
+        return None
+    if spec.bits in (1, 8):
+        data = image.tobytes()
+    else:
+        # The 'P;2' and 'P;4' packers put levels MSB first, like the panel
+        levels = image.point(_grey_levels(spec.bits))
+        data = Image.frombytes('P', image.size, levels.tobytes()).tobytes('raw', f'P;{spec.bits}')
+    if out is None:
+        return bytearray(data)
+    out[:] = data
+    return out
+
+
+class ControllerSplit:
+    """Gathers one controller's slice of every row into a reusable buffer."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.slice_bytes = spec.controller_width * spec.bits // 8
+        self.buffer = bytearray(self.slice_bytes * spec.height)
+
+    def rows(self, frame, index):
+        """Rows of controller index (0 = leftmost) from a full frame, contiguous."""
+        frame = memoryview(frame).cast('B')
+        if len(self.spec.controllers) == 1:
+            return frame[:self.spec.frame_bytes]
+        width, stride = self.slice_bytes, self.spec.stride
+        buffer = self.buffer
+        offset = index * width
+        for row in range(self.spec.height):
+            src = row * stride + offset
+            buffer[row * width:(row + 1) * width] = frame[src:src + width]
+        return buffer
+
+
+def window_parts(spec, x, width):
+    """
+    Splits a window [x, x + width) of the panel, in 8 pixel steps, by
+    controller. Returns (side, x in controller coordinates, first byte
+    column of the window, width) for each controller the window touches.
+    """
+    parts = []
+    slice_width = spec.controller_width
+    for index, side in enumerate(spec.controllers):
+        left = index * slice_width
+        start = max(x, left)
+        end = min(x + width, left + slice_width)
+        if start < end:
+            parts.append((side, start - left, (start - x) * spec.bits // 8, end - start))
+    return parts
@@ -0,0 +1,121 @@
+# Table-driven command sequences for the 10.85" panel's two controllers
+# (kept free of hardware imports so it can be used off-device).
+#
+# A sequence is a tuple of steps:
+#   (CMD, command, payload)   command byte, then its data bytes
+#   (DELAY, ms)
+#   (BUSY,)                   wait for the BUSY line to go idle
+#
+# CS is driven by spidev for every transfer, so DC cannot change inside a
+# transfer: a command costs one transfer for the command byte and one for
+# the whole payload per controller. Both controllers get the command before
+# DC flips to data, and DC is only written when its level changes.
+
+CMD = 'cmd'
+DELAY = 'delay'
+BUSY = 'busy'
+
+# Registers shared by the full and partial refresh inits
+_INIT_REGISTERS = (
+    (CMD, 0x4D, b'\x55'),
+    (CMD, 0xA6, b'\x38'),
+    (CMD, 0xB4, b'\x5D'),
+    (CMD, 0xB6, b'\x80'),
+    (CMD, 0xB7, b'\x00'),
+    (CMD, 0xF7, b'\x02'),
+    (CMD, 0xAE, b'\xA0'),
+    (CMD, 0xE0, b'\x01'),
+    (CMD, 0x00, b'\x9F\x0D'),                       # Panel setting
+    (CMD, 0x06, b'\x57\x24\x28\x32\x08\x48'),       # Booster soft start
+    (CMD, 0x61, b'\x02\xA8\x01\xE0'),               # Resolution 680x480 per controller
+    (CMD, 0x62, b'\x00\x00\x00\x00'),               # Window start
+)
+
+_POWER_ON = (
+    (CMD, 0x04, b''),
+    (DELAY, 200),
+    (BUSY,),
+)
+
+INIT_FULL = _INIT_REGISTERS + (
+    (CMD, 0x60, b'\x31'),
+    (CMD, 0x50, b'\x97'),                           # VCOM and data interval
+    (CMD, 0xE8, b'\x01'),
+) + _POWER_ON
+
+INIT_PART = _INIT_REGISTERS + (
+    (CMD, 0x82, b'\x12'),                           # VCOM DC
+    (CMD, 0x60, b'\x31'),
+    (CMD, 0x50, b'\x97'),
+    (CMD, 0xE8, b'\x01'),
+    (CMD, 0xE0, b'\x03'),
+    (CMD, 0xE5, b'\x64'),
+) + _POWER_ON
+
+REFRESH = (
+    (CMD, 0x12, b''),                               # Display refresh
+    (DELAY, 100),                                   # 200 us at least before BUSY is valid
+    (BUSY,),
+)
+
+SLEEP = (
+    (CMD, 0x02, b''),                               # Power off
+    (DELAY, 200),
+    (BUSY,),
+    (CMD, 0x07, b'\xA5'),                           # Deep sleep
+)
+
+BOTH = 'MS'
+
+
+def window_payload(x, y, width, height):
+    """0x61 (size) and 0x62 (start) payloads of a controller window."""
+    return (bytes(((width >> 8) & 0xff, width & 0xff, (height >> 8) & 0xff, height & 0xff)),
+            bytes(((x >> 8) & 0xff, x & 0xff, (y >> 8) & 0xff, y & 0xff)))
+
+
+class Sequencer:
+    """
+    Plays command sequences through an epdconfig-like module (digital_write,
+    delay_ms, and spi_writebyte_X/spi_writebyte2_X for each controller X,
+    e.g. _M and _S). wait_busy is the driver's busy wait (it owns the abort
+    flag).
+    """
+
+    def __init__(self, io, dc_pin, wait_busy):
+        self.io = io
+        self.dc_pin = dc_pin
+        self.wait_busy = wait_busy
+        self.dc = None   # unknown: other driver code writes DC directly
+
+    def set_dc(self, value):
+        if self.dc != value:
+            self.io.digital_write(self.dc_pin, value)
+            self.dc = value
+
+    def _command(self, command, payload, sides):
+        io = self.io
+        self.set_dc(0)
+        for side in sides:
+            getattr(io, 'spi_writebyte_' + side)([command])
+        if payload:
+            self.set_dc(1)
+            for side in sides:
+                getattr(io, 'spi_writebyte2_' + side)(payload)
+
+    def run(self, steps, sides=BOTH):
+        self.dc = None
+        try:
+            for step in steps:
+                kind = step[0]
+                if kind == CMD:
+                    self._command(step[1], step[2], sides)
+                elif kind == DELAY:
+                    self.io.delay_ms(step[1])
+                elif kind == BUSY:
+                    self.wait_busy()
+                else:
+                    raise ValueError(f"Unknown sequence step {step!r}")
+        finally:
+            # The rest of the driver does not go through the sequencer
+            self.dc = None
@@ -0,0 +1,22 @@
+/*
+ * Whole-buffer entry point for the Jetson's software SPI, so Python can send
+ * a frame in one ctypes call instead of one call per byte (see jetson_spi.py).
+ * Build it on the Jetson, next to sysfs_software_spi.so (see the Makefile):
+ *
+ *   make -C display/lib/waveshare_epd
+ *
+ * Like a run of single transfers, it leaves the chip selects alone: the
+ * vendor SYSFS_software_spi_transfer only clocks SCLK (sysfs gpio18) and
+ * MOSI (gpio16) and samples MISO (gpio17), the three lines
+ * SYSFS_software_spi_begin exports. CS0/CS1 (gpio19/20, BCM 8/7) stay with
+ * Jetson.GPIO, which epdconfig.JetsonNano drives around each write.
+ */
+#include <stdint.h>
+
+extern uint8_t SYSFS_software_spi_transfer(uint8_t value);
+
+void SYSFS_software_spi_transfer_buf(const uint8_t *buf, uint32_t len)
+{
+    for (uint32_t i = 0; i < len; i++)
+        SYSFS_software_spi_transfer(buf[i]);
+}
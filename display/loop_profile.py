@@ -0,0 +1,300 @@
+"""
+On-demand profiling of a running hub.
+
+A session starts on SIGUSR1 or when the request file appears (checked with
+the config files), runs over the next N refreshes and then writes a report
+to the output directory:
+
+    kill -USR1 $(pidof -x main.py)
+    echo '{"iterations": 10, "mode": "sample"}' > profile.request   # contents optional
+
+The report has a per-stage timing table and either cProfile statistics
+("cprofile", the default; the raw pstats are saved next to it for
+snakeviz/pstats) or stack samples of every thread ("sample", lower
+overhead and also shows where threads wait). Stages are timed separately:
+
+    text      render.draw_multiline_text (fitting and drawing the message)
+    pack      packing the canvas (what getbuffer does for the grid)
+    compose   placing the canvas on the panel frame
+    display   epd.display / display_region (transfer + busy wait)
+    sensor    sensor_client.read
+
+Nothing is wrapped while no session runs: the stage functions are patched
+in when a session starts and restored when it ends, so an idle profiler
+costs nothing per iteration.
+
+cProfile only sees the thread that enables it, so the event loop thread
+runs one profile for the whole session and the sensor and panel stages,
+which run on executor threads, are profiled per call and merged in.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import socket
+import sys
+import threading
+import time
+
+import render
+
+DEFAULT_ITERATIONS = 5
+DEFAULT_MODE = 'cprofile'
+MODES = ('cprofile', 'sample')
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_REQUEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profile.request')
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+TOP_FUNCTIONS = 30
+
+# Leaf frames of threads that are only waiting for work
+IDLE_FRAMES = {('selectors.py', 'select'), ('thread.py', '_worker'), ('threading.py', 'wait')}
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all other threads every interval seconds."""
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.samples = 0
+        self.idle = 0
+        self.leaf = {}        # (file, line, function) -> samples with it on top
+        self.inclusive = {}   # (file, line, function) -> samples with it anywhere on the stack
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                self.samples += 1
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    self.idle += 1
+                    continue
+                key = (code.co_filename, frame.f_lineno, code.co_name)
+                self.leaf[key] = self.leaf.get(key, 0) + 1
+                seen = set()
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if key not in seen:
+                        seen.add(key)
+                        self.inclusive[key] = self.inclusive.get(key, 0) + 1
+                    frame = frame.f_back
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def report(self):
+        busy = self.samples - self.idle
+        lines = [f"{self.samples} thread samples every {self.interval * 1000:g} ms, {busy} busy"]
+        for title, counts in (("Top of stack", self.leaf), ("On stack", self.inclusive)):
+            lines.append(f"\n{title}:")
+            for (filename, line, name), count in sorted(counts.items(), key=lambda item: -item[1])[:TOP_FUNCTIONS]:
+                lines.append(f"  {count / max(1, busy):>6.1%} {count:>6}  {name} ({os.path.basename(filename)}:{line})")
+        return '\n'.join(lines)
+
+
+class LoopProfiler:
+    def __init__(self, hub, iterations=DEFAULT_ITERATIONS, mode=DEFAULT_MODE,
+                 request_file=DEFAULT_REQUEST_FILE, output_dir=DEFAULT_OUTPUT_DIR,
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.hub = hub
+        self.iterations = iterations
+        self.mode = mode
+        self.request_file = request_file
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.session = None
+
+    @classmethod
+    def from_config(cls, config, hub):
+        """Builds the profiler from the optional 'profiling' config section."""
+        options = config.get('profiling', {})
+        return cls(
+            hub,
+            iterations=options.get('iterations', DEFAULT_ITERATIONS),
+            mode=options.get('mode', DEFAULT_MODE),
+            request_file=options.get('request_file', DEFAULT_REQUEST_FILE),
+            output_dir=options.get('output_dir', DEFAULT_OUTPUT_DIR),
+            sample_interval=options.get('sample_interval', DEFAULT_SAMPLE_INTERVAL),
+        )
+
+    def install_signal(self, loop):
+        """Starts a session on SIGUSR1 (Unix, main thread only)."""
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.start)
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            print("Profiler: SIGUSR1 not available, use the request file")
+
+    def check_request_file(self):
+        """Starts a session if the request file exists; it may hold {"iterations": n, "mode": m}."""
+        if not self.request_file or not os.path.exists(self.request_file):
+            return
+        try:
+            with open(self.request_file, 'r') as f:
+                text = f.read().strip()
+            os.remove(self.request_file)
+            options = json.loads(text) if text else {}
+            if not isinstance(options, dict):
+                raise ValueError(f"expected a JSON object, got {text!r}")
+        except (OSError, ValueError) as e:
+            print(f"Profiler: ignoring request file: {e}")
+            options = {}
+        self.start(options.get('iterations'), options.get('mode'))
+
+    # Session
+
+    def start(self, iterations=None, mode=None):
+        if self.session is not None:
+            print("Profiler: a session is already running")
+            return
+        mode = mode or self.mode
+        if mode not in MODES:
+            print(f"Profiler: unknown mode '{mode}', using '{DEFAULT_MODE}'")
+            mode = DEFAULT_MODE
+        session = self.session = {
+            'mode': mode,
+            'iterations': iterations or self.iterations,
+            'done': 0,
+            'started': time.time(),
+            'timings': {},
+            'patches': [],
+            'loop_thread': threading.get_ident(),
+            'thread_profiles': [],
+            'profile': None,
+            'sampler': None,
+        }
+        hub = self.hub
+        self._patch(session, render, 'draw_multiline_text', 'text')
+        self._patch(session, sys.modules[type(hub).__module__], 'pack', 'pack')
+        self._patch(session, hub.compositor, 'compose', 'compose')
+        if hub.epd is not None:
+            self._patch(session, hub.epd, 'display', 'display')
+            self._patch(session, hub.epd, 'display_region', 'display')
+        self._patch(session, hub.sensor_client, 'read', 'sensor')
+        self._patch_refresh(session)
+
+        if mode == 'sample':
+            session['sampler'] = StackSampler(self.sample_interval)
+            session['sampler'].start()
+        else:
+            session['profile'] = cProfile.Profile()
+            try:
+                session['profile'].enable()
+            except ValueError as e:
+                # Another profiler (or debugger) is active: stage timings only
+                print(f"Profiler: cProfile unavailable ({e}), timing stages only")
+                session['profile'] = None
+        print(f"Profiler: {mode} session over the next {session['iterations']} refreshes")
+
+    def _patch(self, session, owner, name, stage):
+        original = getattr(owner, name)
+        # Instance attributes are deleted again on restore; module and class ones are put back
+        shadowed = not isinstance(owner, type(sys)) and name not in vars(owner)
+        session['patches'].append((owner, name, original, shadowed))
+        setattr(owner, name, self._timed(session, stage, original))
+
+    def _timed(self, session, stage, fn):
+        durations = session['timings'].setdefault(stage, [])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                if session['profile'] is None or threading.get_ident() == session['loop_thread']:
+                    return fn(*args, **kwargs)
+                # Executor thread: the loop's profile does not see it
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    return fn(*args, **kwargs)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    session['thread_profiles'].append(profile)
+            finally:
+                durations.append(time.perf_counter() - started)
+        return timed
+
+    def _patch_refresh(self, session):
+        hub = self.hub
+        refresh = hub.refresh
+
+        async def counted_refresh():
+            try:
+                await refresh()
+            finally:
+                session['done'] += 1
+                if session['done'] >= session['iterations'] and self.session is session:
+                    self.finish()
+
+        session['patches'].append((hub, 'refresh', refresh, True))
+        hub.refresh = counted_refresh
+
+    def finish(self):
+        session, self.session = self.session, None
+        if session is None:
+            return None
+        if session['profile'] is not None:
+            session['profile'].disable()
+        if session['sampler'] is not None:
+            session['sampler'].stop()
+        for owner, name, original, shadowed in reversed(session['patches']):
+            if shadowed:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        try:
+            path = self.write(session)
+        except OSError as e:
+            print(f"Profiler: could not write the report: {e}")
+            return None
+        print(f"Profiler: {session['done']} refreshes profiled, report in {path}")
+        return path
+
+    # Report
+
+    def stage_table(self, session):
+        lines = [f"{'stage':<8} {'calls':>5} {'total ms':>9} {'mean ms':>8} {'p50 ms':>7} {'max ms':>7}"]
+        for stage, durations in session['timings'].items():
+            if not durations:
+                continue
+            ordered = sorted(durations)
+            lines.append(f"{stage:<8} {len(ordered):>5} {sum(ordered) * 1000:>9.1f} "
+                         f"{sum(ordered) / len(ordered) * 1000:>8.1f} {ordered[len(ordered) // 2] * 1000:>7.1f} "
+                         f"{ordered[-1] * 1000:>7.1f}")
+        return '\n'.join(lines)
+
+    def write(self, session):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(session['started']))
+        base = os.path.join(self.output_dir, f"{socket.gethostname()}-{stamp}-{session['mode']}")
+        elapsed = time.time() - session['started']
+        sections = [
+            f"{session['mode']} session: {session['done']} refreshes in {elapsed:.1f}s",
+            f"\nStages:\n{self.stage_table(session)}",
+        ]
+
+        if session['sampler'] is not None:
+            sections.append(f"\n{session['sampler'].report()}")
+        else:
+            profiles = [p for p in [session['profile']] + session['thread_profiles'] if p is not None]
+            if profiles:
+                stats = pstats.Stats(profiles[0], stream=io.StringIO())
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(base + '.prof')
+                stats.stream = out = io.StringIO()
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                sections.append(f"\ncProfile (all threads, by cumulative time; raw stats in {base}.prof):\n"
+                                f"{out.getvalue()}")
+
+        with open(base + '.txt', 'w') as f:
+            f.write('\n'.join(sections) + '\n')
+        return base + '.txt'
@@ -0,0 +1,310 @@
+"""
+Local stand-in for a plant node (plant_node/plant_node_*.yaml).
+
+Serves the same ESPHome web_server v3 surface the hub uses:
+
+    GET /sensor/moisture, /sensor/light   {"id": "sensor-moisture", "value": 1.234, "state": "1.234 V"}
+    GET /text_sensor/sensors              batched JSON reading (moisture, light, uptime_ms, seq)
+    GET /readings?since=<seq>&limit=<n>   reading buffer CSV (plant_node/reading_buffer.h)
+    GET /events                           server-sent events: ping, then state updates every 5 s
+
+Values are scripted (a drying pot under a day/night light cycle) or
+replayed from sensor traces (sensor_trace.py). Every request can be
+delayed (latency + jitter), dropped (connection closed unanswered),
+answered slowly (body trickled out over some seconds) or stalled (held
+open without an answer), each with its own probability:
+
+    python3 node_emulator.py --port 8080 --latency-ms 40 --jitter-ms 30 --drop 0.02 --stall 0.01
+
+Point a hub at it with "sensor_ip": "127.0.0.1:8080". node_loadtest.py
+runs it in-process for the load test.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+
+from backfill import BUFFER_INTERVAL
+from sensor_client import BATCH_ENDPOINT
+from sensor_trace import Trace
+
+SENSOR_UPDATE_INTERVAL = 5     # update_interval of the node's sensors
+READING_BUFFER_SIZE = 1440     # READING_BUFFER_SIZE in reading_buffer.h
+READING_RESPONSE_LIMIT = 240   # READING_RESPONSE_LIMIT in reading_buffer.h
+MAX_REQUEST_LINE = 2048
+
+
+class Faults:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, drop=0.0, slow=0.0, slow_s=3.0,
+                 stall=0.0, stall_s=30.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.drop = drop
+        self.slow = slow
+        self.slow_s = slow_s
+        self.stall = stall
+        self.stall_s = stall_s
+        self.rng = random.Random(seed)
+
+    def describe(self):
+        parts = [f"latency {self.latency_ms:g}±{self.jitter_ms:g} ms"]
+        if self.drop:
+            parts.append(f"drop {self.drop:.0%}")
+        if self.slow:
+            parts.append(f"slow body {self.slow:.0%} over {self.slow_s:g}s")
+        if self.stall:
+            parts.append(f"stall {self.stall:.0%} for {self.stall_s:g}s")
+        return ', '.join(parts)
+
+    def pick(self):
+        """Returns (delay_s, fault) for one request; fault is None, 'drop', 'slow' or 'stall'."""
+        delay = max(0.0, self.latency_ms + self.rng.uniform(-1, 1) * self.jitter_ms) / 1000
+        roll = self.rng.random()
+        for fault, probability in (('stall', self.stall), ('drop', self.drop), ('slow', self.slow)):
+            if roll < probability:
+                return delay, fault
+            roll -= probability
+        return delay, None
+
+
+class ScriptedValues:
+    """A pot drying out by 0.5 per day (watered back at 1.0) under a 24 h light cycle."""
+
+    def __init__(self, moisture=2.8, speed=1.0):
+        self.start_moisture = moisture
+        self.speed = speed
+
+    def at(self, elapsed):
+        t = elapsed * self.speed
+        moisture = 1.0 + (self.start_moisture - 1.0 - 0.5 * t / 86400) % (self.start_moisture - 1.0)
+        hour = (6 + t / 3600) % 24
+        light = 3.0 * max(0.0, math.sin((hour - 6) / 14 * math.pi)) if 6 <= hour <= 20 else 0.0
+        return round(moisture, 3), round(light, 3)
+
+
+class TraceValues:
+    """Replays recorded readings; failed polls in the trace repeat the previous values."""
+
+    def __init__(self, trace, speed=1.0):
+        self.trace = trace
+        self.speed = speed
+        self.last = (0.0, 0.0)
+
+    def at(self, elapsed):
+        sample = self.trace.at(self.trace.start + elapsed * self.speed)
+        if sample.reading is not None:
+            self.last = sample.reading
+        return self.last
+
+
+class NodeEmulator:
+    def __init__(self, values, faults=None, host='127.0.0.1', port=8080, name='eplantalk99',
+                 max_connections=None):
+        self.values = values
+        self.faults = faults or Faults()
+        self.host = host
+        self.port = port
+        self.name = name
+        # ESP-IDF's httpd only keeps a handful of sockets; extra clients wait
+        self.max_connections = max_connections
+        self.started = time.monotonic()
+        self.boot = f"{random.getrandbits(32) or 1:08x}"
+        self.seq = 0
+        self.readings = deque(maxlen=READING_BUFFER_SIZE)
+        self.buffer_seq = 0
+        self.next_buffer_push = 0.0
+        self.stats = {'requests': 0, 'drop': 0, 'slow': 0, 'stall': 0}
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self._slots = None
+
+    # Node state
+
+    def uptime(self):
+        return time.monotonic() - self.started
+
+    def current(self):
+        elapsed = self.uptime()
+        moisture, light = self.values.at(elapsed)
+        # The node pushes into its reading buffer every BUFFER_INTERVAL seconds
+        while self.next_buffer_push <= elapsed:
+            self.buffer_seq += 1
+            pushed = self.values.at(self.next_buffer_push)
+            self.readings.append((self.buffer_seq, int(self.next_buffer_push), pushed[0], pushed[1]))
+            self.next_buffer_push += BUFFER_INTERVAL
+        return moisture, light
+
+    def sensor_json(self, name):
+        moisture, light = self.current()
+        value = moisture if name == 'moisture' else light
+        return {'id': f'sensor-{name}', 'name': name, 'value': value, 'state': f'{value:.3f} V'}
+
+    def batch_json(self):
+        moisture, light = self.current()
+        self.seq += 1
+        text = json.dumps({'moisture': moisture, 'light': light,
+                           'uptime_ms': int(self.uptime() * 1000), 'seq': self.seq})
+        return {'id': 'text_sensor-sensors', 'name': 'sensors', 'value': text, 'state': text}
+
+    def readings_csv(self, since, limit):
+        self.current()
+        first_seq = self.readings[0][0] if self.readings else 0
+        last_seq = self.readings[-1][0] if self.readings else 0
+        limit = min(limit, READING_RESPONSE_LIMIT)
+        lines = [f"# uptime_s={int(self.uptime())},first_seq={first_seq},last_seq={last_seq},boot={self.boot}",
+                 "seq,uptime_s,moisture,light"]
+        for seq, uptime_s, moisture, light in self.readings:
+            if seq > since and len(lines) - 2 < limit:
+                lines.append(f"{seq},{uptime_s},{moisture:.3f},{light:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    # Server
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if self.max_connections:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start(self):
+        """Runs the server on a daemon thread; returns once it is listening (port 0 picks one)."""
+        ready = threading.Event()
+
+        def run():
+            async def main():
+                task = asyncio.ensure_future(self.serve())
+                while self.server is None and not task.done():
+                    await asyncio.sleep(0.01)
+                ready.set()
+                await task
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, name='node-emulator', daemon=True)
+        self.thread.start()
+        ready.wait(5)
+        return self
+
+    def stop(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def _handle(self, reader, writer):
+        if self._slots is None:
+            await self._respond(reader, writer)
+            return
+        try:
+            async with self._slots:
+                await self._respond(reader, writer)
+        except asyncio.CancelledError:
+            # Still queued for a slot when the emulator shut down
+            writer.close()
+
+    async def _respond(self, reader, writer):
+        try:
+            request_line = (await reader.readline())[:MAX_REQUEST_LINE].decode('latin-1').split()
+            while (await reader.readline()).strip():
+                pass
+            if len(request_line) < 2:
+                return
+            self.stats['requests'] += 1
+            path, _, query = request_line[1].partition('?')
+            params = dict(p.partition('=')[::2] for p in query.split('&') if p)
+
+            delay, fault = self.faults.pick()
+            if fault:
+                self.stats[fault] += 1
+            if fault == 'drop':
+                return
+            if fault == 'stall':
+                await asyncio.sleep(self.faults.stall_s)
+                return
+            await asyncio.sleep(delay)
+
+            if path == '/events':
+                await self._events(writer)
+                return
+            status, content_type, body = self._route(path, params)
+            head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode()
+            if fault == 'slow':
+                # Headers first, then the body a few bytes at a time
+                writer.write(head)
+                await writer.drain()
+                pieces = max(1, len(body) // 4)
+                for i in range(pieces):
+                    await asyncio.sleep(self.faults.slow_s / pieces)
+                    writer.write(body[i * 4:(i + 1) * 4] if i < pieces - 1 else body[i * 4:])
+                    await writer.drain()
+            else:
+                writer.write(head + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the emulator is shutting down
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, path, params):
+        if path in ('/sensor/moisture', '/sensor/light'):
+            return '200 OK', 'application/json', json.dumps(self.sensor_json(path.rsplit('/', 1)[1])).encode()
+        if path == BATCH_ENDPOINT:
+            return '200 OK', 'application/json', json.dumps(self.batch_json()).encode()
+        if path == '/readings':
+            since = int(params.get('since') or 0)
+            limit = int(params.get('limit') or READING_RESPONSE_LIMIT)
+            return '200 OK', 'text/csv', self.readings_csv(since, limit).encode()
+        return '404 Not Found', 'text/plain', b'Not Found'
+
+    async def _events(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+        ping = {'title': self.name, 'comment': '', 'ota': False, 'log': True, 'lang': 'en'}
+        writer.write(f"retry: 30000\nid: {int(self.uptime() * 1000)}\nevent: ping\ndata: {json.dumps(ping)}\n\n".encode())
+        while True:
+            for state in (self.sensor_json('moisture'), self.sensor_json('light'), self.batch_json()):
+                writer.write(f"event: state\ndata: {json.dumps(state)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(SENSOR_UPDATE_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--trace', nargs='*', help="replay these sensor traces instead of scripted values")
+    parser.add_argument('--speed', type=float, default=1.0, help="node seconds per real second")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--drop', type=float, default=0.0, help="probability of closing without an answer")
+    parser.add_argument('--slow', type=float, default=0.0, help="probability of trickling the body")
+    parser.add_argument('--slow-s', type=float, default=3.0)
+    parser.add_argument('--stall', type=float, default=0.0, help="probability of holding the request open")
+    parser.add_argument('--stall-s', type=float, default=30.0)
+    parser.add_argument('--max-connections', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    values = TraceValues(Trace.load(args.trace), args.speed) if args.trace else ScriptedValues(speed=args.speed)
+    faults = Faults(args.latency_ms, args.jitter_ms, args.drop, args.slow, args.slow_s,
+                    args.stall, args.stall_s, args.seed)
+    emulator = NodeEmulator(values, faults, args.host, args.port, max_connections=args.max_connections)
+    print(f"Emulating a plant node on http://{args.host}:{args.port} ({faults.describe()})")
+    try:
+        asyncio.run(emulator.serve())
+    except KeyboardInterrupt:
+        print(f"Stopped: {emulator.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Load test of the hub's sensor fetch path against node_emulator.py.
+
+    python3 node_loadtest.py [--polls 100] [--clients 1 4] [--interval 7] [--timeout 2]
+
+For every fault profile and client count, starts an emulated node on a
+free local port and has each client run SensorClient.read() (what the
+hub's sensor task does every poll) back to back. The hub's sensor loop
+sleeps its interval after each poll, so its real period is interval +
+poll time: the report shows poll time percentiles, failed polls, polls
+skipped by the open circuit breaker, and the resulting mean and p99 loop
+period. Extra clients model other users of the node (a second hub, a
+browser on /events, a backfill) competing for its few sockets.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from node_emulator import NodeEmulator, ScriptedValues, Faults
+from sensor_client import SensorClient, OPEN
+
+PROFILES = [
+    ('clean', {}),
+    ('wifi', {'latency_ms': 40, 'jitter_ms': 30}),
+    ('congested', {'latency_ms': 150, 'jitter_ms': 150, 'drop': 0.02}),
+    ('stalls 2%', {'latency_ms': 40, 'jitter_ms': 30, 'stall': 0.02, 'stall_s': 30}),
+    ('slow body 5%', {'latency_ms': 40, 'jitter_ms': 30, 'slow': 0.05, 'slow_s': 3}),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_client(address, polls, timeout, results):
+    client = SensorClient(address, timeout=timeout)
+    for _ in range(polls):
+        skipped = client.breaker.state == OPEN and client.breaker.retry_in() > 0
+        started = time.perf_counter()
+        reading = client.read()
+        elapsed = time.perf_counter() - started
+        results.append((elapsed, 'skipped' if skipped else 'ok' if reading else 'failed'))
+
+
+def run_profile(faults, clients, polls, timeout, max_connections, seed):
+    emulator = NodeEmulator(ScriptedValues(), Faults(seed=seed, **faults), port=0,
+                            max_connections=max_connections).start()
+    address = f"127.0.0.1:{emulator.port}"
+    results = []
+    threads = [threading.Thread(target=run_client, args=(address, polls, timeout, results))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    emulator.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--polls', type=int, default=100, help="polls per client")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--interval', type=float, default=7.0, help="hub poll interval (update_interval)")
+    parser.add_argument('--timeout', type=float, default=2.0, help="sensor_client timeout")
+    parser.add_argument('--max-connections', type=int, default=4, help="sockets the node serves at once")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'profile':<14} {'clients':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+          f"{'failed':>6} {'skipped':>7} {'period':>7} {'p99 per':>7}")
+    for name, faults in PROFILES:
+        for clients in args.clients:
+            results = run_profile(faults, clients, args.polls, args.timeout, args.max_connections, args.seed)
+            attempted = [elapsed for elapsed, outcome in results if outcome != 'skipped']
+            failed = sum(1 for _, outcome in results if outcome == 'failed')
+            skipped = sum(1 for _, outcome in results if outcome == 'skipped')
+            periods = [args.interval + elapsed for elapsed, _ in results]
+            print(f"{name:<14} {clients:>7} "
+                  f"{percentile(attempted, 0.5) * 1000:>7.0f} {percentile(attempted, 0.95) * 1000:>7.0f} "
+                  f"{percentile(attempted, 0.99) * 1000:>7.0f} {max(attempted) * 1000:>7.0f} "
+                  f"{failed / len(results):>6.1%} {skipped / len(results):>7.1%} "
+                  f"{sum(periods) / len(periods):>6.2f}s {percentile(periods, 0.99):>6.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
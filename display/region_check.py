@@ -0,0 +1,145 @@
+"""
+Checks the partial refresh path (display_region / display_Partial) on a
+recording board (spi_recorder.py): for windows on M, on S, across the
+x=680 split and at its edges, each controller must get the exact 0x61
+(size) and 0x62 (start) bytes in its own coordinates, and exactly its
+byte columns of the window, in the 0x13 write and again in the 0x10
+write that follows the refresh.
+
+    python3 region_check.py
+
+Exits non-zero if any case fails.
+"""
+import sys
+
+from spi_recorder import open_board
+
+wire, epdconfig = open_board()
+
+from waveshare_epd.epd10in85 import EPD
+
+PANEL_STRIDE = 1360 // 8
+SPLIT = 680
+
+
+def pattern(byte_width, height, seed):
+    return bytes((row * 31 + col * 7 + seed) & 0xFF for row in range(height) for col in range(byte_width))
+
+
+def columns(data, stride, first, count, height):
+    """Byte columns [first, first + count) of every row, contiguous."""
+    return b''.join(data[row * stride + first:row * stride + first + count] for row in range(height))
+
+
+def window(x, y, width, height):
+    return [(0x61, bytes((width >> 8, width & 0xFF, height >> 8, height & 0xFF))),
+            (0x62, bytes((x >> 8, x & 0xFF, y >> 8, y & 0xFF)))]
+
+
+def expect(name, side, received, expected):
+    if received != expected:
+        lines = [f"{name}: controller {side} received"]
+        lines += [f"    {command:#04x} {data[:8].hex()}{'...' if len(data) > 8 else ''} ({len(data)} bytes)"
+                  for command, data in received]
+        lines.append("  expected")
+        lines += [f"    {command:#04x} {data[:8].hex()}{'...' if len(data) > 8 else ''} ({len(data)} bytes)"
+                  for command, data in expected]
+        raise AssertionError('\n'.join(lines))
+
+
+def check_region(epd, name, x, y, width, height, stride=None, preload=()):
+    """
+    Sends one window and compares both controllers' streams with what the
+    window means in their coordinates. preload lists the sides that get the
+    white 0x00 preload (first window after init_Part).
+    """
+    if stride is None:
+        source, source_stride, offset = pattern(width // 8, height, x // 8), width // 8, 0
+        data = source
+    else:
+        # A window straight out of a full frame, as the compositor sends it
+        source, source_stride, offset = pattern(PANEL_STRIDE, 480, 0), stride, y * stride + x // 8
+        data = memoryview(source)[offset:]
+    wire.clear()
+    epd.display_region(data, x, y, width, height, stride)
+
+    # Split by hand: [x, end) in panel coordinates, M left of SPLIT, S right of it
+    end = x + width
+    parts = {}
+    if x < SPLIT:
+        parts['M'] = (x, min(end, SPLIT) - x, 0)
+    if end > SPLIT:
+        start = max(x, SPLIT)
+        parts['S'] = (start - SPLIT, end - start, (start - x) // 8)
+    # A controller outside the window gets the window of the (only) one inside
+    inside_x, inside_width, _ = next(iter(parts.values()))
+    idle_window = window(inside_x, y, inside_width, height)
+
+    for side in 'MS':
+        if side not in parts:
+            expect(name, side, wire.received(side), idle_window + [(0x12, b'')])
+            continue
+        local_x, part_width, first = parts[side]
+        rows = columns(source[offset:], source_stride, first, part_width // 8, height)
+        expected = window(local_x, y, part_width, height)
+        if side in preload:
+            expected.append((0x00, b'\xff' * len(rows)))
+        expected += [(0x13, rows), (0x12, b''), (0x10, rows)]
+        expect(name, side, wire.received(side), expected)
+
+
+def check_partial(epd):
+    # Xstart/Xend widen to whole bytes: 5..240 becomes x=0, width 240
+    data = pattern(30, 20, 1)
+    wire.clear()
+    epd.display_Partial(data, 5, 5, 240, 25)
+    expect('display_Partial', 'M', wire.received('M'),
+           window(0, 5, 240, 20) + [(0x13, data), (0x12, b''), (0x10, data)])
+    expect('display_Partial', 'S', wire.received('S'), window(0, 5, 240, 20) + [(0x12, b'')])
+
+
+def check_bounds(epd):
+    for args in ((4, 0, 16, 8), (0, 0, 12, 8), (1352, 0, 16, 8), (0, 470, 16, 20), (-8, 0, 16, 8)):
+        try:
+            epd.display_region(bytes(8 * 20), *args)
+        except ValueError:
+            continue
+        raise AssertionError(f"display_region{args} was accepted")
+
+
+def main():
+    epd = EPD()
+    epd.init_Part()
+    cases = [
+        # name, x, y, width, height, stride, preload
+        ('across the split, first window', 600, 10, 240, 50, None, 'S'),
+        ('inside M', 8, 10, 200, 50, None, ''),
+        ('inside S', 704, 10, 160, 50, None, ''),
+        ('across the split', 600, 10, 240, 50, None, ''),
+        ('last byte of M', 672, 0, 8, 480, None, ''),
+        ('first byte of S', 680, 0, 8, 480, None, ''),
+        ('one byte each side', 672, 100, 16, 3, None, ''),
+        ('full width', 0, 0, 1360, 480, None, ''),
+        ('across the split, strided', 600, 300, 240, 40, PANEL_STRIDE, ''),
+        ('inside S, strided', 1000, 300, 360, 40, PANEL_STRIDE, ''),
+    ]
+    failed = 0
+    for name, x, y, width, height, stride, preload in cases:
+        try:
+            check_region(epd, name, x, y, width, height, stride, preload)
+            print(f"ok    {name} ({width}x{height} at {x},{y})")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {e}")
+    for name, check in (('display_Partial', check_partial), ('window bounds', check_bounds)):
+        try:
+            check(epd)
+            print(f"ok    {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Message selection and text rendering for the logical canvas.
+"""
+import random
+import time
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+from fonts import load_font
+from glyph_atlas import GlyphAtlas
+from state_classifier import StateClassifier
+
+SMALL_FONT_SIZE = 24
+MAX_FONT_SIZE = 100       # draw_multiline_text tries sizes from here down
+LOG_FONT_SIZE = 10
+DEV_MODE_FONT_SIZE = 100
+DEV_MODE_TEXT = "식물의 마음을\n읽을 수 없어요."
+
+# Font size that fitted last time per (text, font_path, box): a repeated
+# message loads one size instead of walking the font cache through up to 17
+FIT_CACHE_SIZE = 64
+FITTED_SIZES = OrderedDict()
+
+# Rasterized glyphs for the message text (1-bit masks + metrics)
+GLYPH_ATLAS = GlyphAtlas()
+
+def get_state_keys(moisture, light, config, classifier=None, now=None):
+    """
+    Returns the message lookup keys for the current state, most specific first.
+    Without a classifier the thresholds are applied directly (no hysteresis).
+    now is the monotonic reading time (defaults to the current time).
+    """
+    values = {"moisture": moisture, "light": light}
+    if classifier is None:
+        return StateClassifier.from_config(config).classify(values)
+    return classifier.update(values, time.monotonic() if now is None else now)
+
+def pick_message(state_keys, config):
+    """
+    Returns a random message dictionary for the first state key that has messages.
+    Returns: {'text': str, 'font_id': int}
+    """
+    messages_dict = config.get('messages', {})
+    messages = []
+    for state_key in state_keys:
+        messages = messages_dict.get(state_key, [])
+        if messages:
+            break
+    
+    default_font_id = config.get('default_font_id', 1)
+
+    if not messages:
+        return {"text": "...", "font_id": default_font_id}
+        
+    selected = random.choice(messages)
+    
+    # Handle string (legacy) or dict (new) format
+    if isinstance(selected, str):
+        return {"text": selected, "font_id": default_font_id}
+    elif isinstance(selected, dict):
+        return {
+            "text": selected.get("text", "..."), 
+            "font_id": selected.get("font_id", default_font_id)
+        }
+    
+    return {"text": "Format Error", "font_id": default_font_id}
+
+def get_message_for_state(moisture, light, config, classifier=None):
+    """
+    Determines the state based on sensor values and returns a random message dictionary.
+    Returns: {'text': str, 'font_id': int}
+    """
+    return pick_message(get_state_keys(moisture, light, config, classifier), config)
+
+def draw_multiline_text(draw, text, box_width, box_height, font_path, origin=(0, 0)):
+    """
+    Draws text centered in the box, automatically wrapping lines and adjusting font size.
+    The box's top-left corner is at origin. Returns the bounding box
+    (left, top, right, bottom) of the drawn text block, or None if nothing was drawn.
+    """
+    if not text:
+        return None
+
+    # Start with a large font size (or the one that fitted before) and decrease until it fits
+    fit_key = (text, font_path, box_width, box_height)
+    font_size = FITTED_SIZES.get(fit_key, MAX_FONT_SIZE)
+    min_font_size = 20
+    
+    final_lines = []
+    final_font = None
+    final_line_height = 0
+    final_line_spacing = 0
+    
+    lines = [] # Initialize to avoid unbound error
+    font = None
+
+    while font_size >= min_font_size:
+        try:
+            font = load_font(font_size, font_path)
+        except IOError:
+            font = ImageFont.load_default()
+            # If default font, we can't resize. Just wrap and break.
+            min_font_size = 1000 # Force break loop
+            
+        # Try to wrap text with current font size
+        words = text.split()
+        lines = []
+        current_line = []
+        
+        # Simple word wrap
+        for word in words:
+            # Use current_line + [word] to test length
+            # If empty current_line, just [word]
+            if not current_line:
+                test_line_str = word
+            else:
+                test_line_str = ' '.join(current_line + [word])
+            
+            bbox = draw.textbbox((0, 0), test_line_str, font=font)
+            w = bbox[2] - bbox[0]
+            
+            if w <= box_width:
+                current_line.append(word)
+            else:
+                if current_line:
+                    lines.append(' '.join(current_line))
+                    current_line = [word]
+                else:
+                    # Word itself is too long, just add it
+                    lines.append(word)
+                    current_line = []
+        
+        if current_line:
+            lines.append(' '.join(current_line))
+            
+        # Check total height
+        bbox_sample = draw.textbbox((0, 0), "Tg", font=font)
+        h_line = bbox_sample[3] - bbox_sample[1]
+        line_spacing = int(h_line * 0.2)
+        total_height = len(lines) * h_line + (len(lines) - 1) * line_spacing
+        
+        if total_height <= box_height:
+            # It fits! Save and break.
+            final_lines = lines
+            final_font = font
+            final_line_height = h_line
+            final_line_spacing = line_spacing
+            break
+            
+        font_size -= 5
+
+    if min_font_size != 1000:
+        # Smallest size tried when nothing fits, so the next walk starts (and ends) there
+        remember_fit(fit_key, max(font_size, min_font_size))
+    
+    # If loop finished without break (didn't fit even at min size), use min size results (last attempt)
+    if not final_lines:
+        final_lines = lines 
+        final_font = font
+        # If font was never loaded or lines empty (unlikely), set defaults
+        if final_font is None:
+             try:
+                 final_font = load_font(min_font_size, font_path)
+             except:
+                 final_font = ImageFont.load_default()
+        
+        # Recalculate height for fallback
+        bbox_sample = draw.textbbox((0, 0), "Tg", font=final_font)
+        final_line_height = bbox_sample[3] - bbox_sample[1]
+        final_line_spacing = int(final_line_height * 0.2)
+        print("Warning: Text too long to fit perfectly, drawing with minimum size.")
+
+    # Calculate total height for vertical centering
+    total_text_height = len(final_lines) * final_line_height + (len(final_lines) - 1) * final_line_spacing
+    origin_x, origin_y = origin
+    start_y = origin_y + (box_height - total_text_height) // 2
+    
+    # Composite cached glyphs when the font came from font_path; PIL handles the rest
+    use_atlas = getattr(final_font, 'path', None) == font_path
+
+    current_y = start_y
+    block_left = block_right = origin_x + box_width // 2
+    for line in final_lines:
+        bbox = draw.textbbox((0, 0), line, font=final_font)
+        w = bbox[2] - bbox[0]
+        x = origin_x + (box_width - w) // 2
+        if not (use_atlas and GLYPH_ATLAS.draw_text(draw, (x, current_y), line, final_font, font_path, final_font.size)):
+            draw.text((x, current_y), line, font=final_font, fill=0)
+        block_left = min(block_left, x + bbox[0])
+        block_right = max(block_right, x + bbox[2])
+        current_y += final_line_height + final_line_spacing
+
+    # Lines are positioned by their origin; the ink starts below it
+    ink_top = start_y + draw.textbbox((0, 0), "Tg", font=final_font)[1]
+    return (block_left, ink_top, block_right, ink_top + total_text_height)
+
+def remember_fit(key, font_size):
+    FITTED_SIZES[key] = font_size
+    FITTED_SIZES.move_to_end(key)
+    if len(FITTED_SIZES) > FIT_CACHE_SIZE:
+        FITTED_SIZES.popitem(last=False)
+
+def draw_message(canvas, draw, text, font_path, box_width, box_height, layout=None, state_key=None):
+    """
+    Draws the message, in a speech bubble with state icons when a layout is given.
+    """
+    if layout is None:
+        draw_multiline_text(draw, text, box_width, box_height, font_path)
+        return
+
+    x, y, w, h = layout.text_box()
+    text_bbox = draw_multiline_text(draw, text, w, h, font_path, origin=(x, y))
+    if text_bbox:
+        layout.draw_bubble(draw, text_bbox)
+    layout.draw_icons(canvas, state_key)
+
+def draw_centered_text(draw, text, font, box_width, box_height):
+    """
+    Draws (possibly multi-line) text centered in the box at a fixed font size.
+    """
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_w = bbox[2] - bbox[0]
+    text_h = bbox[3] - bbox[1]
+    
+    # Center the text
+    x = (box_width - text_w) // 2
+    y = (box_height - text_h) // 2
+    draw.text((x, y), text, font=font, fill=0, align="center")
@@ -0,0 +1,245 @@
+"""
+Replays sensor traces through the hub at virtual time.
+
+    python3 replay.py traces/ePlantalk01-*.jsonl [--host ePlantalk01] [--seed 0]
+    python3 replay.py --synthetic 7 [--host ePlantalk01]
+
+The hub's own decision, render and refresh code runs unchanged: a virtual
+clock jumps straight to the next poll the scheduler asks for, the sensor
+client answers from the trace (the last sample at or before that time,
+link failures included), and a fake panel counts what would have been
+sent. The current config is used, so thresholds, dwell times and
+intervals can be tuned against a recorded week in seconds. Without a
+config.json (it is not in git) the checked-in config.example.json is the
+base; --config picks another.
+
+Reports, per simulated day: polls, full and partial refreshes, polls that
+needed no refresh, state transitions, the mean poll interval and the CPU
+seconds the hub spent (rendering, composing, deciding).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+from config_loader import CONFIG_FILE, EXAMPLE_CONFIG_FILE, load_config
+from hub import Hub
+from sensor_trace import Trace, TraceSample
+
+PANEL_SIZE = (1360, 480)
+
+
+class VirtualClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakePanel:
+    """Accepts everything the hub sends to an EPD and counts it."""
+
+    def __init__(self, width=PANEL_SIZE[0], height=PANEL_SIZE[1]):
+        self.width = width
+        self.height = height
+        self.busy_abort = threading.Event()
+        self.counts = {'init': 0, 'init_Part': 0, 'display': 0, 'display_region': 0}
+
+    def init(self):
+        self.counts['init'] += 1
+        return 0
+
+    def init_Part(self):
+        self.counts['init_Part'] += 1
+        return 0
+
+    def display(self, frame):
+        self.counts['display'] += 1
+
+    def display_region(self, data, x, y, width, height, stride=None):
+        self.counts['display_region'] += 1
+
+    def recover(self):
+        return self.init()
+
+
+class TraceSensor:
+    """SensorClient stand-in answering from the trace at the virtual time."""
+
+    def __init__(self, trace, clock):
+        self.trace = trace
+        self.clock = clock
+
+    def read(self):
+        return self.trace.at(self.clock()).reading
+
+    @property
+    def connection_state(self):
+        return f"link: {self.trace.at(self.clock()).link or 'closed'}"
+
+
+class TraceBackfill:
+    """Nothing to catch up on: the trace already holds every reading."""
+    synced = True
+
+    def catch_up(self, history, now=None):
+        return 0
+
+
+class DayStats:
+    def __init__(self):
+        self.polls = 0
+        self.full = 0
+        self.partial = 0
+        self.unchanged = 0
+        self.transitions = []
+        self.cpu = 0.0
+        self.interval_sum = 0.0
+
+
+def synthetic_trace(days, ssid, seed=0, step=60):
+    """
+    Days of readings every step seconds: daylight from 6:00 to 20:00 with
+    passing clouds, moisture drying out by about 0.5 per day and watered
+    back up below 1.0, and occasional link dropouts lasting a few minutes.
+    """
+    rng = random.Random(seed)
+    start = time.mktime(time.strptime('2026-01-05', '%Y-%m-%d'))
+    moisture = 2.8
+    outage = 0
+    samples = []
+    for i in range(int(days * 86400 / step)):
+        t = start + i * step
+        hour = (t - start) % 86400 / 3600
+        daylight = max(0.0, math.sin((hour - 6) / 14 * math.pi)) if 6 <= hour <= 20 else 0.0
+        light = round(max(0.0, 3.0 * daylight * rng.uniform(0.7, 1.0) + rng.gauss(0, 0.05)), 2)
+        moisture -= 0.5 * step / 86400
+        if moisture < 1.0 and 8 <= hour <= 9:
+            moisture = 2.8
+        if outage == 0 and rng.random() < 0.002:
+            outage = rng.randint(2, 10)
+        if outage:
+            outage -= 1
+            samples.append(TraceSample(t, ssid, True, None, 'open'))
+        else:
+            reading = (round(moisture + rng.gauss(0, 0.01), 3), light)
+            samples.append(TraceSample(t, ssid, True, reading, 'closed'))
+    return Trace(samples)
+
+
+async def replay(hub, trace, clock, panel):
+    days = {}
+    hub.sensor_client = TraceSensor(trace, clock)
+    hub.backfill = TraceBackfill()
+    hub.read_ssid = lambda: trace.at(clock()).ssid
+    try:
+        t = trace.start
+        while t <= trace.end:
+            clock.now = t
+            day = days.setdefault(time.strftime('%Y-%m-%d', time.localtime(t)), DayStats())
+            before_state = hub.current_state
+            before = dict(panel.counts)
+            cpu = time.process_time()
+
+            await hub.poll_sensor()
+            await hub.refresh()
+
+            day.cpu += time.process_time() - cpu
+            day.polls += 1
+            day.interval_sum += hub.scheduler.interval
+            if panel.counts['display'] > before['display']:
+                day.full += 1
+            elif panel.counts['init_Part'] > before['init_Part']:
+                day.partial += 1
+            else:
+                day.unchanged += 1
+            if before_state is not None and hub.current_state != before_state:
+                day.transitions.append((t, before_state, hub.current_state))
+
+            t += hub.scheduler.interval
+    finally:
+        hub.io.shutdown(wait=False)
+        hub.spi.shutdown(wait=True)
+    return days
+
+
+def report(days, classifier_stats, sensor_flags=None, list_transitions=False):
+    print(f"{'day':<11} {'polls':>6} {'full':>5} {'partial':>7} {'none':>5} {'trans':>5} "
+          f"{'interval':>8} {'cpu s':>7}")
+    total = DayStats()
+    for name, day in sorted(days.items()):
+        print(f"{name:<11} {day.polls:>6} {day.full:>5} {day.partial:>7} {day.unchanged:>5} "
+              f"{len(day.transitions):>5} {day.interval_sum / day.polls:>7.0f}s {day.cpu:>7.2f}")
+        for attr in ('polls', 'full', 'partial', 'unchanged', 'cpu', 'interval_sum'):
+            setattr(total, attr, getattr(total, attr) + getattr(day, attr))
+        total.transitions += day.transitions
+    count = max(1, len(days))
+    print(f"{'per day':<11} {total.polls / count:>6.0f} {total.full / count:>5.1f} "
+          f"{total.partial / count:>7.1f} {total.unchanged / count:>5.0f} "
+          f"{len(total.transitions) / count:>5.1f} {'':>8} {total.cpu / count:>7.2f}")
+
+    if list_transitions and total.transitions:
+        print("\nState transitions:")
+        for t, previous, state in total.transitions:
+            print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(t))}  {previous} -> {state}")
+    print(f"\nClassifier: {classifier_stats['transitions']}")
+    if sensor_flags is not None:
+        print(f"Sensor flags (readings): {sensor_flags or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('traces', nargs='*', help="trace files written by the hub (sensor_trace.py)")
+    parser.add_argument('--host', default=None, help="config overlay to use (default: this machine)")
+    parser.add_argument('--config', default=None,
+                        help="base config (default: config.json, else config.example.json)")
+    parser.add_argument('--synthetic', type=float, metavar='DAYS', help="replay a generated trace instead")
+    parser.add_argument('--seed', type=int, default=0, help="seeds message choice and the synthetic trace")
+    parser.add_argument('--transitions', action='store_true', help="list every state transition")
+    parser.add_argument('--verbose', action='store_true', help="show the hub's own output")
+    args = parser.parse_args()
+
+    base_file = args.config or (CONFIG_FILE if os.path.exists(CONFIG_FILE) else EXAMPLE_CONFIG_FILE)
+    if not os.path.exists(base_file):
+        parser.error(f"config not found: {base_file}")
+    config = load_config(args.host, base_file)
+    # Replays must not touch the live history, health log or traces
+    config.setdefault('backfill', {})['history_file'] = None
+    config.setdefault('health', {})['log_file'] = None
+    config['trace'] = {'enabled': False}
+
+    if args.synthetic:
+        ssid = config.get('target_ssid') or config.get('target_ssid_prefix') or ''
+        trace = synthetic_trace(args.synthetic, ssid, args.seed)
+    elif args.traces:
+        trace = Trace.load(args.traces)
+    else:
+        parser.error("give trace files or --synthetic DAYS")
+
+    random.seed(args.seed)
+    clock = VirtualClock(trace.start)
+    panel = FakePanel()
+    hub = Hub(config, panel, (panel.width, panel.height), hostname=args.host, clock=clock,
+              wall_clock=clock)
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        days = asyncio.run(replay(hub, trace, clock, panel))
+    elapsed = time.perf_counter() - started
+
+    simulated = trace.end - trace.start
+    print(f"Replayed {simulated / 86400:.1f} days ({len(trace.samples)} samples) in {elapsed:.1f}s\n")
+    report(days, hub.classifier.stats(), hub.sensor_stats.counts, args.transitions)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
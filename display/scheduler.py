@@ -0,0 +1,94 @@
+"""
+Adaptive polling/refresh scheduler.
+
+Plant moisture changes over hours, so polling at a fixed 'update_interval'
+wastes CPU, Wi-Fi and panel activity. The scheduler stretches the period
+geometrically while readings are stable (further at night, judged by the
+light sensor since there is no NTP in operation), and snaps back to the
+minimum while sensor_stats.py flags watering or after a state change.
+"""
+
+
+class AdaptiveScheduler:
+    def __init__(self, base_interval=7, min_interval=5, max_interval=120,
+                 night_max_interval=600, growth=1.5, stable_moisture=0.02,
+                 stable_light=0.05, night_light=1.5):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.night_max_interval = night_max_interval
+        self.growth = growth
+        self.stable_moisture = stable_moisture
+        self.stable_light = stable_light
+        self.night_light = night_light
+
+        self.interval = base_interval
+        self.reason = "startup"
+        self._last = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds a scheduler from 'update_interval' and the optional 'scheduler' config section.
+        """
+        options = config.get('scheduler', {})
+        base = config.get('update_interval', 7)
+        thresholds = config.get('thresholds', {})
+        return cls(
+            base_interval=base,
+            min_interval=options.get('min_interval', min(base, 5)),
+            max_interval=options.get('max_interval', 120),
+            night_max_interval=options.get('night_max_interval', 600),
+            growth=options.get('growth', 1.5),
+            stable_moisture=options.get('stable_moisture', 0.02),
+            stable_light=options.get('stable_light', 0.05),
+            night_light=options.get('night_light', thresholds.get('light_bright', 1.5)),
+        )
+
+    def observe(self, moisture, light, state_changed=False, flags=()):
+        """
+        Feeds one sensor reading and returns the period until the next one.
+        flags are the SensorStats flags raised on this reading.
+        """
+        last = self._last
+        self._last = (moisture, light)
+
+        is_night = light < self.night_light
+        ceiling = self.night_max_interval if is_night else self.max_interval
+
+        if last is None:
+            return self._set(self.base_interval, "first reading")
+
+        d_moisture = abs(moisture - last[0])
+        d_light = abs(light - last[1])
+
+        # SensorStats holds the flag for its event_hold after the jump
+        if 'watering' in flags:
+            return self._set(self.min_interval, "watering detected")
+        if state_changed:
+            return self._set(self.min_interval, "state changed")
+        if d_moisture <= self.stable_moisture and d_light <= self.stable_light:
+            stretched = max(self.interval, self.base_interval) * self.growth
+            return self._set(min(stretched, ceiling), "stable (night)" if is_night else "stable")
+        return self._set(min(self.base_interval, ceiling), "changing")
+
+    def reset(self, reason="no sensor data"):
+        """Falls back to the base period, e.g. while the sensor is unreachable."""
+        self._last = None
+        return self._set(self.base_interval, reason)
+
+    def _set(self, interval, reason):
+        self.interval = max(self.min_interval, interval)
+        self.reason = reason
+        return self.interval
+
+    def limits(self):
+        """Returns the configured limits and the currently chosen period."""
+        return {
+            'interval': self.interval,
+            'reason': self.reason,
+            'min_interval': self.min_interval,
+            'base_interval': self.base_interval,
+            'max_interval': self.max_interval,
+            'night_max_interval': self.night_max_interval,
+        }
@@ -0,0 +1,215 @@
+"""
+Sensor node client with a circuit breaker.
+
+When the ESP32 AP is down every fetch would wait out its full timeout, so
+the client tracks each node's link health in a circuit breaker:
+
+- closed:    requests go through normally.
+- open:      the node is known to be dead; reads return immediately until
+             the next probe time, which backs off exponentially.
+- half_open: a cheap TCP connect probe decides whether to try a real read.
+"""
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+
+BATCH_ENDPOINT = "/text_sensor/sensors"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=2, base_backoff=5.0, max_backoff=300.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self.next_probe = 0.0
+
+    def allow(self):
+        """Returns True if a request may be attempted now."""
+        if self.state == OPEN and self.clock() >= self.next_probe:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = self.base_backoff
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # Probe failed: stay open and wait longer before the next one
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self._open()
+        elif self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.next_probe = self.clock() + self.backoff
+
+    def retry_in(self):
+        """Seconds until the next probe (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.next_probe - self.clock())
+
+    def status(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'backoff': self.backoff,
+            'retry_in': self.retry_in(),
+        }
+
+
+def get_sensor_value(endpoint, sensor_ip, timeout=2):
+    """
+    Fetches sensor data from ESP32.
+    Endpoint should be 'moisture' or 'light'.
+    Returns the 'value' from JSON or None if failed.
+    """
+    url = f"http://{sensor_ip}/sensor/{endpoint}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            if response.getcode() == 200:
+                data = json.loads(response.read().decode())
+                return data.get('value')
+    except Exception as e:
+        print(f"Error fetching {endpoint}: {e}")
+    return None
+
+
+class BatchUnsupported(Exception):
+    """The node firmware does not serve the batched endpoint."""
+
+
+def get_sensor_batch(sensor_ip, timeout=2):
+    """
+    Fetches all readings in one request from the node's 'sensors' text sensor.
+    Returns a dict with 'moisture', 'light', 'uptime_ms' and 'seq', or None if failed.
+    Raises BatchUnsupported if the firmware has no such endpoint (HTTP 404).
+    """
+    url = f"http://{sensor_ip}{BATCH_ENDPOINT}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            if response.getcode() == 200:
+                data = json.loads(response.read().decode())
+                # web_server wraps the text sensor: {"id": ..., "value": "<json>", "state": "<json>"}
+                return json.loads(data.get('value') or data.get('state'))
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            raise BatchUnsupported(url) from e
+        print(f"Error fetching sensor batch: {e}")
+    except Exception as e:
+        print(f"Error fetching sensor batch: {e}")
+    return None
+
+
+class SensorClient:
+    """
+    Reads moisture and light from one plant node, guarded by a circuit breaker.
+    Prefers the batched endpoint (one round-trip, consistent readings) and
+    falls back to the per-sensor URLs on older firmware.
+    """
+
+    def __init__(self, sensor_ip, timeout=2, probe_timeout=0.5, port=80, breaker=None):
+        self.sensor_ip = sensor_ip
+        self.timeout = timeout
+        self.probe_timeout = probe_timeout
+        self.port = port
+        self.breaker = breaker or CircuitBreaker()
+        self.use_batch = True
+        self.last_seq = None
+        self.last_uptime_ms = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds a client from 'sensor_ip' and the optional 'sensor_client' config section.
+        """
+        options = config.get('sensor_client', {})
+        breaker = CircuitBreaker(
+            failure_threshold=options.get('failure_threshold', 2),
+            base_backoff=options.get('base_backoff', 5.0),
+            max_backoff=options.get('max_backoff', 300.0),
+        )
+        return cls(
+            config.get('sensor_ip', '192.168.4.1'),
+            timeout=options.get('timeout', 2),
+            probe_timeout=options.get('probe_timeout', 0.5),
+            breaker=breaker,
+        )
+
+    def probe(self):
+        """Cheap reachability check: a bare TCP connect to the web server port."""
+        # sensor_ip may carry a port ("127.0.0.1:8080", e.g. node_emulator.py)
+        host, _, port = self.sensor_ip.partition(':')
+        try:
+            with socket.create_connection((host, int(port) if port else self.port), timeout=self.probe_timeout):
+                return True
+        except OSError:
+            return False
+
+    def read(self):
+        """
+        Returns (moisture, light), or None if the node is unreachable or the
+        breaker is open. Never blocks on a node that is known to be dead.
+        """
+        if not self.breaker.allow():
+            return None
+
+        if self.breaker.state == HALF_OPEN and not self.probe():
+            self.breaker.record_failure()
+            return None
+
+        moisture = light = None
+        if self.use_batch:
+            try:
+                batch = get_sensor_batch(self.sensor_ip, self.timeout)
+            except BatchUnsupported:
+                print("Node has no batched endpoint, using per-sensor URLs.")
+                self.use_batch = False
+            else:
+                if batch is None:
+                    self.breaker.record_failure()
+                    return None
+                moisture = batch.get('moisture')
+                light = batch.get('light')
+                self.last_seq = batch.get('seq')
+                self.last_uptime_ms = batch.get('uptime_ms')
+
+        if not self.use_batch:
+            moisture = get_sensor_value("moisture", self.sensor_ip, self.timeout)
+            # Skip the second request (and its timeout) if the first one failed
+            light = get_sensor_value("light", self.sensor_ip, self.timeout) if moisture is not None else None
+
+        if moisture is None or light is None:
+            self.breaker.record_failure()
+            return None
+
+        self.breaker.record_success()
+        return moisture, light
+
+    def reset(self):
+        """Forgets link history, e.g. after the Wi-Fi association changed or a reflash."""
+        self.breaker.record_success()
+        self.use_batch = True
+
+    @property
+    def connection_state(self):
+        """Short link description for the status line."""
+        state = self.breaker.state
+        if state == OPEN:
+            return f"link: open, retry {self.breaker.retry_in():.0f}s"
+        return f"link: {state}"
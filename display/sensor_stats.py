@@ -0,0 +1,283 @@
+"""
+Rolling statistics and health flags for the sensor streams.
+
+Every reading updates, in O(1) time, a rolling window per stream (moisture,
+light): mean and variance (Welford), minimum and maximum, and the rate of
+change. The window is a fixed number of time buckets. Each bucket keeps
+its own count, mean, M2, min and max. The buckets' moments are merged into
+a running aggregate when a bucket closes and removed again when it
+expires. Minima and maxima come from monotonic deques of buckets. Memory
+per stream therefore depends only on the bucket count, not on the window
+length or on how often readings arrive.
+
+From these, each stream raises flags:
+
+    <stream>_out_of_range  reading pinned near 0 V or ADC full scale (probe disconnected or shorted)
+    <stream>_stuck         spread below epsilon over the last stuck_after seconds (frozen sensor)
+    watering               moisture jump of at least jump, and jump_sigma standard deviations
+                           of the window, in one reading (held for event_hold seconds)
+
+The hub shows the flags on the status line, prefers 'sensor_fault' or
+'watering' messages when the config has them, and publishes the flags
+and window statistics on the control API.
+"""
+from collections import deque
+
+DEFAULT_WINDOW = 3600
+DEFAULT_BUCKETS = 30
+
+# ADC volts with 12 dB attenuation (plant_node/*.yaml); full scale reads ~3.1 V
+DEFAULT_STREAMS = {
+    'moisture': {'low': 0.05, 'high': 3.1, 'stuck_after': 1800, 'stuck_epsilon': 0.0005, 'jump': 0.2},
+    # Darkness legitimately reads 0 V for hours, so light has no low limit and no stuck check
+    'light': {'low': None, 'high': 3.1, 'stuck_after': None},
+}
+DEFAULT_JUMP_SIGMA = 4.0
+DEFAULT_EVENT_HOLD = 600
+
+# Flags that mean the readings cannot be trusted
+FAULTS = ('out_of_range', 'stuck')
+
+
+class Moments:
+    """Count, mean and M2 (sum of squared deviations) of a set of samples."""
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        # Welford
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other, sign=1):
+        """Adds other's samples (Chan et al.), or removes them with sign=-1."""
+        count = self.count + sign * other.count
+        if count <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        if sign > 0:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        else:
+            mean = (self.mean * self.count - other.mean * other.count) / count
+            delta = other.mean - mean
+            self.m2 = max(0.0, self.m2 - other.m2 - delta * delta * count * other.count / self.count)
+            self.mean = mean
+        self.count = count
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class Bucket(Moments):
+    __slots__ = ('start', 'first', 'min', 'max')
+
+    def __init__(self, start, first):
+        super().__init__()
+        self.start = start
+        self.first = first  # time of the first sample
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value):
+        super().add(value)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+
+class RollingStats:
+    """Statistics over the last window seconds, kept in a fixed number of buckets."""
+
+    def __init__(self, window=DEFAULT_WINDOW, buckets=DEFAULT_BUCKETS):
+        self.window = window
+        self.width = window / buckets
+        self.closed = deque()         # closed buckets still inside the window, oldest first
+        self.total = Moments()        # moments of the closed buckets
+        self.minima = deque()         # closed buckets with increasing min
+        self.maxima = deque()         # closed buckets with decreasing max
+        self.current = None
+        self.last = None              # (time, value) of the latest sample
+        self.rate = 0.0               # change per hour between the last two samples
+
+    def add(self, t, value):
+        if self.current is None or t >= self.current.start + self.width:
+            self._close()
+            self.current = Bucket(t - t % self.width, t)
+        self._expire(t)
+        self.current.add(value)
+        if self.last is not None and t > self.last[0]:
+            self.rate = (value - self.last[1]) / (t - self.last[0]) * 3600
+        self.last = (t, value)
+
+    def _close(self):
+        bucket = self.current
+        if bucket is None:
+            return
+        self.closed.append(bucket)
+        self.total.merge(bucket)
+        while self.minima and self.minima[-1].min >= bucket.min:
+            self.minima.pop()
+        self.minima.append(bucket)
+        while self.maxima and self.maxima[-1].max <= bucket.max:
+            self.maxima.pop()
+        self.maxima.append(bucket)
+
+    def _expire(self, t):
+        horizon = t - self.window
+        while self.closed and self.closed[0].start + self.width <= horizon:
+            bucket = self.closed.popleft()
+            self.total.merge(bucket, -1)
+            if self.minima and self.minima[0] is bucket:
+                self.minima.popleft()
+            if self.maxima and self.maxima[0] is bucket:
+                self.maxima.popleft()
+
+    def moments(self):
+        window = Moments()
+        window.merge(self.total)
+        if self.current is not None:
+            window.merge(self.current)
+        return window
+
+    @property
+    def count(self):
+        return self.total.count + (self.current.count if self.current else 0)
+
+    @property
+    def min(self):
+        candidates = [self.current.min] if self.current else []
+        if self.minima:
+            candidates.append(self.minima[0].min)
+        return min(candidates) if candidates else None
+
+    @property
+    def max(self):
+        candidates = [self.current.max] if self.current else []
+        if self.maxima:
+            candidates.append(self.maxima[0].max)
+        return max(candidates) if candidates else None
+
+    def span(self):
+        """Seconds from the oldest sample in the window to the latest one."""
+        if self.last is None:
+            return 0.0
+        oldest = self.closed[0] if self.closed else self.current
+        return self.last[0] - oldest.first
+
+    def snapshot(self):
+        moments = self.moments()
+        return {
+            'count': moments.count,
+            'mean': round(moments.mean, 4),
+            'std': round(moments.variance() ** 0.5, 4),
+            'min': self.min,
+            'max': self.max,
+            'rate_per_h': round(self.rate, 4),
+        }
+
+
+class StreamMonitor:
+    """Rolling statistics of one stream plus its range, stuck and jump checks."""
+
+    def __init__(self, name, window=DEFAULT_WINDOW, buckets=DEFAULT_BUCKETS, low=None, high=None,
+                 stuck_after=None, stuck_epsilon=0.0005, jump=None, jump_sigma=DEFAULT_JUMP_SIGMA,
+                 event_hold=DEFAULT_EVENT_HOLD):
+        self.name = name
+        self.stats = RollingStats(window, buckets)
+        # Stuck detection looks at its own, shorter window
+        self.recent = RollingStats(stuck_after, buckets) if stuck_after else None
+        self.low = low
+        self.high = high
+        self.stuck_after = stuck_after
+        self.stuck_epsilon = stuck_epsilon
+        self.jump = jump
+        self.jump_sigma = jump_sigma
+        self.event_hold = event_hold
+        self.jumped_at = None
+        self.flags = set()
+
+    def add(self, t, value):
+        stats = self.stats
+        if self.jump is not None and stats.last is not None:
+            delta = abs(value - stats.last[1])
+            # Compared with the spread before this reading
+            if delta >= self.jump and delta >= self.jump_sigma * stats.moments().variance() ** 0.5:
+                self.jumped_at = t
+        stats.add(t, value)
+        if self.recent is not None:
+            self.recent.add(t, value)
+
+        flags = set()
+        if (self.low is not None and value <= self.low) or (self.high is not None and value >= self.high):
+            flags.add('out_of_range')
+        recent = self.recent
+        if recent is not None and recent.span() >= self.stuck_after and recent.max - recent.min <= self.stuck_epsilon:
+            flags.add('stuck')
+        if self.jumped_at is not None and t - self.jumped_at < self.event_hold:
+            flags.add('jump')
+        self.flags = flags
+        return flags
+
+
+class SensorStats:
+    def __init__(self, monitors):
+        self.monitors = {monitor.name: monitor for monitor in monitors}
+        self.flags = []
+        self.counts = {}  # flag -> readings it was raised on
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds the monitors from the optional 'sensor_stats' config section:
+        window/buckets/jump_sigma/event_hold, plus per-stream low, high,
+        stuck_after, stuck_epsilon and jump overriding DEFAULT_STREAMS.
+        The older 'scheduler.watering_delta' still sets the moisture jump.
+        """
+        options = config.get('sensor_stats', {})
+        watering_delta = config.get('scheduler', {}).get('watering_delta')
+        monitors = []
+        for name, defaults in DEFAULT_STREAMS.items():
+            stream = dict(defaults)
+            if name == 'moisture' and watering_delta is not None:
+                stream['jump'] = watering_delta
+            stream.update(options.get(name, {}))
+            monitors.append(StreamMonitor(
+                name,
+                window=options.get('window', DEFAULT_WINDOW),
+                buckets=options.get('buckets', DEFAULT_BUCKETS),
+                jump_sigma=options.get('jump_sigma', DEFAULT_JUMP_SIGMA),
+                event_hold=options.get('event_hold', DEFAULT_EVENT_HOLD),
+                **stream,
+            ))
+        return cls(monitors)
+
+    def add(self, t, **values):
+        """Feeds one reading (e.g. moisture=1.2, light=0.4) and returns the active flags."""
+        flags = []
+        for name, value in values.items():
+            for flag in sorted(self.monitors[name].add(t, value)):
+                flags.append('watering' if (name, flag) == ('moisture', 'jump') else f"{name}_{flag}")
+        for flag in flags:
+            self.counts[flag] = self.counts.get(flag, 0) + 1
+        self.flags = flags
+        return flags
+
+    def fault(self):
+        """True if a current flag means the readings cannot be trusted."""
+        return any(flag.endswith(FAULTS) for flag in self.flags)
+
+    def snapshot(self):
+        return {
+            'flags': list(self.flags),
+            'counts': dict(self.counts),
+            'streams': {name: monitor.stats.snapshot() for name, monitor in self.monitors.items()},
+        }
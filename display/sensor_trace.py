@@ -0,0 +1,102 @@
+"""
+Sensor traces: what the hub saw on every poll, for offline replay.
+
+With "trace": {"enabled": true} the hub appends one JSON line per poll to
+traces/<hostname>-<date>.jsonl:
+
+    {"t": 1760851200.5, "ssid": "ePlantalk01", "match": true,
+     "moisture": 1.84, "light": 0.42, "link": "closed"}
+
+moisture and light are null when the read failed; link is the sensor
+circuit breaker state (null when the SSID did not match, so no read was
+attempted). replay.py feeds these back through the hub at virtual time.
+"""
+import json
+import os
+import time
+from bisect import bisect_right
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+
+
+class TraceRecorder:
+    def __init__(self, directory=DEFAULT_TRACE_DIR, prefix='trace'):
+        self.directory = directory
+        self.prefix = prefix
+
+    @classmethod
+    def from_config(cls, config, hostname):
+        """Returns a recorder for the optional 'trace' config section, or None if disabled."""
+        options = config.get('trace', {})
+        if not options.get('enabled', False):
+            return None
+        return cls(options.get('dir', DEFAULT_TRACE_DIR), hostname)
+
+    def path(self, timestamp):
+        # One file per day keeps files small and makes picking a period easy
+        day = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+        return os.path.join(self.directory, f'{self.prefix}-{day}.jsonl')
+
+    def record(self, timestamp, ssid, is_match, reading, link):
+        moisture, light = reading if reading is not None else (None, None)
+        record = {'t': round(timestamp, 3), 'ssid': ssid, 'match': is_match,
+                  'moisture': moisture, 'light': light, 'link': link}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(timestamp), 'a') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Could not write sensor trace: {e}")
+
+
+class TraceSample:
+    __slots__ = ('t', 'ssid', 'match', 'reading', 'link')
+
+    def __init__(self, t, ssid, match, reading, link):
+        self.t = t
+        self.ssid = ssid
+        self.match = match
+        self.reading = reading
+        self.link = link
+
+    @classmethod
+    def from_record(cls, record):
+        moisture, light = record.get('moisture'), record.get('light')
+        reading = (moisture, light) if moisture is not None and light is not None else None
+        return cls(record['t'], record.get('ssid', ''), record.get('match', True), reading, record.get('link'))
+
+
+class Trace:
+    """Samples ordered by time; at(t) is the last sample taken at or before t."""
+
+    def __init__(self, samples):
+        self.samples = sorted(samples, key=lambda s: s.t)
+        if not self.samples:
+            raise ValueError("Trace has no samples")
+        self.times = [s.t for s in self.samples]
+
+    @classmethod
+    def load(cls, paths):
+        samples = []
+        for path in paths:
+            with open(path) as f:
+                for number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        samples.append(TraceSample.from_record(json.loads(line)))
+                    except (ValueError, KeyError) as e:
+                        print(f"{path}:{number}: skipping bad record ({e})")
+        return cls(samples)
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def at(self, t):
+        return self.samples[max(0, bisect_right(self.times, t) - 1)]
@@ -0,0 +1,104 @@
+"""
+SPI profiling for the panel driver.
+
+SpiProfiler wraps the epdconfig functions the driver goes through
+(digital_write for the DC line, spi_writebyte*/spi_writebyte2* for each
+controller) and records, per command group, the bytes sent, the number of
+write calls and the wall time spent in them. Enable it with
+"spi": {"profile": true}; the hub then prints a report after every
+refresh and publishes the numbers on the control API's /state.
+"""
+import threading
+import time
+
+WRAPPED = ('digital_write', 'spi_writebyte_M', 'spi_writebyte_S', 'spi_writebyte2_M', 'spi_writebyte2_S')
+
+COMMAND_GROUPS = {
+    0x10: '0x10 old data',
+    0x13: '0x13 new data',
+    0x12: '0x12 refresh',
+    0x61: '0x61/0x62 window',
+    0x62: '0x61/0x62 window',
+}
+REGISTERS = 'init registers'
+
+
+def command_group(command):
+    return COMMAND_GROUPS.get(command, REGISTERS)
+
+
+class SpiProfiler:
+    def __init__(self, epdconfig):
+        self.epdconfig = epdconfig
+        self.originals = {}
+        self.lock = threading.Lock()
+        self.dc = 1
+        self.current = {'M': REGISTERS, 'S': REGISTERS}
+        self.groups = {}
+
+    def install(self):
+        for name in WRAPPED:
+            original = getattr(self.epdconfig, name, None)
+            if original is None or name in self.originals:
+                continue
+            self.originals[name] = original
+            setattr(self.epdconfig, name, self._wrap(name, original))
+
+    def uninstall(self):
+        for name, original in self.originals.items():
+            setattr(self.epdconfig, name, original)
+        self.originals = {}
+
+    def reset(self):
+        with self.lock:
+            self.groups = {}
+
+    def _wrap(self, name, original):
+        if name == 'digital_write':
+            dc_pin = getattr(self.epdconfig, 'DC_PIN', None)
+
+            def digital_write(pin, value):
+                if pin == dc_pin:
+                    self.dc = value
+                return original(pin, value)
+            return digital_write
+
+        side = name[-1]
+
+        def spi_write(data):
+            started = time.perf_counter()
+            result = original(data)
+            elapsed = time.perf_counter() - started
+            if self.dc == 0 and len(data):
+                # Command byte: following data belongs to this command
+                self.current[side] = command_group(data[0])
+            self._record(self.current[side], len(data), elapsed)
+            return result
+        return spi_write
+
+    def _record(self, group, length, elapsed):
+        with self.lock:
+            stats = self.groups.get(group)
+            if stats is None:
+                stats = self.groups[group] = {'bytes': 0, 'transactions': 0, 'seconds': 0.0}
+            stats['bytes'] += length
+            stats['transactions'] += 1
+            stats['seconds'] += elapsed
+
+    def stats(self):
+        with self.lock:
+            groups = {name: dict(stats) for name, stats in self.groups.items()}
+        for stats in groups.values():
+            seconds = stats['seconds']
+            stats['bytes_per_s'] = round(stats['bytes'] / seconds) if seconds else 0
+            stats['us_per_transaction'] = round(seconds / stats['transactions'] * 1e6, 1)
+            stats['seconds'] = round(seconds, 4)
+        return groups
+
+    def report(self):
+        lines = [f"{'group':<18} {'bytes':>9} {'calls':>7} {'ms':>9} {'kB/s':>8} {'us/call':>8}"]
+        for name, stats in sorted(self.stats().items()):
+            lines.append(f"{name:<18} {stats['bytes']:>9} {stats['transactions']:>7} "
+                         f"{stats['seconds'] * 1000:>9.1f} {stats['bytes_per_s'] / 1024:>8.1f} "
+                         f"{stats['us_per_transaction']:>8.1f}")
+        return '\n'.join(lines)
@@ -0,0 +1,177 @@
+"""
+Off-device recording of everything the panel driver sends.
+
+open_board() imports epdconfig as the Raspberry Pi board (EPD_BOARD) with
+RecordingSpiDev standing in for spidev.SpiDev and RecordingPins for the
+GPIO lines. The real driver and the real epdconfig write path then run
+unchanged, while a Wire records pin writes, delays and SPI transfers per
+chip select, in order. Delays are recorded, not slept, and BUSY always
+reads idle. Call it before anything else imports waveshare_epd.epdconfig:
+
+    wire, epdconfig = open_board()
+    from waveshare_epd.epd10in85 import EPD
+    epd = EPD()
+    epd.init()
+    wire.received('M')   # [(command, data)] as controller M saw it
+"""
+import hashlib
+import os
+import sys
+import types
+
+lib_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+if os.path.exists(lib_path):
+    sys.path.append(lib_path)
+
+DEFAULT_BUFSIZ = 4096    # spidev's bufsiz module parameter
+SIDES = {0: 'M', 1: 'S'}  # spidev device (chip select) -> controller, as in RaspberryPi.module_init
+
+
+class Wire:
+    """What went out of the board, in order: pin writes, delays and SPI transfers."""
+
+    def __init__(self, dc_pin=None, busy_pin=None):
+        self.dc_pin = dc_pin
+        self.busy_pin = busy_pin
+        self.levels = {}
+        self.events = []     # ('pin', pin, value) / ('delay', ms) / ('spi', side, dc, bytes)
+        self.devices = []    # every RecordingSpiDev created
+
+    def write(self, pin, value):
+        self.levels[pin] = value
+        self.events.append(('pin', pin, value))
+
+    def read(self, pin):
+        if pin == self.busy_pin:
+            return 1   # idle
+        return self.levels.get(pin)
+
+    def delay(self, ms):
+        self.events.append(('delay', ms))
+
+    def transfer(self, side, payload):
+        self.events.append(('spi', side, self.levels.get(self.dc_pin), payload))
+
+    def transfers(self, side=None):
+        return [event for event in self.events if event[0] == 'spi' and side in (None, event[1])]
+
+    def received(self, side):
+        """[(command, data)] as controller side saw them (DC low: command bytes, high: data)."""
+        commands = []
+        for _, _, dc, payload in self.transfers(side):
+            if dc == 0:
+                commands.extend([command, bytearray()] for command in payload)
+            elif commands:
+                commands[-1][1] += payload
+        return [(command, bytes(data)) for command, data in commands]
+
+    def stream(self):
+        """
+        The events as text, one per line, with back-to-back transfers to the
+        same controller merged: how a buffer is split into transfers does not
+        change what the controller receives.
+        """
+        merged = []
+        for event in self.events:
+            if event[0] == 'spi' and merged and merged[-1][0] == 'spi' and merged[-1][1:3] == event[1:3]:
+                merged[-1] = merged[-1][:3] + (merged[-1][3] + event[3],)
+            else:
+                merged.append(event)
+        lines = []
+        for event in merged:
+            if event[0] == 'spi':
+                _, side, dc, payload = event
+                digest = payload.hex() if len(payload) <= 16 else hashlib.sha1(payload).hexdigest()[:16]
+                lines.append(f"spi {side} dc={dc} {len(payload)} {digest}")
+            else:
+                lines.append(' '.join(str(part) for part in event))
+        return lines
+
+    def clear(self):
+        self.events = []
+        for device in self.devices:
+            device.sizes = []
+            device.bus_time = 0.0
+
+
+class RecordingSpiDev:
+    """
+    Stands in for spidev.SpiDev: records every transfer on the wire and
+    models its bus time as a fixed overhead plus bits over the clock.
+    """
+
+    def __init__(self, wire, bufsiz=DEFAULT_BUFSIZ, overhead_s=0.0):
+        self.wire = wire
+        self.bufsiz = bufsiz
+        self.overhead_s = overhead_s
+        self.side = None
+        self.max_speed_hz = 500000
+        self.mode = 0
+        self.sizes = []       # bytes per transfer
+        self.bus_time = 0.0
+        wire.devices.append(self)
+
+    def open(self, bus, device):
+        self.side = SIDES[device]
+
+    def close(self):
+        pass
+
+    def writebytes(self, data):
+        if len(data) > self.bufsiz:
+            raise OverflowError(f"transfer of {len(data)} bytes exceeds bufsiz {self.bufsiz}")
+        self._transfer(bytes(data))
+
+    def writebytes2(self, data):
+        # Like spidev: split into bufsiz transfers
+        data = memoryview(bytes(data) if isinstance(data, list) else data).cast('B')
+        for start in range(0, len(data), self.bufsiz):
+            self._transfer(bytes(data[start:start + self.bufsiz]))
+
+    def _transfer(self, payload):
+        if self.side is None:
+            raise RuntimeError("transfer on a closed SPI device")
+        self.sizes.append(len(payload))
+        self.bus_time += self.overhead_s + len(payload) * 8 / self.max_speed_hz
+        self.wire.transfer(self.side, payload)
+
+
+class RecordingPins:
+    """A gpio_backend pin set whose writers and readers go to the wire."""
+
+    name = 'recording'
+
+    def __init__(self, wire, pins):
+        self.writers = {pin: (lambda value, pin=pin: wire.write(pin, value)) for pin in pins}
+        self.readers = {pin: (lambda pin=pin: wire.read(pin)) for pin in pins}
+
+    def close(self):
+        pass
+
+
+def open_board(bufsiz=DEFAULT_BUFSIZ, overhead_s=0.0):
+    """Imports epdconfig on a recording Raspberry Pi board; returns (wire, epdconfig)."""
+    wire = Wire()
+    spidev = types.ModuleType('spidev')
+    spidev.SpiDev = lambda: RecordingSpiDev(wire, bufsiz, overhead_s)
+    previous = sys.modules.get('spidev')
+    os.environ['EPD_BOARD'] = 'RaspberryPi'
+    sys.modules['spidev'] = spidev
+    try:
+        from waveshare_epd import epdconfig
+    finally:
+        if previous is None:
+            del sys.modules['spidev']
+        else:
+            sys.modules['spidev'] = previous
+
+    board = epdconfig.implementation
+    if not isinstance(getattr(board, 'SPI_M', None), RecordingSpiDev):
+        raise RuntimeError("waveshare_epd.epdconfig was imported before open_board()")
+    wire.dc_pin = board.DC_PIN
+    wire.busy_pin = board.BUSY_PIN
+    pins = RecordingPins(wire, (board.RST_PIN, board.DC_PIN, board.PWR_PIN, board.BUSY_PIN,
+                                board.CS_M_PIN, board.CS_S_PIN))
+    board.pins, board.writers, board.readers = pins, pins.writers, pins.readers
+    epdconfig.delay_ms = wire.delay
+    return wire, epdconfig
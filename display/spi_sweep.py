@@ -0,0 +1,116 @@
+"""
+Sweeps SPI bus speed and spidev's bufsiz for the panel, off the Pi.
+
+Every combination runs the real EPD.init() and EPD.display() on a
+recording board (spi_recorder.py). RecordingSpiDev is installed as SPI_M
+and SPI_S. epdconfig.configure_spi and module_init set the clock, as they
+do on the Pi. The panel cannot be read back, so the check is on the
+recording. Each controller must receive:
+
+    the registers of the init table
+    0x10 white and 0x13 with its half of the frame
+    0x12 refresh
+
+and writebytes (single transfers, like spidev) must stay within bufsiz.
+The check fails when the driver or the epdconfig write path breaks the
+stream, whatever the clock.
+
+Bus time is modelled, not measured: a fixed per-transfer overhead plus
+bits over the clock. Whether the wiring carries a clock can only be seen
+on the panel itself (garbage or a stuck refresh after raising speed_hz),
+so the table shows what a setting would save if it works there, not which
+one to use.
+
+    python3 spi_sweep.py [--overhead-us 60]
+
+Exits non-zero if any combination fails the check. bufsiz is the spidev
+module parameter (spidev.bufsiz=N on the kernel command line); the speed
+goes in the host's "spi" config section.
+"""
+import argparse
+import sys
+
+from spi_recorder import open_board
+
+wire, epdconfig = open_board()
+
+from waveshare_epd.epd10in85 import EPD
+from waveshare_epd.sequencer import INIT_FULL, CMD
+
+# Raspberry Pi SPI clocks are the core clock divided by an even number
+SPEEDS = [2000000, 4000000, 8000000, 10000000, 12500000, 16000000, 20000000, 25000000, 32000000]
+BUFSIZES = [4096, 16384, 65536]
+
+
+def expected_streams(frame, width, height):
+    """[(command, data)] each controller must receive for init + display(frame)."""
+    half = width // 16
+    streams = {}
+    for index, side in enumerate('MS'):
+        rows = b''.join(frame[row * 2 * half + index * half:row * 2 * half + (index + 1) * half]
+                        for row in range(height))
+        streams[side] = [(step[1], step[2]) for step in INIT_FULL if step[0] == CMD] + [
+            (0x10, b'\xff' * len(rows)),
+            (0x13, rows),
+            (0x12, b''),
+        ]
+    return streams
+
+
+def check(expected):
+    for side, stream in expected.items():
+        if wire.received(side) != stream:
+            return f"controller {side} stream differs"
+    return None
+
+
+def sweep(overhead_s, speeds=SPEEDS, bufsizes=BUFSIZES):
+    epd = EPD()
+    # Deterministic, non-uniform test frame
+    frame = bytes((i * 37 + (i >> 8)) & 0xFF for i in range(epd.width // 8 * epd.height))
+    expected = expected_streams(frame, epd.width, epd.height)
+    results = []
+    for speed in speeds:
+        for bufsiz in bufsizes:
+            epdconfig.configure_spi(speed)
+            for device in wire.devices:
+                device.bufsiz = bufsiz
+                device.overhead_s = overhead_s
+            wire.clear()
+            try:
+                epd.init()
+                epd.display(frame)
+                error = check(expected)
+            except OverflowError as e:
+                error = str(e)
+            clocks = {device.max_speed_hz for device in wire.devices}
+            if error is None and clocks != {speed}:
+                error = f"devices clocked at {sorted(clocks)} Hz"
+            results.append({
+                'speed_hz': speed,
+                'bufsiz': bufsiz,
+                'transfers': sum(len(device.sizes) for device in wire.devices),
+                'bus_s': sum(device.bus_time for device in wire.devices),
+                'error': error,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--overhead-us', type=float, default=60.0, help="modelled fixed cost per transfer (ioctl)")
+    args = parser.parse_args()
+
+    results = sweep(args.overhead_us / 1e6)
+    print(f"{'speed MHz':>9} {'bufsiz':>6} {'transfers':>9} {'modelled bus ms':>15}  check")
+    failed = 0
+    for r in results:
+        failed += r['error'] is not None
+        print(f"{r['speed_hz'] / 1e6:>9.1f} {r['bufsiz']:>6} {r['transfers']:>9} "
+              f"{r['bus_s'] * 1000:>15.1f}  {'ok' if r['error'] is None else 'FAIL ' + r['error']}")
+    print("\nBus times are modelled; try a faster speed_hz on the panel before keeping it.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Parallel startup and time-to-first-frame.
+
+Panel bring-up (reset, init sequence, busy waits and the optional
+coordinate grid) is the first job on the hub's SPI thread from the moment
+the EPD object exists, so nothing else touches the panel until it ends. Meanwhile the main thread builds the hub (config compiled into
+classifier, status bar, compositor and layout), and once the hub runs its
+fonts and icons load on the I/O executor while the sensor task takes the
+first reading. Only the first SPI job waits for the panel, so the first
+real frame is rendered and composed by the time the panel is ready.
+
+Milestones are recorded as seconds since process start and printed once
+the first frame is on the panel.
+"""
+import time
+
+
+class Startup:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.marks = {}    # milestone -> seconds since start (first time reached)
+        self.panel = None  # concurrent.futures.Future of the panel bring-up
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = self.clock() - self.started
+        return self.marks[name]
+
+    def start_panel(self, executor, fn, *args):
+        """Submits fn(*args) to the (single-thread SPI) executor; marks 'panel' when it returns."""
+        def bring_up():
+            fn(*args)
+            self.mark('panel')
+
+        self.panel = executor.submit(bring_up)
+        return self.panel
+
+    def report(self):
+        milestones = ', '.join(f"{name} {seconds:.2f}s"
+                               for name, seconds in sorted(self.marks.items(), key=lambda item: item[1])
+                               if name != 'frame')
+        return f"First frame after {self.marks.get('frame', 0):.2f}s ({milestones})"
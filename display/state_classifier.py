@@ -0,0 +1,199 @@
+"""
+Plant state classifier with hysteresis.
+
+The plain thresholds from config ('moisture_low', 'moisture_high',
+'light_bright') are compiled once into a decision table. Each dimension
+(moisture, light, optionally a moisture trend) maps a reading to a band,
+and the tuple of bands maps to a state key such as 'dry_dark'.
+
+Readings hovering around a threshold would otherwise flip the state on
+every loop, so each boundary can carry a hysteresis band and the
+classifier can require a minimum time in a state before leaving it.
+"""
+import itertools
+from bisect import bisect_right
+
+DEFAULT_MOISTURE_LOW = 1.2
+DEFAULT_MOISTURE_HIGH = 2.5
+DEFAULT_LIGHT_BRIGHT = 1.5
+
+
+class Dimension:
+    """
+    One axis of the decision table: ascending boundaries split the input
+    value into len(boundaries) + 1 labelled bands.
+    """
+
+    def __init__(self, name, boundaries, labels, hysteresis=0.0, input_name=None):
+        if len(labels) != len(boundaries) + 1:
+            raise ValueError(f"Dimension '{name}' needs {len(boundaries) + 1} labels, got {len(labels)}")
+        if list(boundaries) != sorted(boundaries):
+            raise ValueError(f"Dimension '{name}' boundaries must be ascending: {boundaries}")
+
+        if isinstance(hysteresis, (int, float)):
+            hysteresis = [hysteresis] * len(boundaries)
+        if len(hysteresis) != len(boundaries):
+            raise ValueError(f"Dimension '{name}' needs one hysteresis value per boundary")
+
+        self.name = name
+        self.input_name = input_name or name
+        self.boundaries = tuple(boundaries)
+        self.labels = tuple(labels)
+        self.hysteresis = tuple(abs(h) for h in hysteresis)
+
+        # Precompute the shifted boundary list for every possible current band,
+        # so band() is a single bisect. Leaving band c upwards means crossing
+        # boundaries[k] (k >= c) by +h, leaving downwards means crossing
+        # boundaries[k] (k < c) by -h.
+        self._shifted = []
+        for current in range(len(self.labels)):
+            self._shifted.append([
+                b + h if k >= current else b - h
+                for k, (b, h) in enumerate(zip(self.boundaries, self.hysteresis))
+            ])
+
+    def band(self, value, current=None):
+        """Returns the band index for value, sticky around the current band."""
+        if current is None:
+            return bisect_right(self.boundaries, value)
+        return bisect_right(self._shifted[current], value)
+
+
+class Trend:
+    """
+    Exponentially smoothed rate of change of one input, in units per minute.
+    """
+
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.rate = 0.0
+        self._last_value = None
+        self._last_time = None
+
+    def update(self, value, now):
+        if self._last_value is not None and now > self._last_time:
+            instant = (value - self._last_value) * 60.0 / (now - self._last_time)
+            self.rate += self.smoothing * (instant - self.rate)
+        self._last_value = value
+        self._last_time = now
+        return self.rate
+
+
+class StateClassifier:
+    """
+    Stateful classifier: feeds readings through the compiled decision table,
+    applying hysteresis and minimum dwell, and counts state transitions.
+    """
+
+    def __init__(self, dimensions, min_dwell=0.0):
+        self.dimensions = list(dimensions)
+        self.min_dwell = min_dwell
+
+        # Decision table: band tuple -> (state_key, message lookup keys).
+        # Lookup keys fall back by dropping trailing dimensions, so
+        # 'dry_dark_falling' can use the 'dry_dark' messages.
+        self.table = {}
+        for bands in itertools.product(*(range(len(d.labels)) for d in self.dimensions)):
+            labels = [d.labels[b] for d, b in zip(self.dimensions, bands)]
+            keys = tuple('_'.join(labels[:n]) for n in range(len(labels), 0, -1))
+            self.table[bands] = (keys[0], keys)
+
+        self._trends = {}
+        self.bands = None
+        self.state = None
+        self.entered_at = None
+        self.transitions = {}
+        self.transition_count = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds a classifier from the 'thresholds' and optional 'classifier' config sections.
+        """
+        thresholds = config.get('thresholds', {})
+        options = config.get('classifier', {})
+        hysteresis = options.get('hysteresis', {})
+
+        m_low = thresholds.get('moisture_low', DEFAULT_MOISTURE_LOW)
+        m_high = thresholds.get('moisture_high', DEFAULT_MOISTURE_HIGH)
+        l_bright = thresholds.get('light_bright', DEFAULT_LIGHT_BRIGHT)
+
+        dimensions = [
+            Dimension('moisture', [m_low, m_high], ['dry', 'normal', 'wet'],
+                      hysteresis.get('moisture', 0.0)),
+            Dimension('light', [l_bright], ['dark', 'bright'],
+                      hysteresis.get('light', 0.0)),
+        ]
+        for extra in options.get('dimensions', []):
+            dimensions.append(Dimension(
+                extra['name'],
+                extra['boundaries'],
+                extra['labels'],
+                extra.get('hysteresis', 0.0),
+                extra.get('input'),
+            ))
+
+        return cls(dimensions, options.get('min_dwell', 0.0))
+
+    def _inputs(self, values, now):
+        """Adds derived '<name>_trend' inputs requested by any dimension."""
+        for dim in self.dimensions:
+            name = dim.input_name
+            if name in values or not name.endswith('_trend'):
+                continue
+            base = name[:-len('_trend')]
+            if base not in values:
+                continue
+            trend = self._trends.setdefault(base, Trend())
+            values[name] = trend.update(values[base], now if now is not None else 0.0)
+        return values
+
+    def classify(self, values):
+        """
+        Stateless lookup: returns the message lookup keys for values without
+        hysteresis or dwell (used for one-shot decisions such as demo mode).
+        Derived inputs that are not supplied count as 0.
+        """
+        bands = tuple(d.band(values.get(d.input_name, 0.0)) for d in self.dimensions)
+        return self.table[bands][1]
+
+    def update(self, values, now):
+        """
+        Feeds one reading taken at time 'now' (seconds, monotonic) and returns
+        the message lookup keys of the current (possibly unchanged) state.
+        """
+        values = self._inputs(dict(values), now)
+
+        if self.bands is None:
+            bands = tuple(d.band(values[d.input_name]) for d in self.dimensions)
+        else:
+            bands = tuple(
+                d.band(values[d.input_name], current)
+                for d, current in zip(self.dimensions, self.bands)
+            )
+
+        if bands != self.bands:
+            if self.bands is None:
+                self._enter(bands, now)
+            elif now - self.entered_at >= self.min_dwell:
+                previous = self.state
+                self._enter(bands, now)
+                if self.state != previous:
+                    key = (previous, self.state)
+                    self.transitions[key] = self.transitions.get(key, 0) + 1
+                    self.transition_count += 1
+
+        return self.table[self.bands][1]
+
+    def _enter(self, bands, now):
+        self.bands = bands
+        self.state = self.table[bands][0]
+        self.entered_at = now
+
+    def stats(self):
+        """Returns transition counters for logs and metrics."""
+        return {
+            'state': self.state,
+            'transition_count': self.transition_count,
+            'transitions': {f"{a}->{b}": n for (a, b), n in self.transitions.items()},
+        }
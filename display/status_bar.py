@@ -0,0 +1,125 @@
+"""
+Status bar regions updated with partial refreshes.
+
+The log line (top-left) and the SSID (top-right) change almost every loop.
+Each field gets a fixed window on the logical canvas; the matching hardware
+window (after offset and rotation) is widened to whole bytes so it can be
+sent straight out of the packed frame with EPD.display_region, instead of
+flashing the whole 1360x480 panel.
+"""
+from PIL import Image, ImageDraw
+
+STATUS_MARGIN = 10
+DEFAULT_FULL_REFRESH_EVERY = 50 # Partial updates accumulate ghosting
+
+
+def fit_text(draw, text, font, width):
+    """Returns text cut to the whole characters that fit in width pixels."""
+    while text and draw.textlength(text, font=font) > width:
+        text = text[:-1]
+    return text
+
+
+class StatusRegion:
+    def __init__(self, name, x, y, width, height, align='left'):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.align = align
+        self.window = None  # (x_start, y_start, x_end, y_end) in hardware pixels
+        self.shown = None   # Text currently on the panel
+
+
+class StatusBar:
+    def __init__(self, regions, panel_size, offset=(0, 0), rotation=0,
+                 full_refresh_every=DEFAULT_FULL_REFRESH_EVERY):
+        self.regions = {region.name: region for region in regions}
+        self.panel_width, self.panel_height = panel_size
+        self.full_refresh_every = full_refresh_every
+        self.partial_count = 0
+
+        for region in self.regions.values():
+            x0 = region.x + offset[0]
+            y0 = region.y + offset[1]
+            x1 = x0 + region.width
+            y1 = y0 + region.height
+            if rotation == 180:
+                x0, x1 = self.panel_width - x1, self.panel_width - x0
+                y0, y1 = self.panel_height - y1, self.panel_height - y0
+            # Widen to whole bytes and clip to the panel
+            x0 = max(0, x0 - x0 % 8)
+            x1 = min(self.panel_width, x1 + (-x1) % 8)
+            y0 = max(0, y0)
+            y1 = min(self.panel_height, y1)
+            region.window = (x0, y0, x1, y1)
+
+    @classmethod
+    def from_config(cls, config, panel_size):
+        """
+        Builds the default log/SSID regions, overridable via 'status_regions'
+        (name -> [x, y, width, height]) in config.
+        """
+        canvas_width = config.get('display_width', 1360)
+        overrides = config.get('status_regions', {})
+
+        log_box = overrides.get('log', [STATUS_MARGIN, STATUS_MARGIN, 560, 16])
+        ssid_box = overrides.get('ssid', [canvas_width - STATUS_MARGIN - 240, STATUS_MARGIN, 240, 16])
+        regions = [
+            StatusRegion('log', *log_box, align='left'),
+            StatusRegion('ssid', *ssid_box, align='right'),
+        ]
+        return cls(
+            regions,
+            panel_size,
+            (config.get('display_x_offset', 0), config.get('display_y_offset', 0)),
+            config.get('rotation', 0),
+            config.get('full_refresh_every', DEFAULT_FULL_REFRESH_EVERY),
+        )
+
+    def draw(self, draw, fields, font):
+        """
+        Draws the fields into their regions on the logical canvas. Text is cut
+        to the whole characters that fit and the glyphs are clipped to the
+        region, so nothing lands outside the window a partial refresh sends.
+        """
+        for name, text in fields.items():
+            region = self.regions[name]
+            text = fit_text(draw, text, font, region.width)
+            if region.align == 'right':
+                bbox = draw.textbbox((0, 0), text, font=font)
+                x = region.width - (bbox[2] - bbox[0])
+            else:
+                x = 0
+            mask = Image.new('1', (region.width, region.height), 0)
+            ImageDraw.Draw(mask).text((x, 0), text, font=font, fill=1)
+            draw.bitmap((region.x, region.y), mask, fill=0)
+
+    def changed(self, fields):
+        """Returns the regions whose text differs from what the panel shows."""
+        return [self.regions[name] for name, text in fields.items() if self.regions[name].shown != text]
+
+    def needs_full_refresh(self):
+        return self.partial_count >= self.full_refresh_every
+
+    def mark_full_refresh(self, fields):
+        """Records that a full refresh put these field texts on the panel."""
+        for name, text in fields.items():
+            self.regions[name].shown = text
+        self.partial_count = 0
+
+    def update(self, epd, frame, regions, fields):
+        """
+        Sends the given regions of the packed hardware frame (already offset
+        and rotated) with partial refreshes. The frame is passed as a strided
+        view, so nothing is cropped or copied here; windows crossing the
+        controller boundary are handled by EPD.display_region.
+        """
+        stride = self.panel_width // 8
+        view = memoryview(frame)
+        for region in regions:
+            x0, y0, x1, y1 = region.window
+            epd.display_region(view[y0 * stride + x0 // 8:], x0, y0, x1 - x0, y1 - y0, stride)
+            region.shown = fields[region.name]
+        self.partial_count += 1
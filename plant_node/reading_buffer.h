@@ -0,0 +1,163 @@
+#pragma once
+// 허브 연결이 끊긴 동안의 측정값을 보관하는 고정 크기 링 버퍼.
+// GET /readings?since=<seq>[&limit=<n>] 로 seq 이후의 값을 CSV 로 제공한다.
+//
+//   # uptime_s=<현재 업타임>,first_seq=<가장 오래된 seq>,last_seq=<가장 최근 seq>,boot=<부팅 ID>
+//   seq,uptime_s,moisture,light
+//   1201,36030,0.812,1.604
+//   ...
+//
+// 값은 mV 단위 uint16 으로 저장 (1건 12 bytes, 1440건 = 약 17KB, 30초 간격 12시간).
+// 응답은 한 번에 최대 READING_RESPONSE_LIMIT 건 (약 6KB): 버퍼 전체를 CSV 한 덩어리로
+// 만들면 36KB 가 넘어 C3 의 힙으로는 빠듯하다. 허브는 last_seq 까지 since 를 올려 가며
+// 나눠 받는다.
+//
+// push 는 메인 루프, to_csv 는 웹 서버 태스크에서 돌기 때문에 둘 다 mutex_ 를 잡는다.
+//
+// 업타임은 millis() (uint32, 약 49.7일마다 0 으로 돌아감) 를 64비트로 늘려서 쓴다.
+// boot 는 부팅마다 새로 뽑는 임의의 ID 로, 허브는 이 값이 바뀌면 노드가 재부팅되어
+// seq 가 1 부터 다시 시작했다고 본다 (업타임 비교만으로는 허브가 오래 떨어져 있던
+// 동안의 재부팅을 놓칠 수 있다).
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cmath>
+#include <string>
+#include "esphome/core/hal.h"
+#include "esphome/core/helpers.h"
+#include "esphome/components/web_server_base/web_server_base.h"
+
+namespace eplantalk {
+
+static const size_t READING_BUFFER_SIZE = 1440;
+static const size_t READING_RESPONSE_LIMIT = 240;
+
+struct Reading {
+  uint32_t seq;
+  uint32_t uptime_s;
+  uint16_t moisture_mv;
+  uint16_t light_mv;
+};
+
+class ReadingBuffer {
+ public:
+  void push(float moisture, float light) {
+    if (std::isnan(moisture) || std::isnan(light)) {
+      return;
+    }
+    esphome::LockGuard guard(this->mutex_);
+    this->track_millis();
+    Reading &slot = this->items_[this->head_];
+    slot.seq = ++this->seq_;
+    slot.uptime_s = (uint32_t) (this->uptime_ms() / 1000);
+    slot.moisture_mv = to_mv(moisture);
+    slot.light_mv = to_mv(light);
+    this->head_ = (this->head_ + 1) % READING_BUFFER_SIZE;
+    if (this->count_ < READING_BUFFER_SIZE) {
+      this->count_++;
+    }
+  }
+
+  std::string to_csv(uint32_t since, size_t limit) {
+    if (limit > READING_RESPONSE_LIMIT) {
+      limit = READING_RESPONSE_LIMIT;
+    }
+    esphome::LockGuard guard(this->mutex_);
+    std::string out;
+    out.reserve(96 + limit * 40);
+    char line[96];
+    uint32_t first_seq = this->count_ ? this->seq_ - this->count_ + 1 : 0;
+    snprintf(line, sizeof(line), "# uptime_s=%llu,first_seq=%u,last_seq=%u,boot=%08x\n",
+             (unsigned long long) (this->uptime_ms() / 1000), (unsigned) first_seq,
+             (unsigned) this->seq_, (unsigned) this->boot_id());
+    out += line;
+    out += "seq,uptime_s,moisture,light\n";
+
+    size_t start = (this->head_ + READING_BUFFER_SIZE - this->count_) % READING_BUFFER_SIZE;
+    size_t written = 0;
+    for (size_t i = 0; i < this->count_ && written < limit; i++) {
+      const Reading &r = this->items_[(start + i) % READING_BUFFER_SIZE];
+      if (r.seq <= since) {
+        continue;
+      }
+      snprintf(line, sizeof(line), "%u,%u,%u.%03u,%u.%03u\n",
+               (unsigned) r.seq, (unsigned) r.uptime_s,
+               r.moisture_mv / 1000, r.moisture_mv % 1000,
+               r.light_mv / 1000, r.light_mv % 1000);
+      out += line;
+      written++;
+    }
+    return out;
+  }
+
+ protected:
+  static uint16_t to_mv(float volts) {
+    if (volts <= 0.0f) {
+      return 0;
+    }
+    if (volts >= 65.535f) {
+      return 65535;
+    }
+    return (uint16_t) lroundf(volts * 1000.0f);
+  }
+
+  // millis() 의 wrap 횟수는 메인 루프의 push (30초마다) 에서만 센다
+  void track_millis() {
+    uint32_t now = esphome::millis();
+    if (now < this->last_millis_) {
+      this->millis_wraps_++;
+    }
+    this->last_millis_ = now;
+  }
+
+  // 64비트 업타임: 마지막 push 이후의 wrap (최대 한 번) 도 반영한다
+  uint64_t uptime_ms() const {
+    uint32_t now = esphome::millis();
+    uint32_t wraps = this->millis_wraps_ + (now < this->last_millis_ ? 1 : 0);
+    return ((uint64_t) wraps << 32) | now;
+  }
+
+  // 웹 서버의 to_csv 에서만, 처음 쓸 때 뽑는다: 그때는 WiFi 가 켜져 있어 하드웨어 난수가 진짜 난수다
+  uint32_t boot_id() {
+    while (this->boot_id_ == 0) {
+      this->boot_id_ = esphome::random_uint32();
+    }
+    return this->boot_id_;
+  }
+
+  esphome::Mutex mutex_;
+  Reading items_[READING_BUFFER_SIZE]{};
+  size_t head_{0};
+  size_t count_{0};
+  uint32_t seq_{0};
+  uint32_t last_millis_{0};
+  uint32_t millis_wraps_{0};
+  uint32_t boot_id_{0};
+};
+
+inline ReadingBuffer &readings() {
+  static ReadingBuffer buffer;
+  return buffer;
+}
+
+class ReadingLogHandler : public AsyncWebHandler {
+ public:
+  bool canHandle(AsyncWebServerRequest *request) override {
+    return request->method() == HTTP_GET && request->url() == "/readings";
+  }
+
+  void handleRequest(AsyncWebServerRequest *request) override {
+    uint32_t since = 0;
+    size_t limit = READING_RESPONSE_LIMIT;
+    if (request->hasParam("since")) {
+      since = strtoul(request->getParam("since")->value().c_str(), nullptr, 10);
+    }
+    if (request->hasParam("limit")) {
+      limit = strtoul(request->getParam("limit")->value().c_str(), nullptr, 10);
+    }
+    std::string body = readings().to_csv(since, limit);
+    request->send(200, "text/csv", body.c_str());
+  }
+};
+
+}  // namespace eplantalk